@@ -0,0 +1,208 @@
+import pandas as pd
+import numpy as np
+
+GROUP_KEYS = ["sku_id", "location_id", "echelon_type"]
+
+# Additive per-group sums. Any statistic the SS modules need (RMSE, MAE, sigma_d,
+# sigma_lt, ...) can be derived from these, and two sets of sums for the same
+# group can simply be added together (combine_group_sums when the shifts differ).
+SUM_COLUMNS = [
+    "n_err", "sum_err", "sum_sq_err", "sum_abs_err",
+    "sum_abs_actual", "n_ape", "sum_ape",
+    "n_actual", "sum_actual", "sum_sq_actual",
+    "n_lt", "sum_lt", "sum_sq_lt",
+]
+
+# Actual and lead-time sums are taken about a per-group shift (the group's first value)
+# so sigma_d / sigma_lt do not lose their digits to E[x^2] - E[x]^2 when the level is
+# large next to the spread. Shift column -> the (count, sum, sum of squares) it centres.
+SHIFTED_SUMS = {
+    "shift_actual": ("n_actual", "sum_actual", "sum_sq_actual"),
+    "shift_lt": ("n_lt", "sum_lt", "sum_sq_lt"),
+}
+SHIFT_COLUMNS = list(SHIFTED_SUMS)
+# Sums that can be added across groups as they are (forecast error / accuracy sums)
+UNSHIFTED_COLUMNS = [col for col in SUM_COLUMNS if not any(col in cols for cols in SHIFTED_SUMS.values())]
+
+# Actuals below this are ignored for MAPE
+MAPE_MIN_ACTUAL = 10
+
+
+def _numeric(df: pd.DataFrame, col: str) -> np.ndarray:
+    """Return a column as float64 (NaN for missing/non-numeric), or all-NaN if absent."""
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+
+def aggregate_group_sums(aligned_df: pd.DataFrame, group_keys=None, shift_keys=None) -> pd.DataFrame:
+    """
+    Compute additive sufficient statistics per group in a single groupby pass.
+
+    Forecast error is defined as forecast - actual and only uses rows where both
+    are present (as do the WAPE/MAPE sums); actual and lead-time moments use every
+    row where that value is present, as deviations from the first value of their
+    shift group (SHIFTED_SUMS).
+
+    Args:
+        aligned_df (pd.DataFrame): Output of align_forecast_to_actual (forecast, actual, lead_time).
+        group_keys (list, optional): Grouping columns (default: sku_id, location_id, echelon_type).
+        shift_keys (list, optional): Subset of group_keys sharing one shift (default: group_keys),
+            so that e.g. per-bucket sums of one group can be added without re-centering.
+
+    Returns:
+        pd.DataFrame: One row per group, indexed by group_keys, with SUM_COLUMNS + SHIFT_COLUMNS.
+    """
+    group_keys = list(group_keys or GROUP_KEYS)
+    shift_keys = group_keys if shift_keys is None else list(shift_keys)
+
+    forecast = _numeric(aligned_df, "forecast")
+    actual = _numeric(aligned_df, "actual")
+    lead_time = _numeric(aligned_df, "lead_time")
+
+    err = forecast - actual
+    has_err = ~np.isnan(err)
+    has_actual = ~np.isnan(actual)
+    has_lt = ~np.isnan(lead_time)
+
+    err = np.where(has_err, err, 0.0)
+    abs_actual = np.where(has_err, np.abs(actual), 0.0)
+    has_ape = has_err & (abs_actual >= MAPE_MIN_ACTUAL)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ape = np.where(has_ape, np.abs(err) / abs_actual, 0.0)
+    shifts = pd.DataFrame({"shift_actual": actual, "shift_lt": lead_time}).groupby(
+        [aligned_df[key].to_numpy() for key in shift_keys], sort=False, dropna=False, observed=True
+    ).transform("first").fillna(0.0)
+    shift_actual = shifts["shift_actual"].to_numpy()
+    shift_lt = shifts["shift_lt"].to_numpy()
+    actual = np.where(has_actual, actual - shift_actual, 0.0)
+    lead_time = np.where(has_lt, lead_time - shift_lt, 0.0)
+
+    parts = pd.DataFrame({
+        "n_err": has_err.astype("float64"),
+        "sum_err": err,
+        "sum_sq_err": err ** 2,
+        "sum_abs_err": np.abs(err),
+        "sum_abs_actual": abs_actual,
+        "n_ape": has_ape.astype("float64"),
+        "sum_ape": ape,
+        "n_actual": has_actual.astype("float64"),
+        "sum_actual": actual,
+        "sum_sq_actual": actual ** 2,
+        "n_lt": has_lt.astype("float64"),
+        "sum_lt": lead_time,
+        "sum_sq_lt": lead_time ** 2,
+        "shift_actual": shift_actual,
+        "shift_lt": shift_lt,
+    })
+    for key in group_keys:
+        parts[key] = aligned_df[key].to_numpy()
+
+    grouped = parts.groupby(group_keys, sort=False, dropna=False, observed=True)
+    sums = grouped[SUM_COLUMNS].sum()
+    sums[SHIFT_COLUMNS] = grouped[SHIFT_COLUMNS].first()
+    return sums
+
+
+def _shift(sums: pd.DataFrame, col: str) -> np.ndarray:
+    """A shift column as float64; sums without it are raw (shift 0)."""
+    if col not in sums.columns:
+        return np.zeros(len(sums))
+    return np.nan_to_num(sums[col].to_numpy(dtype="float64", na_value=np.nan))
+
+
+def combine_group_sums(left: pd.DataFrame, right: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add two sets of sums for the same groups, row for row, re-centering the shifted sums.
+
+    Both sides are moved to left's shift (right's where left has no values) with
+    S' = S + n*d and Q' = Q + 2*d*S + n*d^2, d = old shift - new shift.
+
+    Args:
+        left (pd.DataFrame): Sums (NaN rows allowed for groups it has not seen).
+        right (pd.DataFrame): Sums with the same index and row order as left.
+
+    Returns:
+        pd.DataFrame: Combined SUM_COLUMNS + SHIFT_COLUMNS indexed like left.
+    """
+    out = pd.DataFrame(
+        left[SUM_COLUMNS].fillna(0.0).to_numpy() + right[SUM_COLUMNS].fillna(0.0).to_numpy(),
+        columns=SUM_COLUMNS, index=left.index,
+    )
+    for shift_col, (n_col, sum_col, sq_col) in SHIFTED_SUMS.items():
+        n_left = left[n_col].fillna(0.0).to_numpy()
+        shift_left, shift_right = _shift(left, shift_col), _shift(right, shift_col)
+        shift = np.where(n_left > 0, shift_left, shift_right)
+        total = np.zeros(len(out))
+        total_sq = np.zeros(len(out))
+        for side, old in [(left, shift_left), (right, shift_right)]:
+            n = side[n_col].fillna(0.0).to_numpy()
+            s = side[sum_col].fillna(0.0).to_numpy()
+            d = old - shift
+            total += s + n * d
+            total_sq += side[sq_col].fillna(0.0).to_numpy() + 2 * d * s + n * d ** 2
+        out[sum_col] = total
+        out[sq_col] = total_sq
+        out[shift_col] = shift
+    return out
+
+
+def derive_group_statistics(sums: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turn additive group sums into the statistics used by the SS modules.
+
+    Args:
+        sums (pd.DataFrame): Output of aggregate_group_sums (raw sums without shift
+            columns are read as shift 0).
+
+    Returns:
+        pd.DataFrame: Same index with 'n', 'rmse', 'mae', 'bias', 'avg_d', 'sigma_d', 'sigma_lt'.
+            Population (ddof=0) standard deviations, NaN when a group has no data.
+    """
+    def _mean(total, count):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(count > 0, total / count, np.nan)
+
+    def _std(total, total_sq, count):
+        mean = _mean(total, count)
+        var = _mean(total_sq, count) - mean ** 2
+        return np.sqrt(np.clip(var, 0.0, None))
+
+    n_err = sums["n_err"].to_numpy()
+    n_actual = sums["n_actual"].to_numpy()
+    n_lt = sums["n_lt"].to_numpy()
+
+    return pd.DataFrame({
+        "n": n_err.astype("int64"),
+        "rmse": np.sqrt(_mean(sums["sum_sq_err"].to_numpy(), n_err)),
+        "mae": _mean(sums["sum_abs_err"].to_numpy(), n_err),
+        "bias": _mean(sums["sum_err"].to_numpy(), n_err),
+        "avg_d": _shift(sums, "shift_actual") + _mean(sums["sum_actual"].to_numpy(), n_actual),
+        "sigma_d": _std(sums["sum_actual"].to_numpy(), sums["sum_sq_actual"].to_numpy(), n_actual),
+        "sigma_lt": _std(sums["sum_lt"].to_numpy(), sums["sum_sq_lt"].to_numpy(), n_lt),
+    }, index=sums.index)
+
+
+def broadcast_to_rows(stats: pd.DataFrame, rows_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Look up each row's group statistics by position (no merge, no copy of rows_df).
+
+    Args:
+        stats (pd.DataFrame): Per-group frame indexed by the group keys.
+        rows_df (pd.DataFrame): Rows holding the same key columns.
+
+    Returns:
+        pd.DataFrame: Statistics aligned row-for-row with rows_df (NaN for unseen groups).
+    """
+    keys = list(stats.index.names)
+    if len(keys) == 1:
+        lookup = pd.Index(rows_df[keys[0]])
+    else:
+        lookup = pd.MultiIndex.from_frame(rows_df[keys])
+    positions = stats.index.get_indexer(lookup)
+
+    values = stats.to_numpy(dtype="float64")
+    out = np.full((len(rows_df), values.shape[1]), np.nan)
+    found = positions >= 0
+    out[found] = values[positions[found]]
+    return pd.DataFrame(out, columns=stats.columns, index=rows_df.index)
@@ -1,49 +1,75 @@
-
 import pandas as pd
 import numpy as np
-from config import PAST_FORECAST_DATA_AVAILABLE, PAST_SALES_DATA_AVAILABLE
+import backend.config as config  # import module, not constants
+
+from backend.accuracy.group_statistics import aggregate_group_sums
+
+METRIC_GROUP_KEYS = ['sku_id', 'echelon_type']
+
+
+def derive_accuracy_metrics(sums: pd.DataFrame) -> pd.DataFrame:
+    """
+    RMSE, MAE, MAPE, Bias, WAPE and n_samples from additive group sums.
+
+    Args:
+        sums (pd.DataFrame): Output of aggregate_group_sums (indexed by the group keys).
+
+    Returns:
+        pd.DataFrame: Same index, rounded metric columns. Groups without any
+            forecast/actual pair are dropped.
+    """
+    sums = sums[sums['n_err'] > 0]
+    n = sums['n_err'].to_numpy()
+
+    rmse = np.sqrt(sums['sum_sq_err'].to_numpy() / n)
+    mae = sums['sum_abs_err'].to_numpy() / n
+    bias = sums['sum_err'].to_numpy() / n
+    wape = sums['sum_abs_err'].to_numpy() / np.maximum(sums['sum_abs_actual'].to_numpy(), 1e-9) * 100
+
+    # MAPE guarded (ignore tiny actuals)
+    n_ape = sums['n_ape'].to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mape = np.where(n_ape > 0, sums['sum_ape'].to_numpy() / n_ape * 100, np.nan)
+
+    return pd.DataFrame({
+        'RMSE': np.round(rmse, 2),
+        'MAE': np.round(mae, 2),
+        'MAPE (%)': np.round(mape, 2),
+        'Bias': np.round(bias, 2),
+        'WAPE (%)': np.round(wape, 2),
+        'n_samples': n.astype('int64'),
+    }, index=sums.index)
 
 
-def calculate_grouped_accuracy_metrics(merged_df: pd.DataFrame) -> pd.DataFrame:
-    results = []
-    grouped = merged_df.groupby(['sku_id', 'echelon_type'], dropna=False)
+def calculate_grouped_accuracy_metrics(merged_df: pd.DataFrame, group_keys=None) -> pd.DataFrame:
+    """
+    Forecast accuracy metrics per group, computed with grouped aggregations in one pass.
 
-    for (sku, echelon), g in grouped:
-        y_true = pd.to_numeric(g['actual'], errors='coerce')
-        y_pred = pd.to_numeric(g['forecast'], errors='coerce')
-        mask = y_true.notna() & y_pred.notna()
-        y_true = y_true[mask]; y_pred = y_pred[mask]
-        if len(y_true) == 0:
-            continue
+    Args:
+        merged_df (pd.DataFrame): Output of align_forecast_to_actual.
+        group_keys (list, optional): Grouping columns (default: sku_id, echelon_type),
+            e.g. add 'location_id' for per-location metrics.
 
-        err = y_pred - y_true
-        abs_err = np.abs(err)
+    Returns:
+        pd.DataFrame: One row per group with the group keys, first non-null lead_time
+            and service_level, RMSE, MAE, MAPE (%), Bias, WAPE (%) and n_samples.
+    """
+    group_keys = list(group_keys or METRIC_GROUP_KEYS)
 
-        rmse = float(np.sqrt(np.mean(err**2)))
-        mae  = float(np.mean(abs_err))
-        bias = float(np.mean(err))
-        wape = float(abs_err.sum() / max(y_true.abs().sum(), 1e-9) * 100)
+    metrics = derive_accuracy_metrics(aggregate_group_sums(merged_df, group_keys))
 
-        # MAPE guarded (ignore tiny actuals)
-        mape_mask = (y_true.abs() >= 10)  # drop tiny-actual rows
-        mape = float(np.mean((abs_err[mape_mask] / y_true[mape_mask].abs())) * 100) if mape_mask.any() else np.nan
+    # First non-null lead_time / service_level per group (None if the column is absent)
+    grouped = merged_df.groupby(group_keys, sort=False, dropna=False, observed=True)
+    for col in ['lead_time', 'service_level']:
+        if col in merged_df.columns:
+            metrics.insert(0 if col == 'lead_time' else 1, col, grouped[col].first().reindex(metrics.index))
+        else:
+            metrics.insert(0 if col == 'lead_time' else 1, col, None)
 
-        results.append({
-            'sku_id': sku,
-            'echelon_type': echelon,
-            'lead_time': g['lead_time'].dropna().iloc[0] if 'lead_time' in g and g['lead_time'].notna().any() else None,
-            'service_level': g['service_level'].dropna().iloc[0] if 'service_level' in g and g['service_level'].notna().any() else None,
-            'RMSE': round(rmse, 2),
-            'MAE': round(mae, 2),
-            'MAPE (%)': round(mape, 2) if not np.isnan(mape) else np.nan,
-            'Bias': round(bias, 2),
-            'WAPE (%)': round(wape, 2),
-            'n_samples': int(len(y_true))
-        })
-    return pd.DataFrame(results)
+    return metrics.sort_index().reset_index()
 
 
 
 def data_availability_check() -> bool:
     """Checks if both past forecast & sales data are available."""
-    return PAST_FORECAST_DATA_AVAILABLE and PAST_SALES_DATA_AVAILABLE
+    return config.PAST_FORECAST_DATA_AVAILABLE and config.PAST_SALES_DATA_AVAILABLE
@@ -5,6 +5,7 @@ path=sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..
 
 from config import forecast_path,actual_path,future_forecast_path,column_mapping
 from preprocessing.input_cleaner import clean_and_prepare_inputs
+from preprocessing.data_loader import read_input_table
 from preprocessing.forecast_aligner import align_forecast_to_actual
 # from accuracy.metrics_calculator import calculate_grouped_accuracy_metrics,data_availability_check
 # from segmentation.segmenter import segmentation_function
@@ -15,9 +16,9 @@ def initiate_function():
     input_function_call()
 
 def input_function_call():
-    forecast_df = pd.read_csv(forecast_path)
-    actual_df = pd.read_csv(actual_path)
-    future_forecast_df = pd.read_csv(future_forecast_path)
+    forecast_df = read_input_table(forecast_path, column_mapping)
+    actual_df = read_input_table(actual_path, column_mapping)
+    future_forecast_df = read_input_table(future_forecast_path, column_mapping)
     cleaned_forecast, cleaned_actual,cleaned_future_forecast = clean_and_prepare_inputs(forecast_df, actual_df,future_forecast_df, column_mapping)
     return cleaned_forecast, cleaned_actual,cleaned_future_forecast
 
@@ -0,0 +1,271 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import numpy as np
+from scipy.stats import norm
+
+from backend.accuracy.group_statistics import (
+    GROUP_KEYS,
+    SUM_COLUMNS,
+    SHIFT_COLUMNS,
+    aggregate_group_sums,
+    derive_group_statistics,
+    broadcast_to_rows,
+)
+from backend.modules.batch_engine import compute_error_based_safety_stock
+from backend.modules.bayesian import bayesian_sigma_for_rows
+from backend.modules.ml_based import predict_ml_based_safety_stock
+from backend.modules.rule_based import calculate_rule_based_safety_stock, _as_float_array
+
+# Method name -> column produced by compute_error_based_safety_stock
+ERROR_BASED_METHODS = {
+    "rmse_no_var": "rmse_ss_no_var",
+    "rmse_with_var": "rmse_ss_with_var",
+    "mae_no_var": "mae_ss_no_var",
+    "mae_with_var": "mae_ss_with_var",
+    "hybrid_no_var": "hybrid_ss_no_var",
+    "hybrid_with_var": "hybrid_ss_with_var",
+}
+BACKTEST_METHODS = ["rule"] + list(ERROR_BASED_METHODS) + ["bayesian", "ml"]
+DEFAULT_METHODS = [m for m in BACKTEST_METHODS if m != "ml"]  # ML refits a model per group and cutoff
+
+BUCKET_COL = "__bucket"
+
+
+def rolling_cutoffs(dates, n_cutoffs: int = 6, horizon_days: int = 28, min_history_days: int = 28) -> list:
+    """
+    Evenly spaced cutoff dates leaving min_history_days before the first and a full
+    horizon after the last.
+
+    Returns:
+        list: Sorted, unique pd.Timestamp cutoffs (may be empty if history is too short)
+    """
+    dates = pd.to_datetime(pd.Series(dates), errors="coerce").dropna()
+    if dates.empty:
+        return []
+    first = dates.min().normalize() + pd.Timedelta(days=min_history_days)
+    last = dates.max().normalize() + pd.Timedelta(days=1) - pd.Timedelta(days=horizon_days)
+    if last < first:
+        return []
+    return sorted(set(pd.date_range(first, last, periods=n_cutoffs).normalize()))
+
+
+def _realized_lead_time_error(aligned_df: pd.DataFrame, group_codes: np.ndarray) -> pd.DataFrame:
+    """
+    Realized demand and forecast error over each row's lead time, from daily history.
+
+    For a row dated t with lead time L (days), sums actual - forecast and actual over the
+    same group's rows dated in [t, t + L). The window only counts as observed when it
+    ends within the data and every row in it has an actual.
+    """
+    day = ((pd.to_datetime(aligned_df["date"]) - pd.to_datetime(aligned_df["date"]).min())
+           // pd.Timedelta(days=1)).to_numpy(dtype="float64", na_value=np.nan)
+    lead_time = _as_float_array(aligned_df["lead_time"])
+    actual = _as_float_array(aligned_df["actual"])
+    err = actual - _as_float_array(aligned_df["forecast"])
+
+    result = pd.DataFrame({"realized_error": np.nan, "realized_demand": np.nan}, index=aligned_df.index)
+    valid = ~np.isnan(day) & (group_codes >= 0)
+    if not valid.any():
+        return result
+
+    span = int(np.nanmax(day) + np.nanmax(np.nan_to_num(lead_time)) + 2)
+    order = np.flatnonzero(valid)[np.lexsort((day[valid], group_codes[valid]))]
+    keys = group_codes[order].astype("int64") * span + day[order].astype("int64")
+
+    observed = ~np.isnan(err[order])
+    cum_err = np.concatenate([[0.0], np.cumsum(np.where(observed, err[order], 0.0))])
+    cum_act = np.concatenate([[0.0], np.cumsum(np.where(observed, actual[order], 0.0))])
+    cum_obs = np.concatenate([[0], np.cumsum(observed)])
+
+    lt = lead_time[order]
+    has_lt = ~np.isnan(lt) & (lt > 0)
+    end_day = day[order] + np.where(has_lt, lt, 0)
+    start = np.arange(len(order))
+    end = np.searchsorted(keys, group_codes[order].astype("int64") * span + end_day.astype("int64"), side="left")
+
+    complete = has_lt & (end_day <= np.nanmax(day) + 1) & (cum_obs[end] - cum_obs[start] == end - start)
+    result.iloc[order, 0] = np.where(complete, cum_err[end] - cum_err[start], np.nan)
+    result.iloc[order, 1] = np.where(complete, cum_act[end] - cum_act[start], np.nan)
+    return result
+
+
+def _score(ss: np.ndarray, realized_error: np.ndarray, realized_demand: np.ndarray, service_level: np.ndarray) -> dict:
+    """Stockout/excess scores for one method over one cutoff's evaluation rows."""
+    scored = ~np.isnan(ss) & ~np.isnan(realized_error)
+    ss, err, demand = ss[scored], realized_error[scored], realized_demand[scored]
+    shortage = np.clip(err - ss, 0.0, None)
+    excess = np.clip(ss - err, 0.0, None)
+    n = int(scored.sum())
+    return {
+        "n_rows": n,
+        "target_service_level": float(np.nanmean(service_level[scored])) if n else np.nan,
+        "achieved_csl": float(1.0 - (shortage > 0).mean()) if n else np.nan,
+        "fill_rate": float(1.0 - shortage.sum() / demand.sum()) if n and demand.sum() > 0 else np.nan,
+        "avg_ss": float(ss.mean()) if n else np.nan,
+        "total_shortage": float(shortage.sum()),
+        "total_excess": float(excess.sum()),
+        "total_demand": float(demand.sum()),
+    }
+
+
+def _evaluate_cutoff(task):
+    """SS of every method as of one cutoff, scored against the realized lead-time error."""
+    cutoff, sums, eval_df, history_df, methods, group_keys = task
+    lead_time = eval_df["lead_time"]
+    service_level = _as_float_array(eval_df["service_level"])
+    realized_error = eval_df["realized_error"].to_numpy()
+    realized_demand = eval_df["realized_demand"].to_numpy()
+
+    ss_by_method = {}
+    if "rule" in methods:
+        ss_by_method["rule"] = calculate_rule_based_safety_stock(eval_df)
+    if any(m in ERROR_BASED_METHODS for m in methods):
+        row_stats = broadcast_to_rows(derive_group_statistics(sums), eval_df)
+        error_ss = compute_error_based_safety_stock(row_stats, lead_time, service_level)
+        for method, col in ERROR_BASED_METHODS.items():
+            if method in methods:
+                ss_by_method[method] = error_ss[col]
+    if "bayesian" in methods:
+        with np.errstate(invalid="ignore"):
+            ss_by_method["bayesian"] = np.round(
+                norm.ppf(service_level) * bayesian_sigma_for_rows(sums, eval_df)
+                * np.sqrt(_as_float_array(lead_time)), 2
+            )
+    if "ml" in methods:
+        # Predict with z = 1, then scale by each row's own z
+        history = history_df[history_df["actual"].notna()]
+        merge_keys = ["sku_id", "location_id", "echelon_type", "date"]
+        unit_ss = predict_ml_based_safety_stock(
+            history[merge_keys + ["actual"]], history.drop(columns=["actual"]), eval_df.drop(
+                columns=["actual", "realized_error", "realized_demand"], errors="ignore"),
+            service_level=norm.cdf(1.0),
+        )
+        with np.errstate(invalid="ignore"):
+            ss_by_method["ml"] = np.round(unit_ss * norm.ppf(service_level), 2)
+
+    rows = []
+    for method in methods:
+        scores = _score(np.asarray(ss_by_method[method], dtype="float64"),
+                        realized_error, realized_demand, service_level)
+        rows.append({"cutoff": cutoff, "method": method, **scores})
+    return rows
+
+
+def run_backtest(
+    aligned_df: pd.DataFrame,
+    cutoffs=6,
+    horizon_days: int = 28,
+    methods=None,
+    n_jobs: int = 1,
+    group_keys=None,
+) -> pd.DataFrame:
+    """
+    Rolling-origin backtest of the safety stock methods over history.
+
+    At each cutoff every method computes SS from the history before the cutoff, for
+    the rows dated in [cutoff, cutoff + horizon_days). Each row is then scored against
+    its realized lead-time forecast error (actual - forecast summed over the next
+    lead_time days): a stockout when the error exceeds the SS, the shortfall as
+    shortage and the unused SS as excess inventory.
+
+    Group sums are aggregated once per (group, interval between cutoffs) and
+    accumulated, so each cutoff's statistics are the previous cutoff's plus one
+    interval. Cutoffs are evaluated in a process pool when n_jobs > 1; results do not
+    depend on n_jobs.
+
+    Args:
+        aligned_df (pd.DataFrame): Output of align_forecast_to_actual (daily rows with
+            forecast, actual, lead_time in days, service_level)
+        cutoffs (int | list): Number of rolling cutoffs (see rolling_cutoffs) or explicit dates
+        horizon_days (int): Length of each evaluation window
+        methods (list, optional): Subset of BACKTEST_METHODS (default: all but "ml")
+        n_jobs (int): Worker processes (-1 = all cores)
+        group_keys (list, optional): Grouping columns (default: sku_id, location_id, echelon_type)
+
+    Returns:
+        pd.DataFrame: One row per (cutoff, method) with n_rows, target_service_level,
+            achieved_csl, fill_rate, avg_ss, total_shortage, total_excess, total_demand
+    """
+    group_keys = list(group_keys or GROUP_KEYS)
+    methods = list(methods or DEFAULT_METHODS)
+    unknown = set(methods) - set(BACKTEST_METHODS)
+    if unknown:
+        raise ValueError(f"Unknown backtest methods: {sorted(unknown)} (expected {BACKTEST_METHODS})")
+
+    df = aligned_df.reset_index(drop=True)
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    if isinstance(cutoffs, int):
+        cutoffs = rolling_cutoffs(df["date"], cutoffs, horizon_days)
+    cutoffs = sorted(pd.to_datetime(list(cutoffs)))
+    columns = ["cutoff", "method", "n_rows", "target_service_level", "achieved_csl", "fill_rate",
+               "avg_ss", "total_shortage", "total_excess", "total_demand"]
+    if not cutoffs:
+        return pd.DataFrame(columns=columns)
+
+    group_codes = df.groupby(group_keys, sort=False, dropna=False, observed=True).ngroup().to_numpy()
+    realized = _realized_lead_time_error(df, group_codes)
+    df["realized_error"] = realized["realized_error"].to_numpy()
+    df["realized_demand"] = realized["realized_demand"].to_numpy()
+
+    # Bucket b holds the rows dated in [cutoffs[b-1], cutoffs[b]); history before cutoff k = buckets 0..k
+    cutoff_values = np.asarray(cutoffs, dtype="datetime64[ns]")
+    df[BUCKET_COL] = np.searchsorted(cutoff_values, df["date"].to_numpy(dtype="datetime64[ns]"), side="right")
+    bucket_sums = aggregate_group_sums(df, group_keys + [BUCKET_COL], shift_keys=group_keys)
+
+    group_index = bucket_sums.index.droplevel(BUCKET_COL)
+    groups = group_index.unique()
+    group_codes_b = groups.get_indexer(group_index)
+    buckets = bucket_sums.index.get_level_values(BUCKET_COL).to_numpy()
+    cube = np.zeros((len(groups), len(cutoffs) + 1, len(SUM_COLUMNS)))
+    np.add.at(cube, (group_codes_b, buckets), bucket_sums[SUM_COLUMNS].to_numpy())
+    cube = np.cumsum(cube, axis=1)
+    # Every bucket of a group shares the group's shift, so the cumulated sums keep it
+    shifts = bucket_sums[SHIFT_COLUMNS].groupby(group_codes_b).first().to_numpy()
+
+    dates = df["date"]
+    tasks = []
+    for k, cutoff in enumerate(cutoffs):
+        window = (dates >= cutoff) & (dates < cutoff + pd.Timedelta(days=horizon_days))
+        sums = pd.DataFrame(cube[:, k, :], index=groups, columns=SUM_COLUMNS)
+        sums[SHIFT_COLUMNS] = shifts
+        history = df.loc[dates < cutoff].drop(columns=[BUCKET_COL, "realized_error", "realized_demand"]) \
+            if "ml" in methods else None
+        tasks.append((cutoff, sums, df.loc[window].drop(columns=[BUCKET_COL]), history, methods, group_keys))
+
+    n_jobs = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+    if n_jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(_evaluate_cutoff, tasks))
+    else:
+        results = [_evaluate_cutoff(task) for task in tasks]
+
+    return pd.DataFrame([row for rows in results for row in rows], columns=columns)
+
+
+def summarize_backtest(results: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pool the per-cutoff scores per method (row-weighted rates, summed quantities).
+
+    Returns:
+        pd.DataFrame: One row per method, sorted by total_shortage + total_excess
+    """
+    r = results[results["n_rows"] > 0].copy()
+    r["stockouts"] = (1 - r["achieved_csl"]) * r["n_rows"]
+    r["ss_total"] = r["avg_ss"] * r["n_rows"]
+    r["target_total"] = r["target_service_level"] * r["n_rows"]
+    g = r.groupby("method", sort=False)[["n_rows", "stockouts", "ss_total", "target_total",
+                                          "total_shortage", "total_excess", "total_demand"]].sum()
+    summary = pd.DataFrame({
+        "n_rows": g["n_rows"].astype("int64"),
+        "target_service_level": g["target_total"] / g["n_rows"],
+        "achieved_csl": 1 - g["stockouts"] / g["n_rows"],
+        "fill_rate": 1 - g["total_shortage"] / g["total_demand"].where(g["total_demand"] > 0),
+        "avg_ss": g["ss_total"] / g["n_rows"],
+        "total_shortage": g["total_shortage"],
+        "total_excess": g["total_excess"],
+    })
+    summary["csl_gap"] = summary["achieved_csl"] - summary["target_service_level"]
+    order = (summary["total_shortage"] + summary["total_excess"]).sort_values().index
+    return summary.loc[order].reset_index()
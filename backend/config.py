@@ -19,6 +19,31 @@ ONLY_RULE_BASED = False
 ONLY_ML_BASED = False
 BOTH_RULE_ML = False
 
+# ML settings
+ML_N_JOBS = 1          # worker processes for per-group model fits (-1 = all cores)
+ML_MODE = "per_group"  # "per_group" (one forest per group) or "pooled" (one global forest)
+ML_MODEL_CACHE_DIR = None               # directory for fitted-model cache (None = disabled)
+ML_MODEL_CACHE_MAX_BYTES = 1024 ** 3    # LRU eviction bound for the model cache
+
+# Bayesian method (needs past data; adds 'bayesian_ss' alongside ml_ss/rule_ss)
+BAYESIAN_SS = False
+
+# Run reports (per-stage timings from backend.instrumentation)
+RUN_REPORT_DIR = None  # directory to write one JSON report per run_pipeline call (None = keep in memory only)
+RESULTS_DB_PATH = "data/output/results.db"  # SQLite results store used by the Streamlit pages (None = temporary file)
+RESULTS_DB_MAX_RUNS = 8  # runs kept in the results store; older ones are deleted when a new run is written
+
+# Result export (run_pipeline / run_pipeline_sharded)
+EXPORT_PATH = None              # file to write the results to (None = no export)
+EXPORT_FORMAT = None            # "csv", "parquet" or "xlsx" (None = from the EXPORT_PATH extension)
+EXPORT_IN_BACKGROUND = False    # write on a background thread (see backend.export.exporters.wait_for_exports)
+
+# Service-level optimization
+OPTIMIZE_SERVICE_LEVEL = False  # pick a cost-minimizing service level per sku/location for rule SS
+SL_SIGMA_METHOD = "rule"        # "rule", "rmse" or "hybrid" (rmse/hybrid need past data)
+SL_HOLDING_COST = 1.0           # default holding cost per unit (column 'holding_cost' overrides)
+SL_SHORTAGE_COST = 10.0         # default shortage cost per unit (column 'shortage_cost' overrides)
+
 
 def set_config_flags(has_past: bool, method_choice: str):
     """Update global config flags from Intro page selection."""
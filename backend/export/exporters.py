@@ -0,0 +1,192 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+EXPORT_FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".xlsx": "xlsx",
+}
+
+# Rows per write batch (CSV/Parquet); bounds the memory of the text/arrow conversion
+EXPORT_CHUNK_ROWS = 250_000
+# Excel sheets hold 1,048,576 rows including the header
+XLSX_MAX_ROWS = 1_048_575
+
+# Format name -> writer(frames, path) where frames is an iterable of DataFrames
+EXPORTERS = {}
+
+
+def register_exporter(name: str):
+    """Decorator adding a writer to EXPORTERS under the given format name."""
+    def decorator(fn):
+        EXPORTERS[name] = fn
+        return fn
+    return decorator
+
+
+def detect_export_format(path: str) -> str:
+    ext = os.path.splitext(str(path))[1].lower()
+    if ext not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export file type: {path!r} (expected one of {sorted(EXPORT_FORMATS)})")
+    return EXPORT_FORMATS[ext]
+
+
+def iter_frame_chunks(df: pd.DataFrame, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Yield consecutive row slices of df (views, no copies)."""
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def _replace_atomically(write, path: str) -> None:
+    """Write to a temporary sibling and rename, so readers never see a partial file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{threading.get_ident()}.tmp")
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@register_exporter("csv")
+def write_csv(frames, path: str) -> int:
+    """Stream frames to one CSV file (header from the first frame)."""
+    rows = 0
+
+    def write(tmp_path):
+        nonlocal rows
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            for frame in frames:
+                frame.to_csv(f, index=False, header=rows == 0)
+                rows += len(frame)
+
+    _replace_atomically(write, path)
+    return rows
+
+
+@register_exporter("parquet")
+def write_parquet(frames, path: str) -> int:
+    """Stream frames into one Parquet file, one row group per frame."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows = 0
+
+    def write(tmp_path):
+        nonlocal rows
+        writer = None
+        try:
+            for frame in frames:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema)
+                else:
+                    # Categorical dictionaries can differ between chunks
+                    table = table.cast(writer.schema)
+                writer.write_table(table)
+                rows += len(frame)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            pq.write_table(pa.table({}), tmp_path)
+
+    _replace_atomically(write, path)
+    return rows
+
+
+@register_exporter("xlsx")
+def write_xlsx(frames, path: str) -> int:
+    """
+    Write frames to a single sheet with openpyxl's write-only mode.
+
+    Write-only workbooks stream rows to disk instead of building the cell tree, which is
+    several times faster than DataFrame.to_excel; still meant for small outputs.
+    """
+    from openpyxl import Workbook
+
+    rows = 0
+
+    def write(tmp_path):
+        nonlocal rows
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("results")
+        for frame in frames:
+            if rows == 0:
+                ws.append([str(c) for c in frame.columns])
+            if rows + len(frame) > XLSX_MAX_ROWS:
+                raise ValueError(f"Too many rows for an xlsx sheet (limit {XLSX_MAX_ROWS}); export CSV or Parquet")
+            values = frame.astype(object).where(frame.notna(), None)
+            for row in values.itertuples(index=False, name=None):
+                ws.append(row)
+            rows += len(frame)
+        wb.save(tmp_path)
+
+    _replace_atomically(write, path)
+    return rows
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = []
+
+
+def _background_executor() -> ThreadPoolExecutor:
+    # One writer thread: exports run in submission order and never compete for disk
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+        return _executor
+
+
+def export_results(data, path: str, file_format: str | None = None, background: bool = False,
+                   chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """
+    Write pipeline results with one of the registered exporters.
+
+    Args:
+        data (pd.DataFrame | iterable of pd.DataFrame): Results, or chunks of results
+            (e.g. ResultsStore.iter_query) to stream without materializing the whole run
+        path (str): Output file (replaced atomically)
+        file_format (str, optional): Key of EXPORTERS (default: from the file extension)
+        background (bool): Write on the export thread and return a Future immediately.
+            The frame must not be modified until the Future is done.
+        chunk_rows (int): Rows per write batch when data is a DataFrame
+
+    Returns:
+        int | Future: Number of rows written (a Future of it when background=True)
+    """
+    file_format = file_format or detect_export_format(path)
+    if file_format not in EXPORTERS:
+        raise ValueError(f"Unknown export format {file_format!r} (expected one of {sorted(EXPORTERS)})")
+    writer = EXPORTERS[file_format]
+    frames = iter_frame_chunks(data, chunk_rows) if isinstance(data, pd.DataFrame) else data
+
+    if not background:
+        return writer(frames, path)
+
+    future = _background_executor().submit(writer, frames, path)
+    with _executor_lock:
+        _pending[:] = [f for f in _pending if not f.done()]
+        _pending.append(future)
+    return future
+
+
+def wait_for_exports(timeout: float | None = None) -> list:
+    """
+    Block until every background export submitted so far has finished.
+
+    Returns:
+        list: Row counts of the finished exports (re-raises the first export error)
+    """
+    with _executor_lock:
+        pending = list(_pending)
+        _pending.clear()
+    return [future.result(timeout=timeout) for future in pending]
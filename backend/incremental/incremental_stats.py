@@ -0,0 +1,266 @@
+import os
+import tempfile
+
+import pandas as pd
+import numpy as np
+from scipy.stats import norm
+
+from backend.accuracy.group_statistics import (
+    GROUP_KEYS,
+    SUM_COLUMNS,
+    SHIFT_COLUMNS,
+    UNSHIFTED_COLUMNS,
+    aggregate_group_sums,
+    combine_group_sums,
+    derive_group_statistics,
+    broadcast_to_rows,
+)
+from backend.accuracy.metrics_calculator import METRIC_GROUP_KEYS, derive_accuracy_metrics
+from backend.modules.batch_engine import BATCH_SS_COLUMNS, compute_error_based_safety_stock
+from backend.modules.bayesian import bayesian_sigma_for_rows
+from backend.preprocessing.data_loader import _HAS_PYARROW
+from backend.modules.rule_based import _as_float_array
+from backend.instrumentation import stage
+
+# Per-group bookkeeping stored next to the sums
+META_COLUMNS = ["last_date", "lead_time", "service_level"]
+
+
+class GroupStatsStore:
+    """
+    Running per-group sufficient statistics (SUM_COLUMNS + SHIFT_COLUMNS of aggregate_group_sums) on disk.
+
+    The sums are additive, so a daily delta of aligned rows is aggregated on its own and
+    added to the stored sums (combine_group_sums keeps the stored shifts): the cost of an update depends on the delta, not on the
+    history. Each group also keeps the last date it has seen; delta rows dated on or
+    before it are skipped so a re-sent day is not counted twice (restated history needs
+    rebuild()). lead_time / service_level hold the first value seen per group, like
+    calculate_grouped_accuracy_metrics.
+
+    The table is one Parquet file (pickle without pyarrow) replaced atomically on save.
+    """
+
+    def __init__(self, store_dir: str, group_keys=None):
+        self.store_dir = store_dir
+        self.group_keys = list(group_keys or GROUP_KEYS)
+        self.path = os.path.join(store_dir, "group_sums.parquet" if _HAS_PYARROW else "group_sums.pkl")
+        os.makedirs(store_dir, exist_ok=True)
+        self._sums = None
+
+    def _empty(self) -> pd.DataFrame:
+        index = pd.MultiIndex.from_arrays([[]] * len(self.group_keys), names=self.group_keys)
+        df = pd.DataFrame({col: pd.Series(dtype="float64") for col in SUM_COLUMNS + SHIFT_COLUMNS}, index=index)
+        df["last_date"] = pd.Series(dtype="datetime64[ns]")
+        df["lead_time"] = pd.Series(dtype="float64")
+        df["service_level"] = pd.Series(dtype="float64")
+        return df
+
+    def load(self) -> pd.DataFrame:
+        """Stored sums indexed by the group keys (empty frame for a new store)."""
+        if self._sums is None:
+            if not os.path.exists(self.path):
+                self._sums = self._empty()
+            elif _HAS_PYARROW:
+                self._sums = pd.read_parquet(self.path).set_index(self.group_keys)
+            else:
+                self._sums = pd.read_pickle(self.path)
+            for col in SHIFT_COLUMNS:
+                if col not in self._sums.columns:  # stores written before the shifts held raw sums
+                    self._sums[col] = 0.0
+        return self._sums
+
+    def save(self) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, suffix=".tmp")
+        os.close(fd)
+        sums = self.load()
+        if _HAS_PYARROW:
+            frame = sums.reset_index()
+            for key in self.group_keys:
+                frame[key] = frame[key].astype(str)
+            frame.to_parquet(tmp_path, index=False)
+        else:
+            sums.to_pickle(tmp_path)
+        os.replace(tmp_path, self.path)
+
+    def _delta_sums(self, aligned_delta: pd.DataFrame) -> pd.DataFrame:
+        delta = aligned_delta.copy()
+        for key in self.group_keys:
+            delta[key] = delta[key].astype(str)
+        delta["date"] = pd.to_datetime(delta["date"], errors="coerce")
+        grouped = delta.groupby(self.group_keys, sort=False, dropna=False, observed=True)
+        sums = aggregate_group_sums(delta, self.group_keys)
+        sums["last_date"] = grouped["date"].max().reindex(sums.index)
+        for col in ["lead_time", "service_level"]:
+            values = pd.to_numeric(delta[col], errors="coerce") if col in delta.columns else np.nan
+            sums[col] = pd.Series(values, index=delta.index).groupby(
+                [delta[k] for k in self.group_keys], sort=False, dropna=False, observed=True
+            ).first().reindex(sums.index)
+        return sums
+
+    def apply_delta(self, aligned_delta: pd.DataFrame) -> dict:
+        """
+        Add a delta of aligned rows (align_forecast_to_actual output) to the stored sums and save.
+
+        Returns:
+            dict: 'touched' (index of updated groups), 'rows' (rows applied),
+                'skipped' (rows dated on or before their group's last seen date)
+        """
+        stored = self.load()
+        delta = aligned_delta
+        skipped = 0
+        if len(stored):
+            lookup = pd.MultiIndex.from_arrays([aligned_delta[k].astype(str) for k in self.group_keys])
+            positions = stored.index.get_indexer(lookup)
+            last_seen = np.full(len(aligned_delta), np.datetime64("NaT"), dtype="datetime64[ns]")
+            found = positions >= 0
+            last_seen[found] = stored["last_date"].to_numpy(dtype="datetime64[ns]")[positions[found]]
+            dates = pd.to_datetime(aligned_delta["date"], errors="coerce").to_numpy(dtype="datetime64[ns]")
+            stale = found & ~np.isnat(last_seen) & (dates <= last_seen)
+            skipped = int(stale.sum())
+            delta = aligned_delta.loc[~stale]
+
+        if delta.empty:
+            return {"touched": stored.index[:0], "rows": 0, "skipped": skipped}
+
+        delta_sums = self._delta_sums(delta)
+        merged = stored.reindex(stored.index.union(delta_sums.index, sort=False))
+        touched = delta_sums.index
+        columns = SUM_COLUMNS + SHIFT_COLUMNS
+        merged.loc[touched, columns] = combine_group_sums(
+            merged.loc[touched, columns], delta_sums[columns]
+        ).to_numpy()
+        merged.loc[touched, "last_date"] = np.maximum(
+            merged.loc[touched, "last_date"].fillna(pd.Timestamp.min).to_numpy(dtype="datetime64[ns]"),
+            delta_sums["last_date"].to_numpy(dtype="datetime64[ns]"),
+        )
+        for col in ["lead_time", "service_level"]:
+            merged.loc[touched, col] = merged.loc[touched, col].fillna(delta_sums[col])
+        self._sums = merged
+        self.save()
+        return {"touched": touched, "rows": len(delta), "skipped": skipped}
+
+    def rebuild(self, aligned_df: pd.DataFrame) -> None:
+        """Replace the stored sums with a full aggregation of aligned_df."""
+        self._sums = self._empty()
+        self.apply_delta(aligned_df)
+
+
+def accuracy_metrics_from_store(store: GroupStatsStore, group_keys=None, touched=None) -> pd.DataFrame:
+    """
+    calculate_grouped_accuracy_metrics computed from the stored sums instead of the history.
+
+    Sums are rolled up to group_keys (default: sku_id, echelon_type) by adding the error sums; with
+    `touched` only the metric groups containing a touched store group are returned.
+    """
+    group_keys = list(group_keys or METRIC_GROUP_KEYS)
+    sums = store.load()
+    if touched is not None:
+        touched_keys = touched.droplevel([k for k in touched.names if k not in group_keys]).unique()
+        rolled_keys = sums.index.droplevel([k for k in sums.index.names if k not in group_keys])
+        sums = sums[rolled_keys.isin(touched_keys)]
+
+    grouped = sums.groupby(level=group_keys, sort=False)
+    metrics = derive_accuracy_metrics(grouped[UNSHIFTED_COLUMNS].sum())
+    metrics.insert(0, "lead_time", grouped["lead_time"].first().reindex(metrics.index))
+    metrics.insert(1, "service_level", grouped["service_level"].first().reindex(metrics.index))
+    return metrics.sort_index().reset_index()
+
+
+def _match_previous_rows(previous: pd.DataFrame, rows_df: pd.DataFrame, group_keys: list) -> np.ndarray:
+    """Position of each row of rows_df in previous by group keys plus 'date' (-1 if absent)."""
+    match_keys = list(group_keys) + ["date"]
+    for df, name in ((previous, "previous"), (rows_df, "future_forecast_df")):
+        missing = [k for k in match_keys if k not in df.columns]
+        if missing:
+            raise ValueError(f"Missing key columns in {name}: {missing}")
+
+    def _keys(df):
+        cols = {k: df[k].astype(str).to_numpy() for k in group_keys}
+        cols["date"] = pd.to_datetime(df["date"], errors="coerce").to_numpy()
+        return pd.MultiIndex.from_frame(pd.DataFrame(cols))
+
+    previous_keys = _keys(previous)
+    if not previous_keys.is_unique:
+        raise ValueError("previous has duplicate rows for the same group and date")
+    return previous_keys.get_indexer(_keys(rows_df))
+
+
+def refresh_safety_stock(store: GroupStatsStore, future_forecast_df: pd.DataFrame, previous: pd.DataFrame | None = None,
+                         touched=None, include_bayesian: bool = False) -> pd.DataFrame:
+    """
+    RMSE/MAE/hybrid (and optionally Bayesian) safety stock from the stored sums.
+
+    With `previous` (an earlier output, e.g. for yesterday's horizon) and `touched`, rows are
+    matched to `previous` by the group keys plus 'date'. Matched rows of untouched groups
+    keep their previous values; rows of touched groups and rows that are new to the horizon
+    are recomputed. Without them every row is computed. Either way the history is not read.
+
+    Returns:
+        pd.DataFrame: Copy of future_forecast_df with BATCH_SS_COLUMNS (and 'bayesian_ss')
+    """
+    sums = store.load()
+    out = future_forecast_df.copy()
+    row_keys = pd.DataFrame({k: out[k].astype(str).to_numpy() for k in store.group_keys}, index=out.index)
+
+    rows = np.ones(len(out), dtype=bool)
+    ss_columns = BATCH_SS_COLUMNS + (["bayesian_ss"] if include_bayesian else [])
+    if previous is not None and touched is not None and all(c in previous.columns for c in ss_columns):
+        positions = _match_previous_rows(previous, out, store.group_keys)
+        found = positions >= 0
+        lookup = pd.MultiIndex.from_frame(row_keys)
+        in_touched = touched.get_indexer(lookup) >= 0 if len(touched) else np.zeros(len(out), dtype=bool)
+        rows = in_touched | ~found
+        for col in ss_columns:
+            values = np.full(len(out), np.nan)
+            values[found] = pd.to_numeric(previous[col], errors="coerce").to_numpy(
+                dtype="float64", na_value=np.nan)[positions[found]]
+            out[col] = values
+
+    if not rows.any():
+        return out
+
+    subset = out.loc[rows]
+    subset_keys = row_keys.loc[rows]
+    stats = broadcast_to_rows(derive_group_statistics(sums[SUM_COLUMNS + SHIFT_COLUMNS]), subset_keys)
+    values = compute_error_based_safety_stock(stats, subset["lead_time"], subset["service_level"])
+    for col in BATCH_SS_COLUMNS:
+        if col not in out.columns:
+            out[col] = np.nan
+        out.loc[rows, col] = values[col]
+
+    if include_bayesian:
+        sigma = bayesian_sigma_for_rows(sums[SUM_COLUMNS + SHIFT_COLUMNS], subset_keys)
+        with np.errstate(invalid="ignore"):
+            bayesian = norm.ppf(_as_float_array(subset["service_level"])) * sigma \
+                * np.sqrt(_as_float_array(subset["lead_time"]))
+        if "bayesian_ss" not in out.columns:
+            out["bayesian_ss"] = np.nan
+        out.loc[rows, "bayesian_ss"] = np.round(bayesian, 2)
+    return out
+
+
+def run_incremental_update(store: GroupStatsStore, aligned_delta: pd.DataFrame, future_forecast_df: pd.DataFrame,
+                           previous: pd.DataFrame | None = None, include_bayesian: bool = False) -> dict:
+    """
+    Daily refresh: fold a delta into the store, then update metrics and SS of the touched groups.
+
+    ML models are not refitted here; with config.ML_MODEL_CACHE_DIR set, groups whose
+    training rows did not change load their cached model in the next full ML run.
+
+    Returns:
+        dict: 'touched', 'rows', 'skipped' (see GroupStatsStore.apply_delta), 'metrics'
+            (accuracy metrics of the touched metric groups) and 'safety_stock'
+    """
+    with stage("incremental_apply_delta", rows_in=aligned_delta) as record:
+        update = store.apply_delta(aligned_delta)
+        record["rows_out"] = len(update["touched"])
+    with stage("incremental_metrics") as record:
+        update["metrics"] = accuracy_metrics_from_store(store, touched=update["touched"])
+        record["rows_out"] = len(update["metrics"])
+    with stage("incremental_safety_stock", rows_in=future_forecast_df) as record:
+        update["safety_stock"] = refresh_safety_stock(
+            store, future_forecast_df, previous=previous, touched=update["touched"],
+            include_bayesian=include_bayesian,
+        )
+        record["rows_out"] = len(update["safety_stock"])
+    return update
@@ -0,0 +1,230 @@
+import contextvars
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # not available on Windows; peak RSS is then reported as None
+    resource = None
+
+_active_report = contextvars.ContextVar("active_run_report", default=None)
+_stage_path = contextvars.ContextVar("stage_path", default=())
+# Traced-allocation peaks of the open stages (innermost last). tracemalloc has a single peak
+# counter, so each stage resets it on entry after saving it into its parent's frame, and
+# hands its own peak back to the parent on exit.
+_open_peaks = contextvars.ContextVar("open_stage_peaks", default=())
+_last_report = None
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _rss_bytes():
+    """Current resident set size (Linux /proc), or None where unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _peak_rss_bytes():
+    """Process high-water RSS from getrusage, or None where unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # macOS reports bytes, Linux KiB
+
+
+def _row_count(obj):
+    """Rows of a DataFrame/array/sequence, summed over tuples (e.g. the cleaner's 3 frames)."""
+    if obj is None:
+        return None
+    if isinstance(obj, tuple):
+        counts = [_row_count(o) for o in obj]
+        counts = [c for c in counts if c is not None]
+        return sum(counts) if counts else None
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+
+class RunReport:
+    """
+    Structured timings of one pipeline run.
+
+    stages: one record per instrumented stage (nested stages carry their parent path)
+    group_fits: one record per per-group model fit (rows, seconds, cache hit)
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.wall_s = None
+        self._t0 = time.perf_counter()
+        self.stages = []
+        self.group_fits = []
+
+    def add_group_fits(self, records) -> None:
+        self.group_fits.extend(records)
+
+    def group_fit_summary(self) -> dict:
+        seconds = sorted(r["seconds"] for r in self.group_fits)
+        if not seconds:
+            return {"fits": 0}
+        return {
+            "fits": len(seconds),
+            "total_s": sum(seconds),
+            "median_s": seconds[len(seconds) // 2],
+            "max_s": seconds[-1],
+            "cache_hits": sum(1 for r in self.group_fits if r.get("cache_hit")),
+            "slowest": sorted(self.group_fits, key=lambda r: r["seconds"], reverse=True)[:10],
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "wall_s": self.wall_s,
+            "stages": self.stages,
+            "group_fits": self.group_fit_summary(),
+        }
+
+    def to_json(self, path: str | None = None) -> str:
+        text = json.dumps(self.to_dict(), indent=2, default=str)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
+
+
+@contextmanager
+def run_report(name: str = "pipeline"):
+    """
+    Collect every stage() and group fit inside the block into a RunReport.
+
+    Usage:
+        with run_report("run_pipeline") as report:
+            ...
+        report.to_json("run.json")
+    """
+    global _last_report
+    report = RunReport(name)
+    token = _active_report.set(report)
+    path_token = _stage_path.set(())
+    peaks_token = _open_peaks.set(())
+    start = time.perf_counter()
+    try:
+        yield report
+    finally:
+        report.wall_s = time.perf_counter() - start
+        _open_peaks.reset(peaks_token)
+        _stage_path.reset(path_token)
+        _active_report.reset(token)
+        _last_report = report
+
+
+def current_report():
+    """The RunReport of the enclosing run_report() block, or None."""
+    return _active_report.get()
+
+
+def last_run_report():
+    """The most recently finished RunReport in this process, or None."""
+    return _last_report
+
+
+@contextmanager
+def stage(name: str, rows_in=None):
+    """
+    Time one pipeline stage: wall and CPU time, rows in/out, RSS and peak-RSS deltas,
+    plus the traced allocation peak when tracemalloc is already running.
+
+    Outside a run_report() block this only yields a scratch dict, so instrumented code
+    costs next to nothing when no report is being collected. Set record["rows_out"]
+    inside the block to report output rows.
+    """
+    report = _active_report.get()
+    record = {"stage": name, "rows_in": _row_count(rows_in), "rows_out": None}
+    if report is None:
+        yield record
+        return
+
+    path = _stage_path.get() + (name,)
+    path_token = _stage_path.set(path)
+    rss_before, peak_before = _rss_bytes(), _peak_rss_bytes()
+    tracing = tracemalloc.is_tracing()
+    parents = _open_peaks.get()
+    frame = {"peak": 0}
+    if tracing:
+        traced_before, traced_peak = tracemalloc.get_traced_memory()
+        if parents:
+            parents[-1]["peak"] = max(parents[-1]["peak"], traced_peak)
+        tracemalloc.reset_peak()
+        frame["peak"] = traced_before
+    peaks_token = _open_peaks.set(parents + (frame,))
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    error = None
+    try:
+        yield record
+    except BaseException as exc:
+        error = type(exc).__name__
+        raise
+    finally:
+        record.update({
+            "path": "/".join(path),
+            "start_s": wall_start - report._t0,
+            "wall_s": time.perf_counter() - wall_start,
+            "cpu_s": time.process_time() - cpu_start,
+        })
+        rss_after, peak_after = _rss_bytes(), _peak_rss_bytes()
+        record["rss_delta_mb"] = (rss_after - rss_before) / 1024 ** 2 if rss_before is not None else None
+        record["peak_rss_mb"] = peak_after / 1024 ** 2 if peak_after is not None else None
+        record["peak_rss_growth_mb"] = (peak_after - peak_before) / 1024 ** 2 if peak_before is not None else None
+        if tracing and tracemalloc.is_tracing():
+            own_peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+            record["alloc_peak_mb"] = (own_peak - traced_before) / 1024 ** 2
+            if parents:
+                parents[-1]["peak"] = max(parents[-1]["peak"], own_peak)
+        if error:
+            record["error"] = error
+        _open_peaks.reset(peaks_token)
+        _stage_path.reset(path_token)
+        report.stages.append(record)
+
+
+def instrumented(name: str | None = None):
+    """
+    Decorator form of stage(): rows_in is the length of the first argument, rows_out
+    the length of the return value (summed over tuples).
+    """
+    def decorator(fn):
+        stage_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _active_report.get() is None:
+                return fn(*args, **kwargs)
+            first = args[0] if args else next(iter(kwargs.values()), None)
+            with stage(stage_name, rows_in=first) as record:
+                result = fn(*args, **kwargs)
+                record["rows_out"] = _row_count(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def record_group_fits(records) -> None:
+    """Attach per-group model fit records to the active report (no-op without one)."""
+    report = _active_report.get()
+    if report is not None:
+        report.add_group_fits(records)
@@ -2,8 +2,13 @@
 import pandas as pd
 import backend.config as config  # import module, not constants
 
-from backend.modules.rule_based import calculate_rule_based_safety_stock_df
-from backend.modules.ml_based import calculate_ml_based_safety_stock
+from backend.modules.rule_based import calculate_rule_based_safety_stock
+from backend.modules.ml_based import predict_ml_based_safety_stock
+from backend.modules.model_cache import get_model_cache
+from backend.modules.bayesian import predict_bayesian_safety_stock
+from backend.preprocessing.forecast_aligner import align_forecast_to_actual
+from backend.optimization.service_level_optimizer import lead_time_sigma, assign_optimal_service_level
+from backend.instrumentation import stage
 
 KEYS = ["sku_id", "location_id", "echelon_type", "date"]
 
@@ -14,35 +19,64 @@ def run_safety_stock_selector(
     cleaned_actual: pd.DataFrame | None = None,
     cleaned_forecast: pd.DataFrame | None = None,
 ) -> pd.DataFrame:
-    """Selector that dynamically respects config flags."""
+    """
+    Selector that dynamically respects config flags.
+
+    Every method returns an array aligned row-for-row with cleaned_future_forecast,
+    so results are attached by position: no key merges and no per-method frame copies.
+    """
     if cleaned_future_forecast is None or cleaned_future_forecast.empty:
         return pd.DataFrame()
 
-    out = cleaned_future_forecast.copy()
+    for col in KEYS + ["forecast", "lead_time", "service_level"]:
+        if col not in cleaned_future_forecast.columns:
+            raise ValueError(f"Missing required column in future_forecast_df: {col}")
+
+    # Shallow copy: new columns go into `out` without duplicating the input's data
+    out = cleaned_future_forecast.copy(deep=False)
     has_past = bool(PAST_SALES_DATA_AVAILABLE and PAST_FORECAST_DATA_AVAILABLE)
 
-    ml_part = None
-    rule_part = None
+    # --- Service-level optimization (optional) ---
+    service_level = cleaned_future_forecast["service_level"]
+    if config.OPTIMIZE_SERVICE_LEVEL:
+        sigma_method = config.SL_SIGMA_METHOD if has_past else "rule"
+        aligned = None
+        if sigma_method != "rule":
+            aligned = align_forecast_to_actual(cleaned_forecast, cleaned_actual)  # instrumented stage
+        with stage("optimize_service_level", rows_in=cleaned_future_forecast) as record:
+            out["optimal_service_level"] = assign_optimal_service_level(
+                cleaned_future_forecast,
+                lead_time_sigma(cleaned_future_forecast, aligned, method=sigma_method),
+                holding_cost=config.SL_HOLDING_COST,
+                shortage_cost=config.SL_SHORTAGE_COST,
+            )
+            record["rows_out"] = len(out)
+        service_level = out["optimal_service_level"].fillna(service_level)
 
     # --- ML path ---
     if has_past and (config.ONLY_ML_BASED or config.BOTH_RULE_ML):
-        ml_df = calculate_ml_based_safety_stock(cleaned_actual, cleaned_forecast, cleaned_future_forecast)
-        if "Safety_Stock" in ml_df.columns and "ml_ss" not in ml_df.columns:
-            ml_df = ml_df.rename(columns={"Safety_Stock": "ml_ss"})
-        if "ml_ss" in ml_df.columns:
-            ml_part = ml_df[KEYS + ["ml_ss"]]
+        model_cache = (
+            get_model_cache(config.ML_MODEL_CACHE_DIR, config.ML_MODEL_CACHE_MAX_BYTES)
+            if config.ML_MODEL_CACHE_DIR else None
+        )
+        with stage("ml_based", rows_in=cleaned_future_forecast) as record:
+            out["ml_ss"] = predict_ml_based_safety_stock(
+                cleaned_actual, cleaned_forecast, cleaned_future_forecast,
+                n_jobs=config.ML_N_JOBS, mode=config.ML_MODE, model_cache=model_cache
+            )
+            record["rows_out"] = len(out)
+
+    # --- Bayesian path (optional) ---
+    if has_past and config.BAYESIAN_SS:
+        with stage("bayesian", rows_in=cleaned_future_forecast) as record:
+            out["bayesian_ss"] = predict_bayesian_safety_stock(cleaned_actual, cleaned_forecast, cleaned_future_forecast)
+            record["rows_out"] = len(out)
 
     # --- Rule path ---
     if (not has_past) or config.ONLY_RULE_BASED or config.BOTH_RULE_ML:
-        rule_df = calculate_rule_based_safety_stock_df(cleaned_future_forecast)
-        if "rule_ss" in rule_df.columns:
-            rule_part = rule_df[KEYS + ["rule_ss"]]
-
-    # --- Merge parts ---
-    if ml_part is not None:
-        out = out.merge(ml_part, on=KEYS, how="left")
-    if rule_part is not None:
-        out = out.merge(rule_part, on=KEYS, how="left")
+        with stage("rule_based", rows_in=cleaned_future_forecast) as record:
+            out["rule_ss"] = calculate_rule_based_safety_stock(cleaned_future_forecast, service_level=service_level)
+            record["rows_out"] = len(out)
 
     # --- final_ss (convenience) ---
     if config.BOTH_RULE_ML:
@@ -1,75 +1,210 @@
-# import pandas as pd
-# import numpy as np
-# import pymc as pm
-# import arviz as az
-# from scipy.stats import norm
-
-# def calculate_bayesian_safety_stock(past_sales_df, past_forecast_df, future_forecast_df, service_level=0.9, draws=2000, tune=1000):
-#     """
-#     Bayesian hierarchical model to estimate safety stock per SKU-location-echelon-date.
-
-#     Args:
-#         past_sales_df (pd.DataFrame): Historical actual sales—must include sku_id, location_id, echelon_type, date, actual
-#         past_forecast_df (pd.DataFrame): Historical forecast—must include sku_id, location_id, echelon_type, date, forecast
-#         future_forecast_df (pd.DataFrame): Data to produce safety stock for, must include sku_id, location_id, echelon_type, date, forecast, lead_time
-#         service_level (float): Desired service level (default 0.9)
-#         draws (int): Number of posterior samples to draw
-#         tune (int): Number of tuning steps
-
-#     Returns:
-#         pd.DataFrame: future_forecast_df with new column 'bayesian_safety_stock'
-#     """
-
-#     # Merge past actual and forecast to compute historical errors
-#     merge_keys = ['sku_id', 'location_id', 'echelon_type', 'date']
-#     past = pd.merge(past_sales_df, past_forecast_df, on=merge_keys, suffixes=('_act', '_fcst'))
-#     past['error'] = past['actual'] - past['forecast']
-
-#     # Prepare an output column in future forecasts
-#     future_forecast_df = future_forecast_df.copy()
-#     future_forecast_df['bayesian_safety_stock'] = np.nan
-
-#     # Calculate z-score for service level
-#     z = norm.ppf(service_level)
-
-#     # Process each SKU-location-echelon group independently
-#     groups = past.groupby(['sku_id', 'location_id', 'echelon_type'])
-
-#     for (sku, loc, echelon), group in groups:
-#         errors = group['error'].values
-
-#         if len(errors) < 5:
-#             # Not enough data to reliably estimate variability; fallback to zero or simple rule
-#             # Fill safety stock with zeros or a fallback value
-#             future_rows = future_forecast_df[
-#                 (future_forecast_df['sku_id'] == sku) & 
-#                 (future_forecast_df['location_id'] == loc) &
-#                 (future_forecast_df['echelon_type'] == echelon)
-#             ]
-#             future_forecast_df.loc[future_rows.index, 'bayesian_safety_stock'] = 0.0
-#             continue
-
-#         # Bayesian model: assume errors ~ Normal(mu, sigma), mu ~ Normal(0, 5), sigma ~ HalfNormal(5)
-#         with pm.Model() as model:
-#             mu = pm.Normal('mu', mu=0, sigma=5)
-#             sigma = pm.HalfNormal('sigma', sigma=5)
-#             obs = pm.Normal('obs', mu=mu, sigma=sigma, observed=errors)
-
-#             trace = pm.sample(draws=draws, tune=tune, chains=2, target_accept=0.9, progressbar=False, random_seed=42)
-
-#         # Extract posterior sigma (variability) estimate as mean of samples
-#         posterior_sigma = np.mean(trace.posterior['sigma'].values)
-
-#         # Calculate safety stock per corresponding future forecast row using formula Z*sigma*sqrt(lead_time)
-#         future_rows = future_forecast_df[
-#             (future_forecast_df['sku_id'] == sku) & 
-#             (future_forecast_df['location_id'] == loc) &
-#             (future_forecast_df['echelon_type'] == echelon)
-#         ]
-
-#         for idx, row in future_rows.iterrows():
-#             lead_time = row['lead_time']
-#             safety_stock = z * posterior_sigma * np.sqrt(lead_time)
-#             future_forecast_df.at[idx, 'bayesian_safety_stock'] = round(safety_stock, 2)
-
-#     return future_forecast_df
+import pandas as pd
+import numpy as np
+from scipy.stats import norm
+
+from backend.accuracy.group_statistics import (
+    GROUP_KEYS,
+    aggregate_group_sums,
+    broadcast_to_rows,
+)
+from backend.modules.rule_based import _as_float_array
+
+POOL_KEY = "echelon_type"
+
+# Bounds on the prior strength so a degenerate echelon (identical or wildly
+# different groups) neither overrides the data nor makes the prior improper
+MIN_ALPHA0 = 2.0 + 1e-3
+MAX_ALPHA0 = 1e3
+MIN_KAPPA0 = 1e-3
+MAX_KAPPA0 = 1e3
+# Prior used when an echelon has fewer than two groups with history
+FALLBACK_ALPHA0 = 3.0
+FALLBACK_KAPPA0 = 1.0
+
+
+def _moments(sums: pd.DataFrame) -> pd.DataFrame:
+    """Per-group n, mean error and population variance of the error from additive sums."""
+    n = sums["n_err"].to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(n > 0, sums["sum_err"].to_numpy() / n, np.nan)
+        var = np.where(n > 0, sums["sum_sq_err"].to_numpy() / n - mean ** 2, np.nan)
+    return pd.DataFrame({"n": n, "mean": mean, "var": np.clip(var, 0.0, None)}, index=sums.index)
+
+
+def estimate_pooled_priors(sums: pd.DataFrame, pool_key: str = POOL_KEY) -> pd.DataFrame:
+    """
+    Empirical-Bayes Normal-Inverse-Gamma prior per pool (echelon) by the method of moments.
+
+    sigma^2 ~ InvGamma(alpha0, beta0) is matched to the mean and between-group variance of
+    the groups' error variances (sampling noise removed); mu | sigma^2 ~ N(m0, sigma^2 / kappa0)
+    to the mean and between-group variance of the groups' mean errors.
+
+    Args:
+        sums (pd.DataFrame): Output of aggregate_group_sums (index must contain pool_key)
+        pool_key (str): Index level that defines the pools
+
+    Returns:
+        pd.DataFrame: One row per pool with 'm0', 'kappa0', 'alpha0', 'beta0'
+    """
+    mom = _moments(sums)
+    mom = mom[mom["n"] >= 2]
+    mom["var_noise"] = 2 * mom["var"] ** 2 / (mom["n"] - 1)  # sampling variance of a variance estimate
+    mom["mean_noise"] = mom["var"] / mom["n"]                # sampling variance of a mean estimate
+
+    pools = mom.groupby(level=pool_key, sort=False, dropna=False, observed=True)
+    agg = pd.DataFrame({
+        "groups": pools["var"].count(),
+        "var_mean": pools["var"].mean(),
+        "var_between": pools["var"].var(ddof=1) - pools["var_noise"].mean(),
+        "m0": pools["mean"].mean(),
+        "mean_between": pools["mean"].var(ddof=1) - pools["mean_noise"].mean(),
+    })
+
+    pooled = agg["groups"].to_numpy() >= 2
+    var_mean = agg["var_mean"].to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        alpha0 = np.where(
+            agg["var_between"].to_numpy() > 0,
+            2.0 + var_mean ** 2 / agg["var_between"].to_numpy(),
+            MAX_ALPHA0,
+        )
+        kappa0 = np.where(
+            agg["mean_between"].to_numpy() > 0,
+            var_mean / agg["mean_between"].to_numpy(),
+            MAX_KAPPA0,
+        )
+    alpha0 = np.where(pooled, np.clip(np.nan_to_num(alpha0, nan=MAX_ALPHA0), MIN_ALPHA0, MAX_ALPHA0), FALLBACK_ALPHA0)
+    kappa0 = np.where(pooled, np.clip(np.nan_to_num(kappa0, nan=MAX_KAPPA0), MIN_KAPPA0, MAX_KAPPA0), FALLBACK_KAPPA0)
+
+    return pd.DataFrame({
+        "m0": agg["m0"].to_numpy(),
+        "kappa0": kappa0,
+        "alpha0": alpha0,
+        "beta0": var_mean * (alpha0 - 1),
+    }, index=agg.index)
+
+
+def posterior_error_sigma(sums: pd.DataFrame, priors: pd.DataFrame, pool_key: str = POOL_KEY) -> pd.DataFrame:
+    """
+    Closed-form Normal-Inverse-Gamma posterior for every group at once.
+
+        kappa_n = kappa0 + n
+        alpha_n = alpha0 + n / 2
+        beta_n  = beta0 + (n * var + kappa0 * n * (mean - m0)^2 / kappa_n) / 2
+        sigma   = sqrt(E[sigma^2 | data]) = sqrt(beta_n / (alpha_n - 1))
+
+    Args:
+        sums (pd.DataFrame): Output of aggregate_group_sums
+        priors (pd.DataFrame): Output of estimate_pooled_priors
+        pool_key (str): Index level that links a group to its prior
+
+    Returns:
+        pd.DataFrame: Indexed like sums with 'n', 'posterior_mean' and 'posterior_sigma'
+            (NaN for groups whose pool has no prior)
+    """
+    mom = _moments(sums)
+    prior = priors.reindex(sums.index.get_level_values(pool_key))
+    m0, kappa0 = prior["m0"].to_numpy(), prior["kappa0"].to_numpy()
+    alpha0, beta0 = prior["alpha0"].to_numpy(), prior["beta0"].to_numpy()
+
+    n = mom["n"].to_numpy()
+    mean = np.nan_to_num(mom["mean"].to_numpy())
+    var = np.nan_to_num(mom["var"].to_numpy())
+    m0_filled = np.nan_to_num(m0)
+
+    kappa_n = kappa0 + n
+    alpha_n = alpha0 + n / 2
+    beta_n = beta0 + 0.5 * (n * var + kappa0 * n * (mean - m0_filled) ** 2 / kappa_n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        post_mean = (kappa0 * m0_filled + n * mean) / kappa_n
+        post_sigma = np.sqrt(beta_n / (alpha_n - 1))
+
+    return pd.DataFrame({"n": n, "posterior_mean": post_mean, "posterior_sigma": post_sigma}, index=sums.index)
+
+
+def bayesian_sigma_for_rows(sums: pd.DataFrame, rows_df: pd.DataFrame, pool_key: str = POOL_KEY) -> np.ndarray:
+    """
+    Posterior error sigma for each row of rows_df from per-group sums.
+
+    Rows whose group has no history get the prior sigma of their pool.
+
+    Args:
+        sums (pd.DataFrame): Output of aggregate_group_sums
+        rows_df (pd.DataFrame): Rows holding the group keys
+        pool_key (str): Group key whose groups share a prior
+
+    Returns:
+        np.ndarray: Sigma per row (NaN where neither the group nor its pool has history)
+    """
+    priors = estimate_pooled_priors(sums, pool_key)
+    posterior = posterior_error_sigma(sums, priors, pool_key)
+
+    sigma = broadcast_to_rows(posterior[["posterior_sigma"]], rows_df)["posterior_sigma"].to_numpy()
+    prior_sigma = np.sqrt(priors["beta0"] / (priors["alpha0"] - 1))
+    fallback = broadcast_to_rows(prior_sigma.to_frame("prior_sigma"), rows_df)["prior_sigma"].to_numpy()
+    return np.where(np.isnan(sigma), fallback, sigma)
+
+
+def predict_bayesian_safety_stock(past_sales_df, past_forecast_df, future_forecast_df, service_level=None,
+                                  pool_key=POOL_KEY):
+    """
+    Bayesian safety stock as a NumPy array aligned row-for-row with future_forecast_df.
+
+    Forecast errors per sku/location/echelon group are modelled as Normal(mu, sigma^2)
+    with a Normal-Inverse-Gamma prior shared by all groups of an echelon and fitted by
+    empirical Bayes, so groups with little history are shrunk towards their echelon.
+    The posterior is analytic and computed for all groups from grouped sufficient
+    statistics, without sampling. Safety stock is z * posterior_sigma * sqrt(lead_time);
+    future groups without history get their echelon's prior sigma. The priors are fitted on
+    the history passed in, so runs over shards or partitions fit one prior set per shard.
+
+    Args:
+        past_sales_df (pd.DataFrame): Historical actual sales (sku_id, location_id, echelon_type, date, actual)
+        past_forecast_df (pd.DataFrame): Historical forecast (same keys, forecast)
+        future_forecast_df (pd.DataFrame): Rows to produce safety stock for (keys, lead_time, service_level)
+        service_level (float, optional): Service level for all rows (default: the 'service_level' column)
+        pool_key (str): Group key whose groups share a prior
+
+    Returns:
+        np.ndarray: Safety stock per future row rounded to 2 decimals
+            (NaN where neither the group nor its echelon has history)
+    """
+    merge_keys = ["sku_id", "location_id", "echelon_type", "date"]
+    past_df = pd.merge(
+        past_sales_df[merge_keys + ["actual"]],
+        past_forecast_df[merge_keys + ["forecast"]],
+        on=merge_keys,
+    )
+
+    sigma = bayesian_sigma_for_rows(aggregate_group_sums(past_df, GROUP_KEYS), future_forecast_df, pool_key)
+
+    if service_level is None:
+        service_level = future_forecast_df["service_level"]
+    service_level = np.broadcast_to(_as_float_array(service_level), (len(future_forecast_df),))
+    lead_time = _as_float_array(future_forecast_df["lead_time"])
+
+    with np.errstate(invalid="ignore"):
+        safety_stock = norm.ppf(service_level) * sigma * np.sqrt(lead_time)
+    return np.round(safety_stock, 2)
+
+
+def calculate_bayesian_safety_stock(past_sales_df, past_forecast_df, future_forecast_df, service_level=None,
+                                    pool_key=POOL_KEY):
+    """
+    Calculate Bayesian safety stock per SKU-location-echelon-date.
+
+    Args:
+        past_sales_df (pd.DataFrame): Historical actual sales data
+        past_forecast_df (pd.DataFrame): Historical forecast data
+        future_forecast_df (pd.DataFrame): Future forecast data
+        service_level (float, optional): Service level for all rows (default: per-row 'service_level')
+        pool_key (str): Group key whose groups share a prior (default: echelon_type)
+
+    Returns:
+        pd.DataFrame: future_forecast_df with a 'bayesian_ss' column
+    """
+    output_df = future_forecast_df.copy()
+    output_df["bayesian_ss"] = predict_bayesian_safety_stock(
+        past_sales_df, past_forecast_df, future_forecast_df, service_level=service_level, pool_key=pool_key
+    )
+    return output_df
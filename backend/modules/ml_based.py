@@ -1,52 +1,115 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from scipy.stats import norm
 
+from backend.modules.model_cache import training_fingerprint
+from backend.instrumentation import stage, current_report, record_group_fits
 
-def calculate_ml_based_safety_stock(
-    past_sales_df, past_forecast_df, future_forecast_df, service_level=0.9
-):
+RF_PARAMS = {"n_estimators": 200, "test_size": 0.2}
+
+
+def _fit_model(X, y, random_state, model_cache=None, n_jobs=None):
     """
-    Calculate safety stock per SKU-location-echelon-date using ML to predict forecast error variability.
+    Fit a forest on (X, y), or load it from model_cache if the same training rows
+    and hyperparameters were fitted before.
+
+    Returns:
+        tuple: (fitted model, cache hit flag; None when no cache is used)
+    """
+    key = None
+    if model_cache is not None:
+        key = training_fingerprint(X, y, {**RF_PARAMS, "random_state": random_state})
+        model = model_cache.get(key)
+        if model is not None:
+            return model, True
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=RF_PARAMS["test_size"], random_state=random_state
+    )
+    model = RandomForestRegressor(
+        n_estimators=RF_PARAMS["n_estimators"], random_state=random_state, n_jobs=n_jobs
+    )
+    model.fit(X_train, y_train)
+
+    if model_cache is not None:
+        model_cache.put(key, model)
+        return model, False
+    return model, None
+
+
+def _fit_predict_group(task):
+    """
+    Fit one group's model and predict its future safety stock.
+
+    Module-level so it can run in a worker process.
 
     Args:
-        past_sales_df (pd.DataFrame): Historical actual sales data
-        past_forecast_df (pd.DataFrame): Historical forecast data
-        future_forecast_df (pd.DataFrame): Future forecast data
-        service_level (float): Desired service level (default=0.9 for 90%)
+        task (tuple): (train_df, past_feature_cols, future_features_df, z_score,
+            random_state, model_cache)
 
     Returns:
-        pd.DataFrame: future_forecast_df with 'Safety_Stock' column
+        tuple: (safety stock per future row of the group, cache hit flag or None,
+            wall seconds spent in this group)
     """
+    start = time.perf_counter()
+    train_df, past_feature_cols, future_subset, z_score, random_state, model_cache = task
 
-    # Merge past sales with past forecast to calculate errors
-    merge_keys = ["sku_id", "location_id", "echelon_type", "date"]
-    past_df = pd.merge(
-        past_sales_df,
-        past_forecast_df,
-        on=merge_keys,
-        suffixes=('_act', '_fcst')
-    )
+    # One-hot encode & deduplicate training features
+    X = pd.get_dummies(train_df[past_feature_cols], drop_first=True)
+    X = X.loc[:, ~X.columns.duplicated()]
 
-    # Calculate forecast error (actual - forecast)
-    past_df["error"] = past_df["actual"] - past_df["forecast"]
-    past_df["abs_error"] = past_df["error"].abs()
+    y = train_df["abs_error"]
 
-    # Columns never used as features
-    drop_cols = [
-        "actual", "forecast", "error", "abs_error",
-        "sku_id", "location_id", "echelon_type", "date"
-    ]
+    # Fallback if not enough historical data or no variance in y
+    if len(X) < 5 or y.nunique() <= 1:
+        fallback_std = y.std(ddof=0) if len(y) > 0 else 0
+        return np.full(len(future_subset), z_score * fallback_std), None, time.perf_counter() - start
 
-    # Z-score for desired service level (from normal distribution)
-    z_score = norm.ppf(service_level)
+    # Train ML model (or reuse the cached fit)
+    model, cache_hit = _fit_model(X, y, random_state, model_cache)
+
+    # Prepare future features
+    future_features = pd.get_dummies(future_subset, drop_first=True)
+    future_features = future_features.loc[:, ~future_features.columns.duplicated()]
+
+    # Align with training columns
+    future_features = future_features.reindex(columns=X.columns, fill_value=0)
 
-    results = []
+    # Predict future abs_error (std proxy) and compute safety stock
+    predicted_abs_error = model.predict(future_features)
+    return z_score * predicted_abs_error, cache_hit, time.perf_counter() - start
 
-    # Process each SKU/location/echelon group separately
-    for (sku, loc, echelon), sku_df in past_df.groupby(["sku_id", "location_id", "echelon_type"]):
+
+def _predict_per_group(past_df, future_forecast_df, drop_cols, z_score, n_jobs, random_state, model_cache):
+    """
+    Train one forest per sku/location/echelon group and predict that group's future rows.
+
+    Returns:
+        np.ndarray: Safety stock aligned row-for-row with future_forecast_df
+            (NaN for future rows whose group has no history).
+    """
+    # Positions of every group's future rows, computed once (O(rows)) instead of
+    # three boolean masks over the whole frame per group
+    group_cols = ["sku_id", "location_id", "echelon_type"]
+    future_index = future_forecast_df.groupby(group_cols, sort=False, observed=True).indices
+
+    # Build one task per group. Each task carries only that group's history and
+    # future rows, so a worker never receives the full past_df.
+    future_positions = []
+    group_keys = []
+    tasks = []
+    for group_key, sku_df in past_df.groupby(group_cols, observed=True):
+
+        # Get relevant rows in future forecast
+        positions = future_index.get(group_key)
+        if positions is None:
+            continue
 
         # Feature columns in past merged dataset (include _act/_fcst)
         past_feature_cols = [col for col in sku_df.columns if col not in drop_cols]
@@ -57,79 +120,175 @@ def calculate_ml_based_safety_stock(
         # Keep only those columns that actually exist in future_forecast_df
         future_feature_cols = [c for c in future_feature_cols if c in future_forecast_df.columns]
 
-        # One-hot encode & deduplicate training features
-        X = pd.get_dummies(sku_df[past_feature_cols], drop_first=True)
-        X = X.loc[:, ~X.columns.duplicated()]
+        future_positions.append(positions)
+        group_keys.append(group_key)
+        tasks.append((
+            sku_df[past_feature_cols + ["abs_error"]],
+            past_feature_cols,
+            future_forecast_df[future_feature_cols].iloc[positions],
+            z_score,
+            random_state,
+            model_cache,
+        ))
+
+    # Fit the groups serially or across a process pool; map() keeps task order,
+    # so both paths produce identical output.
+    if n_jobs > 1 and len(tasks) > 1:
+        chunksize = max(1, len(tasks) // (n_jobs * 4))
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            predictions = list(executor.map(_fit_predict_group, tasks, chunksize=chunksize))
+    else:
+        predictions = [_fit_predict_group(task) for task in tasks]
+
+    # Scatter each group's predictions back to its row positions
+    safety_stock = np.full(len(future_forecast_df), np.nan)
+    for positions, (group_ss, cache_hit, _) in zip(future_positions, predictions):
+        if cache_hit is not None:
+            model_cache.record(cache_hit)
+        safety_stock[positions] = group_ss
+
+    # Fit timings are measured in the workers and only collected when a report is active
+    if current_report() is not None:
+        record_group_fits([
+            {"group": "|".join(map(str, key)), "rows": len(task[0]), "seconds": seconds, "cache_hit": cache_hit}
+            for key, task, (_, cache_hit, seconds) in zip(group_keys, tasks, predictions)
+        ])
+    return safety_stock
+
+
+def _predict_pooled(past_df, future_forecast_df, drop_cols, z_score, n_jobs, random_state, model_cache):
+    """
+    Train a single model over all groups and predict every future row in one call.
 
-        y = sku_df["abs_error"]
+    sku_id/location_id/echelon_type are added as ordinal-encoded features (codes taken
+    from the training data; groups unseen in history get -1), so one forest learns
+    shared error structure across the catalogue.
+    """
+    key_cols = ["sku_id", "location_id", "echelon_type"]
 
-        # Get relevant rows in future forecast
-        future_subset = future_forecast_df[
-            (future_forecast_df["sku_id"] == sku) &
-            (future_forecast_df["location_id"] == loc) &
-            (future_forecast_df["echelon_type"] == echelon)
-        ]
+    # Feature columns in past merged dataset (include _act/_fcst)
+    past_feature_cols = [col for col in past_df.columns if col not in drop_cols]
 
-        if future_subset.empty:
-            continue
+    # Map to future column names and keep only those that exist
+    future_feature_cols = [c.replace('_act', '').replace('_fcst', '') for c in past_feature_cols]
+    future_feature_cols = [c for c in future_feature_cols if c in future_forecast_df.columns]
 
-        # Fallback if not enough historical data or no variance in y
-        if len(X) < 5 or y.nunique() <= 1:
-            fallback_std = y.std(ddof=0) if len(y) > 0 else 0
-            fallback_ss = z_score * fallback_std
-            for _, row in future_subset.iterrows():
-                results.append({
-                    "sku_id": row["sku_id"],
-                    "location_id": row["location_id"],
-                    "echelon_type": row["echelon_type"],
-                    "date": row["date"],
-                    "Safety_Stock": fallback_ss
-                })
-            continue
+    # One-hot encode & deduplicate training features
+    X = pd.get_dummies(past_df[past_feature_cols], drop_first=True)
+    X = X.loc[:, ~X.columns.duplicated()]
+
+    future_features = pd.get_dummies(future_forecast_df[future_feature_cols], drop_first=True)
+    future_features = future_features.loc[:, ~future_features.columns.duplicated()]
+    future_features = future_features.reindex(columns=X.columns, fill_value=0)
+
+    # Encode group keys with the training categories
+    for col in key_cols:
+        categories = pd.Index(past_df[col].dropna().unique())
+        X[f"{col}_code"] = categories.get_indexer(past_df[col])
+        future_features[f"{col}_code"] = categories.get_indexer(future_forecast_df[col])
+
+    y = past_df["abs_error"]
+
+    # Fallback if not enough historical data or no variance in y
+    if len(X) < 5 or y.nunique() <= 1:
+        fallback_std = y.std(ddof=0) if len(y) > 0 else 0
+        return np.full(len(future_forecast_df), z_score * fallback_std)
+
+    model, cache_hit = _fit_model(X, y, random_state, model_cache, n_jobs=n_jobs)
+    if cache_hit is not None:
+        model_cache.record(cache_hit)
+
+    # Predict future abs_error (std proxy) for all rows at once
+    return z_score * model.predict(future_features)
+
+
+def predict_ml_based_safety_stock(
+    past_sales_df, past_forecast_df, future_forecast_df, service_level=0.9,
+    n_jobs=1, random_state=42, mode="per_group", model_cache=None
+):
+    """
+    ML safety stock as a NumPy array aligned row-for-row with future_forecast_df.
+
+    Same arguments as calculate_ml_based_safety_stock; callers that attach the result
+    to an existing frame can assign it positionally without a merge or a frame copy.
 
-        # Train ML model
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
+    Returns:
+        np.ndarray: Safety stock per future row (NaN where a group has no history)
+    """
+
+    # Merge past sales with past forecast to calculate errors
+    merge_keys = ["sku_id", "location_id", "echelon_type", "date"]
+    with stage("ml_merge_history", rows_in=past_forecast_df) as record:
+        past_df = pd.merge(
+            past_sales_df,
+            past_forecast_df,
+            on=merge_keys,
+            suffixes=('_act', '_fcst')
         )
-        model = RandomForestRegressor(n_estimators=200, random_state=42)
-        model.fit(X_train, y_train)
-
-        # Prepare future features
-        future_features = pd.get_dummies(future_subset[future_feature_cols], drop_first=True)
-        future_features = future_features.loc[:, ~future_features.columns.duplicated()]
-
-        # Align with training columns
-        future_features = future_features.reindex(columns=X.columns, fill_value=0)
-
-        # Predict future abs_error (std proxy)
-        predicted_abs_error = model.predict(future_features)
-
-        # Compute safety stock
-        safety_stock = z_score * predicted_abs_error
-
-        for i, (_, row) in enumerate(future_subset.iterrows()):
-            results.append({
-                "sku_id": row["sku_id"],
-                "location_id": row["location_id"],
-                "echelon_type": row["echelon_type"],
-                "date": row["date"],
-                "Safety_Stock": safety_stock[i]
-            })
-
-    # Convert results to DataFrame
-    results_df = pd.DataFrame(results)
-
-    # Merge results into future forecast
-    output_df = pd.merge(
-        future_forecast_df, results_df,
-        on=["sku_id", "location_id", "echelon_type", "date"],
-        how="left"
-    )
+        record["rows_out"] = len(past_df)
 
-    output_df.to_excel("final.xlsx",index=False)
+    # Calculate forecast error (actual - forecast)
+    past_df["error"] = past_df["actual"] - past_df["forecast"]
+    past_df["abs_error"] = past_df["error"].abs()
 
-    return output_df
+    # Columns never used as features
+    drop_cols = [
+        "actual", "forecast", "error", "abs_error",
+        "sku_id", "location_id", "echelon_type", "date"
+    ]
+
+    # Z-score for desired service level (from normal distribution)
+    z_score = norm.ppf(service_level)
 
+    n_jobs = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+
+    if mode == "per_group":
+        with stage("ml_fit_predict_per_group", rows_in=past_df) as record:
+            safety_stock = _predict_per_group(
+                past_df, future_forecast_df, drop_cols, z_score, n_jobs, random_state, model_cache
+            )
+            record["rows_out"] = len(safety_stock)
+        return safety_stock
+    if mode == "pooled":
+        with stage("ml_fit_predict_pooled", rows_in=past_df) as record:
+            safety_stock = _predict_pooled(
+                past_df, future_forecast_df, drop_cols, z_score, n_jobs, random_state, model_cache
+            )
+            record["rows_out"] = len(safety_stock)
+        return safety_stock
+    raise ValueError(f"Unknown ML mode: {mode!r} (expected 'per_group' or 'pooled')")
 
 
+def calculate_ml_based_safety_stock(
+    past_sales_df, past_forecast_df, future_forecast_df, service_level=0.9,
+    n_jobs=1, random_state=42, mode="per_group", model_cache=None
+):
+    """
+    Calculate safety stock per SKU-location-echelon-date using ML to predict forecast error variability.
 
+    Args:
+        past_sales_df (pd.DataFrame): Historical actual sales data
+        past_forecast_df (pd.DataFrame): Historical forecast data
+        future_forecast_df (pd.DataFrame): Future forecast data
+        service_level (float): Desired service level (default=0.9 for 90%)
+        n_jobs (int): Worker processes for the per-group model fits
+            (1 = serial, -1/None = all cores). Output is identical for any value.
+        random_state (int): Seed for the train/test split and the forests
+        mode (str): "per_group" trains one forest per sku/location/echelon group;
+            "pooled" trains a single forest over all groups with the group keys as features
+        model_cache (ModelCache, optional): On-disk cache of fitted models; groups whose
+            training rows and hyperparameters are unchanged load their model instead of refitting
+
+    Returns:
+        pd.DataFrame: future_forecast_df with 'Safety_Stock' column
+    """
+    safety_stock = predict_ml_based_safety_stock(
+        past_sales_df, past_forecast_df, future_forecast_df, service_level=service_level,
+        n_jobs=n_jobs, random_state=random_state, mode=mode, model_cache=model_cache
+    )
+
+    # Predictions are already row-aligned, so attach them positionally
+    output_df = future_forecast_df.copy()
+    output_df["Safety_Stock"] = safety_stock
+
+    return output_df
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+import pandas as pd
+
+
+def training_fingerprint(X: pd.DataFrame, y: pd.Series, params: dict) -> str:
+    """
+    Hash a model's training rows, feature names and hyperparameters.
+
+    Args:
+        X (pd.DataFrame): Training features
+        y (pd.Series): Training target
+        params (dict): Model hyperparameters (anything that changes the fitted model)
+
+    Returns:
+        str: Hex digest usable as a cache key.
+    """
+    h = hashlib.sha256()
+    h.update(repr(list(X.columns)).encode())
+    h.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    h.update(pd.util.hash_pandas_object(y, index=False).to_numpy().tobytes())
+    h.update(repr(sorted(params.items())).encode())
+    return h.hexdigest()
+
+
+class ModelCache:
+    """
+    On-disk cache of fitted models keyed by training_fingerprint().
+
+    Entries are pickle files in cache_dir. Reads refresh an entry's mtime, and every
+    put() re-measures the directory and evicts the least recently used entries while
+    it is over max_bytes. The instance is picklable so worker processes can share the
+    same directory; hit/miss counters are only updated in the process that calls record().
+
+    Because the size is measured on disk rather than tracked per process, the bound
+    holds across workers: the directory exceeds max_bytes by at most the entries that
+    are being written concurrently (one per worker) until their put() returns.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _entries(self):
+        with os.scandir(self.cache_dir) as it:
+            return [e for e in it if e.is_file() and e.name.endswith(".pkl")]
+
+    def size_bytes(self) -> int:
+        return sum(e.stat().st_size for e in self._entries())
+
+    def get(self, key: str):
+        """Return the cached model for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                model = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            pass
+        return model
+
+    def put(self, key: str, model) -> None:
+        """Store a model atomically, then evict LRU entries if over the size bound."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        # Other processes write to the same directory, so measure it rather than estimate
+        self.evict()
+
+    def evict(self) -> int:
+        """Delete least recently used entries until the cache fits max_bytes."""
+        entries = sorted(self._entries(), key=lambda e: e.stat().st_mtime)
+        total = sum(e.stat().st_size for e in entries)
+        removed = 0
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def record(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "entries": len(self._entries()),
+            "size_bytes": self.size_bytes(),
+        }
+
+
+_caches = {}
+
+
+def get_model_cache(cache_dir: str, max_bytes: int = 1024 ** 3) -> ModelCache:
+    """Return a process-wide ModelCache for cache_dir so counters survive reruns."""
+    cache = _caches.get(cache_dir)
+    if cache is None:
+        cache = _caches[cache_dir] = ModelCache(cache_dir, max_bytes)
+    cache.max_bytes = max_bytes
+    return cache
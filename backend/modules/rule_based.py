@@ -2,6 +2,54 @@ import pandas as pd
 import numpy as np
 from scipy.stats import norm
 
+
+def _as_float_array(values) -> np.ndarray:
+    """Convert a Series/array-like (including nullable Int64) to a float64 NumPy array."""
+    if isinstance(values, pd.Series):
+        return values.to_numpy(dtype="float64", na_value=np.nan)
+    return np.asarray(values, dtype="float64")
+
+
+def calculate_rule_based_safety_stock(data=None, forecast=None, lead_time=None, service_level=None) -> np.ndarray:
+    """
+    Columnar rule-based safety stock kernel.
+
+    Computes ``z(service_level) * sqrt(forecast) * sqrt(lead_time)`` for whole
+    columns at once: one vectorized ``norm.ppf`` call for the z-scores and plain
+    array arithmetic for the safety stock.
+
+    Args:
+        data (pd.DataFrame, optional): Frame holding 'forecast', 'lead_time' and
+            'service_level' columns. Ignored for any array passed explicitly.
+        forecast (array-like, optional): Forecasted demand per row.
+        lead_time (array-like, optional): Lead time per row.
+        service_level (array-like or float, optional): Target service level per row
+            (a scalar is broadcast to all rows).
+
+    Returns:
+        np.ndarray: Safety stock per row rounded to 2 decimals (NaN where inputs are missing).
+    """
+    if data is not None:
+        forecast = data["forecast"] if forecast is None else forecast
+        lead_time = data["lead_time"] if lead_time is None else lead_time
+        service_level = data["service_level"] if service_level is None else service_level
+
+    if forecast is None or lead_time is None or service_level is None:
+        raise ValueError("forecast, lead_time and service_level are required")
+
+    forecast = _as_float_array(forecast)
+    lead_time = _as_float_array(lead_time)
+    service_level = _as_float_array(service_level)
+
+    # Use the square root of the forecast as a proxy for the standard deviation of
+    # daily demand (Poisson-like demand: variance ~ mean).
+    with np.errstate(invalid="ignore"):
+        z_score = norm.ppf(service_level)
+        rule_ss = z_score * np.sqrt(forecast) * np.sqrt(lead_time)
+
+    return np.round(rule_ss, 2)
+
+
 def calculate_rule_based_safety_stock_df(future_forecast_df: pd.DataFrame) -> pd.DataFrame:
     """
     Calculate rule-based safety stock for each row in the future forecast dataset.
@@ -14,28 +62,15 @@ def calculate_rule_based_safety_stock_df(future_forecast_df: pd.DataFrame) -> pd
     Returns:
         pd.DataFrame: Same as input with an extra 'rule_ss' column.
     """
-    # Copy to avoid modifying original
-    df = future_forecast_df.copy()
-
     # Ensure needed columns exist
     required_cols = ['sku_id', 'echelon_type', 'date',
                      'forecast', 'lead_time', 'service_level']
     for col in required_cols:
-        if col not in df.columns:
+        if col not in future_forecast_df.columns:
             raise ValueError(f"Missing required column in future_forecast_df: {col}")
 
-    # Calculate Z-score for each row from service level
-    df['z_score'] = df['service_level'].apply(lambda sl: norm.ppf(sl))
-
-    # Corrected Logic: Use the square root of the forecast as a proxy for the
-    # standard deviation of daily demand, assuming demand follows a Poisson-like
-    # distribution where variance is approximately equal to the mean.
-    df['rule_ss'] = df.apply(
-        lambda r: round(r['z_score'] * np.sqrt(r['forecast']) * np.sqrt(r['lead_time']), 2),
-        axis=1
-    )
-
-    # Drop temp col
-    df.drop(columns=['z_score'], inplace=True)
+    # Copy to avoid modifying original
+    df = future_forecast_df.copy()
+    df['rule_ss'] = calculate_rule_based_safety_stock(df)
 
-    return df
\ No newline at end of file
+    return df
@@ -0,0 +1,162 @@
+import pandas as pd
+import numpy as np
+from scipy.stats import norm
+
+from backend.accuracy.group_statistics import (
+    aggregate_group_sums,
+    derive_group_statistics,
+    broadcast_to_rows,
+)
+from backend.modules.rule_based import _as_float_array
+
+OPTIMIZE_GROUP_KEYS = ["sku_id", "location_id"]
+SIGMA_METHODS = ("rule", "rmse", "hybrid")
+
+# Candidate service levels evaluated by default (0.50, 0.51, ..., 0.99, 0.995, 0.999)
+DEFAULT_CANDIDATES = np.concatenate([np.round(np.arange(0.50, 0.995, 0.01), 3), [0.995, 0.999]])
+
+
+def normal_loss(z) -> np.ndarray:
+    """Standard normal loss function L(z) = E[max(Z - z, 0)] (expected shortage per unit sigma)."""
+    z = np.asarray(z, dtype="float64")
+    return norm.pdf(z) - z * norm.sf(z)
+
+
+def lead_time_sigma(future_forecast_df: pd.DataFrame, aligned_df: pd.DataFrame | None = None,
+                    method: str = "rule") -> np.ndarray:
+    """
+    Standard deviation of demand over the lead time for each future row.
+
+    These are the sigmas behind the existing modules, i.e. their safety stock divided by z:
+        rule:   sqrt(forecast) * sqrt(lead_time)
+        rmse:   rmse * sqrt(lead_time)
+        hybrid: (w * rmse + (1 - w) * sigma_d) * sqrt(lead_time), w = dynamic RMSE weight
+
+    Rows whose group has no history fall back to the rule sigma.
+
+    Args:
+        future_forecast_df (pd.DataFrame): Rows with 'forecast', 'lead_time' (and the group keys for rmse/hybrid)
+        aligned_df (pd.DataFrame, optional): Output of align_forecast_to_actual (required for rmse/hybrid)
+        method (str): One of SIGMA_METHODS
+
+    Returns:
+        np.ndarray: Sigma per row (NaN where inputs are missing)
+    """
+    if method not in SIGMA_METHODS:
+        raise ValueError(f"Unknown sigma method: {method!r} (expected one of {SIGMA_METHODS})")
+
+    lead_time = _as_float_array(future_forecast_df["lead_time"])
+    with np.errstate(invalid="ignore"):
+        sqrt_lt = np.sqrt(lead_time)
+        sigma = np.sqrt(_as_float_array(future_forecast_df["forecast"])) * sqrt_lt
+    if method == "rule":
+        return sigma
+
+    if aligned_df is None:
+        raise ValueError(f"aligned_df is required for sigma method {method!r}")
+
+    stats = broadcast_to_rows(derive_group_statistics(aggregate_group_sums(aligned_df)), future_forecast_df)
+    rmse = stats["rmse"].to_numpy()
+    if method == "rmse":
+        hist_sigma = rmse * sqrt_lt
+    else:
+        sigma_d = stats["sigma_d"].to_numpy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            denom = rmse + sigma_d
+            weight = np.where(denom == 0, 0.5, np.clip(1 - rmse / denom, 0, 1))
+        hist_sigma = (weight * rmse + (1 - weight) * sigma_d) * sqrt_lt
+
+    return np.where(np.isnan(hist_sigma), sigma, hist_sigma)
+
+
+def _cost_column(df: pd.DataFrame, col: str, default: float) -> np.ndarray:
+    """Per-row cost from an optional column, with missing values filled by the scalar default."""
+    if col not in df.columns:
+        return np.full(len(df), float(default))
+    values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    return np.where(np.isnan(values), float(default), values)
+
+
+def optimize_service_level(
+    df: pd.DataFrame,
+    sigma,
+    holding_cost: float = 1.0,
+    shortage_cost: float = 10.0,
+    candidates=None,
+    group_keys=None,
+    batch_size: int = 100_000,
+) -> pd.DataFrame:
+    """
+    Cost-minimizing service level per group.
+
+    For a service level with z = z(sl), a row with lead-time sigma s costs
+        holding_cost * z * s           (carrying the safety stock)
+      + shortage_cost * s * L(z)       (expected units short per replenishment cycle)
+    Both terms are linear in s, so a group's cost for every candidate is
+        z * sum(h * s) + L(z) * sum(p * s)
+    and all groups x candidates are evaluated as one matrix product, in batches of
+    batch_size groups to bound memory.
+
+    Costs are taken from optional 'holding_cost' / 'shortage_cost' columns, with the
+    scalar arguments as defaults.
+
+    Args:
+        df (pd.DataFrame): Rows holding the group keys (and optionally the cost columns)
+        sigma (array-like): Lead-time sigma per row (see lead_time_sigma)
+        holding_cost (float): Holding cost per unit of safety stock
+        shortage_cost (float): Cost per unit short
+        candidates (array-like, optional): Service levels to evaluate (default: DEFAULT_CANDIDATES)
+        group_keys (list, optional): Grouping columns (default: sku_id, location_id)
+        batch_size (int): Groups evaluated per batch
+
+    Returns:
+        pd.DataFrame: One row per group, indexed by group_keys, with 'optimal_service_level',
+            'safety_stock' and 'expected_cost' (NaN service level for groups without a usable sigma)
+    """
+    group_keys = list(group_keys or OPTIMIZE_GROUP_KEYS)
+    candidates = np.sort(np.asarray(DEFAULT_CANDIDATES if candidates is None else candidates, dtype="float64"))
+    if candidates.size == 0 or np.any((candidates <= 0) | (candidates >= 1)):
+        raise ValueError("candidates must be service levels strictly between 0 and 1")
+
+    sigma = _as_float_array(sigma)
+    valid = ~np.isnan(sigma)
+    sigma = np.where(valid, sigma, 0.0)
+    parts = pd.DataFrame({
+        "h_sigma": _cost_column(df, "holding_cost", holding_cost) * sigma,
+        "p_sigma": _cost_column(df, "shortage_cost", shortage_cost) * sigma,
+        "sigma": sigma,
+        "n_valid": valid.astype("float64"),
+    })
+    for key in group_keys:
+        parts[key] = df[key].to_numpy()
+    sums = parts.groupby(group_keys, sort=False, dropna=False, observed=True).sum()
+
+    z = norm.ppf(candidates)
+    coef = np.vstack([z, normal_loss(z)])  # (2, n_candidates)
+    weights = sums[["h_sigma", "p_sigma"]].to_numpy()
+
+    best = np.empty(len(sums), dtype="int64")
+    best_cost = np.empty(len(sums))
+    for start in range(0, len(sums), batch_size):
+        costs = weights[start:start + batch_size] @ coef  # (groups, candidates)
+        idx = np.argmin(costs, axis=1)
+        best[start:start + batch_size] = idx
+        best_cost[start:start + batch_size] = costs[np.arange(len(idx)), idx]
+
+    usable = sums["n_valid"].to_numpy() > 0
+    return pd.DataFrame({
+        "optimal_service_level": np.where(usable, candidates[best], np.nan),
+        "safety_stock": np.where(usable, z[best] * sums["sigma"].to_numpy(), np.nan),
+        "expected_cost": np.where(usable, best_cost, np.nan),
+    }, index=sums.index)
+
+
+def assign_optimal_service_level(df: pd.DataFrame, sigma, **kwargs) -> np.ndarray:
+    """
+    Row-aligned optimal service level for df (see optimize_service_level for kwargs).
+
+    Returns:
+        np.ndarray: Service level per row, NaN where the group had no usable sigma
+    """
+    optimum = optimize_service_level(df, sigma, **kwargs)
+    return broadcast_to_rows(optimum[["optimal_service_level"]], df)["optimal_service_level"].to_numpy()
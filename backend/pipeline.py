@@ -1,29 +1,315 @@
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 from backend.preprocessing.input_cleaner import clean_and_prepare_inputs
+from backend.preprocessing.data_loader import resolve_column_mapping
 from backend.module_selector import run_safety_stock_selector
+from backend.instrumentation import run_report, stage
+from backend.export.exporters import export_results
 from backend import config
 
-def run_pipeline(past_forecast_df=None, actual_df=None, future_forecast_df=None):
+# Settings a shard worker must see; spawned processes do not inherit runtime changes to config
+_SHARD_CONFIG_ATTRS = [
+    "column_mapping",
+    "PAST_SALES_DATA_AVAILABLE", "PAST_FORECAST_DATA_AVAILABLE",
+    "ONLY_RULE_BASED", "ONLY_ML_BASED", "BOTH_RULE_ML",
+    "ML_MODE", "ML_MODEL_CACHE_DIR", "ML_MODEL_CACHE_MAX_BYTES",
+    "BAYESIAN_SS", "OPTIMIZE_SERVICE_LEVEL", "SL_SIGMA_METHOD", "SL_HOLDING_COST", "SL_SHORTAGE_COST",
+]
+ROW_ID_COL = "__row_id"
+
+def _export_stage(results: pd.DataFrame) -> None:
+    """Write results to config.EXPORT_PATH, if set (on the export thread when EXPORT_IN_BACKGROUND)."""
+    if not config.EXPORT_PATH:
+        return
+    with stage("export_results", rows_in=results) as record:
+        record["background"] = bool(config.EXPORT_IN_BACKGROUND)
+        export_results(results, config.EXPORT_PATH, file_format=config.EXPORT_FORMAT,
+                       background=config.EXPORT_IN_BACKGROUND)
+
+
+def run_pipeline(past_forecast_df=None, actual_df=None, future_forecast_df=None, export=True):
     """
     Takes raw uploaded dataframes and runs full safety stock pipeline.
     Returns final results dataframe.
+
+    Stage timings are collected into a RunReport (backend.instrumentation.last_run_report())
+    and written as JSON to config.RUN_REPORT_DIR when that is set. With config.EXPORT_PATH
+    set (and export=True) the results are also written there; background exports must not
+    have their frame modified until backend.export.exporters.wait_for_exports() returns.
     """
+    with run_report("run_pipeline") as report:
+        # Clean
+        with stage("clean_and_prepare_inputs", rows_in=future_forecast_df) as record:
+            cleaned_forecast, cleaned_actual, cleaned_future = clean_and_prepare_inputs(
+                forecast_df=past_forecast_df if past_forecast_df is not None else pd.DataFrame(),
+                actual_df=actual_df if actual_df is not None else pd.DataFrame(),
+                future_forecast_df=future_forecast_df if future_forecast_df is not None else pd.DataFrame(),
+                column_mapping=config.column_mapping,
+            )
+            record["rows_out"] = len(cleaned_future)
 
-    # Clean
-    cleaned_forecast, cleaned_actual, cleaned_future = clean_and_prepare_inputs(
-        forecast_df=past_forecast_df if past_forecast_df is not None else pd.DataFrame(),
-        actual_df=actual_df if actual_df is not None else pd.DataFrame(),
-        future_forecast_df=future_forecast_df if future_forecast_df is not None else pd.DataFrame(),
-        column_mapping=config.column_mapping,
-    )
+        # Run model selector
+        with stage("run_safety_stock_selector", rows_in=cleaned_future) as record:
+            results = run_safety_stock_selector(
+                PAST_SALES_DATA_AVAILABLE=config.PAST_SALES_DATA_AVAILABLE,
+                PAST_FORECAST_DATA_AVAILABLE=config.PAST_FORECAST_DATA_AVAILABLE,
+                cleaned_future_forecast=cleaned_future,
+                cleaned_actual=cleaned_actual,
+                cleaned_forecast=cleaned_forecast,
+            )
+            record["rows_out"] = len(results)
+
+        if export:
+            _export_stage(results)
+
+    if config.RUN_REPORT_DIR:
+        os.makedirs(config.RUN_REPORT_DIR, exist_ok=True)
+        report.to_json(os.path.join(config.RUN_REPORT_DIR, f"run_{report.run_id}.json"))
 
-    # Run model selector
-    results = run_safety_stock_selector(
-        PAST_SALES_DATA_AVAILABLE=config.PAST_SALES_DATA_AVAILABLE,
-        PAST_FORECAST_DATA_AVAILABLE=config.PAST_FORECAST_DATA_AVAILABLE,
-        cleaned_future_forecast=cleaned_future,
-        cleaned_actual=cleaned_actual,
-        cleaned_forecast=cleaned_forecast,
+    return results
+
+
+def frame_fingerprint(df: pd.DataFrame | None) -> str:
+    """Content hash of a DataFrame (column names, dtypes and values)."""
+    h = hashlib.sha256()
+    if df is None:
+        return h.hexdigest()
+    h.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def pipeline_cache_key(frame_fingerprints: dict, column_mapping: dict, flags: dict) -> str:
+    """
+    Key identifying one pipeline result: input contents, column mapping and method flags.
+
+    Args:
+        frame_fingerprints (dict): Dataset name -> frame_fingerprint()
+        column_mapping (dict): Mapping passed to clean_and_prepare_inputs
+        flags (dict): Method/config settings that change the output
+    """
+    payload = json.dumps(
+        {"frames": frame_fingerprints, "mapping": column_mapping, "flags": flags},
+        sort_keys=True, default=str,
     )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _partition_ids(df: pd.DataFrame, key_cols: list, n_partitions: int) -> np.ndarray:
+    """Stable hash partition of rows by their key columns (compared as strings)."""
+    hashed = pd.util.hash_pandas_object(df[key_cols].astype(str), index=False).to_numpy()
+    return (hashed % np.uint64(n_partitions)).astype(np.int64)
+
+
+def _raw_key_columns(path: str, column_mapping: dict, standard_keys: list) -> list:
+    """Raw CSV column names holding the given standard key columns."""
+    header = pd.read_csv(path, nrows=0).columns
+    rename = resolve_column_mapping(header, column_mapping)
+    raw_by_standard = {standard: raw for raw, standard in rename.items()}
+    missing = [k for k in standard_keys if k not in raw_by_standard]
+    if missing:
+        raise ValueError(f"Missing key columns {missing} in {path}")
+    return [raw_by_standard[k] for k in standard_keys]
+
+
+def _spill_partitions(path: str, part_dir: str, name: str, key_cols: list,
+                      n_partitions: int, chunk_size: int) -> None:
+    """Stream a CSV in chunks and append each row to its partition's part file."""
+    for chunk in pd.read_csv(path, chunksize=chunk_size, dtype={c: str for c in key_cols}):
+        part_ids = _partition_ids(chunk, key_cols, n_partitions)
+        for part_id, rows in chunk.groupby(part_ids, sort=False):
+            part_path = os.path.join(part_dir, f"{name}_{part_id:05d}.csv")
+            rows.to_csv(part_path, mode="a", index=False, header=not os.path.exists(part_path))
+
+
+def _read_partition(part_dir: str, name: str, part_id: int, key_cols: list, columns=None):
+    """
+    Read one partition's part file.
+
+    Without a part file this returns None, or a zero-row frame with the given columns
+    (so history inputs keep their schema for partitions of groups without history).
+    """
+    part_path = os.path.join(part_dir, f"{name}_{part_id:05d}.csv")
+    if not os.path.exists(part_path):
+        if columns is None:
+            return None
+        return pd.DataFrame({c: pd.Series(dtype=str if c in key_cols else "float64") for c in columns})
+    return pd.read_csv(part_path, dtype={c: str for c in key_cols})
+
+
+def run_pipeline_streaming(future_forecast_path, output_path, past_forecast_path=None, actual_path=None,
+                           chunk_size=1_000_000, n_partitions=None, column_mapping=None, work_dir=None):
+    """
+    Run the pipeline on CSV inputs larger than memory.
+
+    The inputs are streamed once in chunks and hash-partitioned by sku/location into
+    temporary part files, so every partition holds complete groups together with
+    exactly their history. Partitions are then cleaned, aligned and run through the
+    selector one at a time, and results are appended to output_path as they are
+    produced. Peak memory is bounded by the largest partition rather than by the input
+    size: ~chunk_size future rows plus *all* past forecast/actual rows of their groups.
+    Partitions are sized by future rows only, so history is not capped; on average a
+    partition holds 1 / n_partitions of the history, but groups with long histories can
+    make one partition much larger. Pass a larger n_partitions when history dominates
+    (a single group's history always stays in one partition).
+
+    Note: with config.ML_MODE == "pooled" the global model is trained per partition, and
+    with config.BAYESIAN_SS the per-echelon priors are fitted per partition, so ml_ss and
+    bayesian_ss can then differ from run_pipeline on the same data.
+
+    Args:
+        future_forecast_path (str): Future forecast CSV
+        output_path (str): Result CSV (overwritten)
+        past_forecast_path (str, optional): Past forecast CSV
+        actual_path (str, optional): Past sales CSV
+        chunk_size (int): Rows per read chunk and target future rows per partition
+        n_partitions (int, optional): Number of partitions (default: future rows / chunk_size)
+        column_mapping (dict, optional): Defaults to config.column_mapping
+        work_dir (str, optional): Where to put the temporary part files
+
+    Returns:
+        int: Number of result rows written
+    """
+    column_mapping = column_mapping or config.column_mapping
+    key_names = ["sku_id", "location_id"]
+    inputs = {"future": future_forecast_path, "forecast": past_forecast_path, "actual": actual_path}
+    inputs = {name: path for name, path in inputs.items() if path is not None}
+    key_cols = {name: _raw_key_columns(path, column_mapping, key_names) for name, path in inputs.items()}
+    headers = {name: list(pd.read_csv(path, nrows=0).columns) for name, path in inputs.items()}
+
+    if n_partitions is None:
+        future_rows = sum(
+            len(chunk) for chunk in pd.read_csv(future_forecast_path, usecols=key_cols["future"][:1],
+                                                chunksize=chunk_size)
+        )
+        n_partitions = max(1, -(-future_rows // chunk_size))
+
+    if os.path.exists(output_path):
+        os.remove(output_path)
+
+    rows_written = 0
+    with tempfile.TemporaryDirectory(dir=work_dir) as part_dir:
+        for name, path in inputs.items():
+            _spill_partitions(path, part_dir, name, key_cols[name], n_partitions, chunk_size)
+
+        for part_id in range(n_partitions):
+            future_part = _read_partition(part_dir, "future", part_id, key_cols["future"])
+            if future_part is None:
+                continue
+
+            results = run_pipeline(
+                past_forecast_df=_read_partition(part_dir, "forecast", part_id, key_cols.get("forecast", []),
+                                                 headers.get("forecast")),
+                actual_df=_read_partition(part_dir, "actual", part_id, key_cols.get("actual", []),
+                                          headers.get("actual")),
+                future_forecast_df=future_part,
+                export=False,
+            )
+            if results.empty:
+                continue
+
+            results.to_csv(output_path, mode="a", index=False, header=rows_written == 0)
+            rows_written += len(results)
+
+    return rows_written
+
+
+def _run_shard(task):
+    """
+    Run the full pipeline on one shard (in a worker process, or in the caller on the serial path).
+
+    The config snapshot and the ML_N_JOBS override are undone afterwards, so a serial run
+    leaves the caller's config as it was.
+    """
+    config_snapshot, past_forecast_df, actual_df, future_forecast_df = task
+    overrides = dict(config_snapshot)
+    # Shards already use every core; avoid nested process pools
+    overrides["ML_N_JOBS"] = 1
+    saved = {name: getattr(config, name) for name in overrides}
+    try:
+        for name, value in overrides.items():
+            setattr(config, name, value)
+        return run_pipeline(past_forecast_df, actual_df, future_forecast_df, export=False)
+    finally:
+        for name, value in saved.items():
+            setattr(config, name, value)
+
+
+def run_pipeline_sharded(past_forecast_df=None, actual_df=None, future_forecast_df=None,
+                         n_shards=None, n_workers=None):
+    """
+    Run the pipeline in parallel over hash partitions of the sku/location groups.
+
+    Rows are hash-partitioned by (sku_id, location_id) only, not by echelon, so every
+    echelon of a sku/location, with all of its history, lands in exactly one shard. Every shard runs the full pipeline (cleaning, selector, methods) in a process
+    pool, and the shard results are concatenated back into the original future row order,
+    so the output does not depend on the worker count (nor on the shard count, except as noted below).
+
+    Note: with config.ML_MODE == "pooled" the global model is trained per shard, and with
+    config.BAYESIAN_SS the per-echelon priors are fitted per shard, so ml_ss and bayesian_ss
+    can then differ from run_pipeline on the same data.
+
+    Args:
+        past_forecast_df, actual_df, future_forecast_df (pd.DataFrame): Raw inputs, as for run_pipeline
+        n_shards (int, optional): Number of partitions (default: 4 per worker, for load balance)
+        n_workers (int, optional): Worker processes (default: all cores)
+
+    Returns:
+        pd.DataFrame: Same rows and columns as run_pipeline (values as noted above), with a fresh RangeIndex
+            (exported once to config.EXPORT_PATH, when set)
+    """
+    if future_forecast_df is None or future_forecast_df.empty:
+        return pd.DataFrame()
+
+    n_workers = n_workers or os.cpu_count() or 1
+    n_shards = n_shards or n_workers * 4
+    # sku/location keeps every per-group computation (ML groups, service-level optimization) inside one shard
+    key_names = ["sku_id", "location_id"]
+
+    def shard_ids(df):
+        rename = resolve_column_mapping(df.columns, config.column_mapping)
+        raw_by_standard = {standard: raw for raw, standard in rename.items()}
+        return _partition_ids(df, [raw_by_standard[k] for k in key_names], n_shards)
+
+    future = future_forecast_df.copy()
+    future[ROW_ID_COL] = np.arange(len(future))
+    history = {"forecast": past_forecast_df, "actual": actual_df}
+    history = {name: df for name, df in history.items() if df is not None and not df.empty}
+
+    future_groups = future.groupby(shard_ids(future), sort=True)
+    history_groups = {name: dict(list(df.groupby(shard_ids(df)))) for name, df in history.items()}
+
+    def shard_history(name, shard_id):
+        # A shard of new groups without history still gets the history columns (zero rows)
+        if name not in history:
+            return None
+        return history_groups[name].get(shard_id, history[name].iloc[:0])
+
+    config_snapshot = {name: getattr(config, name) for name in _SHARD_CONFIG_ATTRS}
+    tasks = [
+        (
+            config_snapshot,
+            shard_history("forecast", shard_id),
+            shard_history("actual", shard_id),
+            shard_future,
+        )
+        for shard_id, shard_future in future_groups
+    ]
+
+    if n_workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            shard_results = list(executor.map(_run_shard, tasks))
+    else:
+        shard_results = [_run_shard(task) for task in tasks]
 
+    results = pd.concat([r for r in shard_results if not r.empty], ignore_index=True)
+    results = results.sort_values(ROW_ID_COL, kind="stable").drop(columns=ROW_ID_COL)
+    results = results.reset_index(drop=True)
+    _export_stage(results)
     return results
@@ -0,0 +1,161 @@
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    _HAS_PYARROW = True
+except ImportError:  # pyarrow is optional; fall back to the C parser for CSV
+    _HAS_PYARROW = False
+
+KEY_COLUMNS = ["sku_id", "location_id", "echelon_type"]
+FLOAT_COLUMNS = ["forecast", "actual", "service_level"]
+INT_COLUMNS = ["lead_time"]
+DATE_COLUMNS = ["date"]
+
+FILE_FORMATS = {
+    ".csv": "csv",
+    ".txt": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+    ".xlsx": "excel",
+    ".xls": "excel",
+}
+
+
+def detect_file_format(source) -> str:
+    """Infer the file format from a path or an uploaded file's name."""
+    name = source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", "")
+    ext = os.path.splitext(str(name))[1].lower()
+    if ext not in FILE_FORMATS:
+        raise ValueError(f"Unsupported file type: {name!r}")
+    return FILE_FORMATS[ext]
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def _read_column_names(source, file_format: str) -> list:
+    """Read only the header/schema of a file."""
+    if file_format == "csv":
+        names = list(pd.read_csv(source, nrows=0).columns)
+    elif file_format == "parquet":
+        import pyarrow.parquet as pq
+        names = pq.read_schema(source).names
+    elif file_format == "feather":
+        import pyarrow.ipc as ipc
+        names = ipc.open_file(source).schema.names
+    else:
+        names = list(pd.read_excel(source, nrows=0).columns)
+    _rewind(source)
+    return [str(c) for c in names]
+
+
+def _read_csv_pyarrow(source, usecols, key_cols, date_cols) -> pd.DataFrame:
+    """Multithreaded pyarrow CSV read with explicit key/date column types."""
+    import pyarrow as pa
+    import pyarrow.csv as pv
+
+    column_types = {c: pa.string() for c in key_cols}
+    column_types.update({c: pa.timestamp("ns") for c in date_cols})
+    try:
+        table = pv.read_csv(
+            source,
+            convert_options=pv.ConvertOptions(include_columns=usecols, column_types=column_types),
+        )
+    except pa.ArrowInvalid:
+        # Unparseable dates: read them as text and let apply_input_dtypes coerce to NaT
+        _rewind(source)
+        column_types.update({c: pa.string() for c in date_cols})
+        table = pv.read_csv(
+            source,
+            convert_options=pv.ConvertOptions(include_columns=usecols, column_types=column_types),
+        )
+    return table.to_pandas()
+
+
+def resolve_column_mapping(columns, column_mapping: dict) -> dict:
+    """
+    Match raw file columns to standard names (case/whitespace-insensitive).
+
+    A column that already carries the standard name is accepted as well.
+
+    Returns:
+        dict: raw column name -> standard name
+    """
+    lookup = {str(c).strip().lower(): c for c in columns}
+    rename = {}
+    for standard, mapped in column_mapping.items():
+        standard = standard.strip().lower()
+        raw = lookup.get(str(mapped).strip().lower(), lookup.get(standard))
+        if raw is not None and raw not in rename:
+            rename[raw] = standard
+    return rename
+
+
+def apply_input_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Keys -> categorical, measures -> float32, lead_time -> Int32, date -> datetime64."""
+    for col in KEY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("string").astype("category")
+    for col in FLOAT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+    for col in INT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int32")
+    for col in DATE_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+    return df
+
+
+def read_input_table(source, column_mapping: dict, file_format: str | None = None,
+                     keep_unmapped: bool = False) -> pd.DataFrame:
+    """
+    Read a CSV/Parquet/Feather/Excel input with the column mapping applied at read time.
+
+    Only mapped columns are read (unless keep_unmapped=True), CSV is parsed with the
+    pyarrow engine when available, and the result uses compact dtypes: categorical
+    keys, float32 measures, Int32 lead_time and parsed dates.
+
+    Args:
+        source (str | file-like): Path or uploaded file object
+        column_mapping (dict): Standard name -> raw column name (as in config.column_mapping)
+        file_format (str, optional): "csv", "parquet", "feather" or "excel" (default: from the name)
+        keep_unmapped (bool): Also load columns that are not in the mapping
+
+    Returns:
+        pd.DataFrame: Columns renamed to the standard names
+    """
+    file_format = file_format or detect_file_format(source)
+    if file_format in ("parquet", "feather") and not _HAS_PYARROW:
+        raise ImportError(f"Reading {file_format} files requires pyarrow (pip install pyarrow)")
+    columns = _read_column_names(source, file_format)
+    rename = resolve_column_mapping(columns, column_mapping)
+    usecols = columns if keep_unmapped else [c for c in columns if c in rename]
+
+    if file_format == "csv":
+        # Keys are read as strings so IDs keep leading zeros; measures are coerced
+        # afterwards so one bad cell does not abort the whole read
+        key_cols = [raw for raw, standard in rename.items() if standard in KEY_COLUMNS]
+        date_cols = [raw for raw, standard in rename.items() if standard in DATE_COLUMNS]
+        if _HAS_PYARROW:
+            df = _read_csv_pyarrow(source, usecols, key_cols, date_cols)
+        else:
+            df = pd.read_csv(
+                source, usecols=usecols, dtype={c: "string" for c in key_cols}, parse_dates=date_cols
+            )
+    elif file_format == "parquet":
+        df = pd.read_parquet(source, columns=usecols)
+    elif file_format == "feather":
+        df = pd.read_feather(source, columns=usecols)
+    else:
+        df = pd.read_excel(source, usecols=usecols)
+
+    df = df.rename(columns=rename)
+    return apply_input_dtypes(df)
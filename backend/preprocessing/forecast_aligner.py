@@ -1,5 +1,10 @@
 import pandas as pd
 import numpy as np
+
+from backend.instrumentation import instrumented
+
+
+@instrumented("align_forecast_to_actual")
 def align_forecast_to_actual(forecast_df: pd.DataFrame, actual_df: pd.DataFrame) -> pd.DataFrame:
     # Ensure datetime format
     forecast_df['date'] = pd.to_datetime(forecast_df['date'], errors='coerce')
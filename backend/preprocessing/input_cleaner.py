@@ -1,5 +1,13 @@
 import pandas as pd
 
+
+def _to_nullable_int(series):
+    """Numeric coercion to a nullable integer, keeping Int32 from read_input_table as is."""
+    if isinstance(series.dtype, (pd.Int32Dtype, pd.Int64Dtype)):
+        return series
+    return pd.to_numeric(series, errors='coerce').astype('Int64')
+
+
 def clean_and_prepare_inputs(forecast_df, actual_df,future_forecast_df, column_mapping):
     """
     Cleans and prepares forecast and actual dataframes.
@@ -90,14 +98,14 @@ def clean_and_prepare_inputs(forecast_df, actual_df,future_forecast_df, column_m
     if 'forecast' in forecast_df.columns:
         forecast_df['forecast'] = pd.to_numeric(forecast_df['forecast'], errors='coerce')
     if 'lead_time' in forecast_df.columns:
-        forecast_df['lead_time'] = pd.to_numeric(forecast_df['lead_time'], errors='coerce').astype('Int64')
+        forecast_df['lead_time'] = _to_nullable_int(forecast_df['lead_time'])
     if 'actual' in actual_df.columns:
         actual_df['actual'] = pd.to_numeric(actual_df['actual'], errors='coerce')
 
     if 'forecast' in future_forecast_df.columns:
         future_forecast_df['forecast'] = pd.to_numeric(future_forecast_df['forecast'], errors='coerce')
     if 'lead_time' in future_forecast_df.columns:
-        future_forecast_df['lead_time'] = pd.to_numeric(future_forecast_df['lead_time'], errors='coerce').astype('Int64')
+        future_forecast_df['lead_time'] = _to_nullable_int(future_forecast_df['lead_time'])
 
     # --- 7. If service_level missing, add default 0.95 ---
     if 'service_level' not in forecast_df.columns:
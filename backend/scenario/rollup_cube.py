@@ -0,0 +1,132 @@
+import pandas as pd
+import numpy as np
+
+from backend.scenario.scenario_engine import BASIS_DIMS
+
+CUBE_DIMS = ("sku_id", "location_id", "echelon_type", "date")
+BASIS_MEASURE = "scenario_basis"
+
+
+def _numeric(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+
+class RollupCube:
+    """
+    Additive sums of result measures per sku/location/echelon/date cell.
+
+    Built once per result set: every dimension is factorized into sorted integer codes
+    and the measures are summed per observed cell with np.bincount. Filtered totals,
+    per-dimension rollups, top-N and distinct counts are then masks and bincounts over
+    the (small, numeric) cell arrays instead of groupbys over the raw rows. Missing
+    values of a dimension form their own level; missing measure values count as 0.
+
+    The cube also carries the scenario basis sqrt(forecast) * sqrt(lead_time) (see
+    backend.scenario.scenario_engine), so scenario aggregates honour the same filters.
+    """
+
+    def __init__(self, df: pd.DataFrame, measures=("rule_ss",), dims=CUBE_DIMS):
+        self.dims = tuple(dims)
+        self.levels = {}
+        row_codes = []
+        for dim in self.dims:
+            values = df[dim] if dim in df.columns else pd.Series(np.nan, index=df.index)
+            if dim == "date" and not pd.api.types.is_datetime64_any_dtype(values):
+                values = pd.to_datetime(values, errors="coerce")
+            codes, uniques = pd.factorize(values, sort=True, use_na_sentinel=False)
+            if isinstance(uniques.dtype, pd.CategoricalDtype):
+                uniques = np.asarray(uniques)
+            self.levels[dim] = pd.Index(uniques, name=dim)
+            row_codes.append(codes.astype("int64"))
+
+        # Compress the dimension codes to the observed cells
+        shape = tuple(max(len(self.levels[dim]), 1) for dim in self.dims)
+        if len(df):
+            flat = np.ravel_multi_index(row_codes, shape)
+            cells, cell_of_row = np.unique(flat, return_inverse=True)
+        else:
+            cells, cell_of_row = np.empty(0, dtype="int64"), np.empty(0, dtype="int64")
+        self.codes = {
+            dim: codes.astype("int32")
+            for dim, codes in zip(self.dims, np.unravel_index(cells, shape))
+        }
+        self.n_cells = len(cells)
+
+        with np.errstate(invalid="ignore"):
+            basis = np.sqrt(_numeric(df, "forecast")) * np.sqrt(_numeric(df, "lead_time"))
+        values = {name: _numeric(df, name) for name in measures}
+        values[BASIS_MEASURE] = basis
+        self.sums = {
+            name: np.bincount(cell_of_row, weights=np.nan_to_num(arr, nan=0.0), minlength=self.n_cells)
+            for name, arr in values.items()
+        }
+        self.rows = np.bincount(cell_of_row, minlength=self.n_cells)
+
+    # --- filtering ---
+    def mask(self, filters: dict | None = None, date_from=None, date_to=None) -> np.ndarray:
+        """
+        Boolean mask over cells.
+
+        Args:
+            filters (dict, optional): Dimension -> list of levels to keep (empty list = no filter)
+            date_from, date_to (optional): Inclusive date range (excludes missing dates)
+        """
+        keep = np.ones(self.n_cells, dtype=bool)
+        for dim, selected in (filters or {}).items():
+            if selected is None or len(selected) == 0:
+                continue
+            wanted = np.zeros(len(self.levels[dim]), dtype=bool)
+            positions = self.levels[dim].get_indexer(pd.Index(list(selected)))
+            wanted[positions[positions >= 0]] = True
+            keep &= wanted[self.codes[dim]]
+        if date_from is not None or date_to is not None:
+            dates = self.levels["date"]
+            valid = np.asarray(dates.notna())
+            if date_from is not None:
+                valid &= np.asarray(dates >= pd.Timestamp(date_from))
+            if date_to is not None:
+                valid &= np.asarray(dates <= pd.Timestamp(date_to))
+            keep &= valid[self.codes["date"]]
+        return keep
+
+    # --- queries ---
+    def count(self, mask=None) -> int:
+        """Number of result rows in the selection."""
+        return int(self.rows.sum() if mask is None else self.rows[mask].sum())
+
+    def total(self, measure: str = "rule_ss", mask=None) -> float:
+        return float(self.sums[measure].sum() if mask is None else self.sums[measure][mask].sum())
+
+    def rollup(self, dim: str, measure: str = "rule_ss", mask=None) -> pd.Series:
+        """Sum of a measure per level of dim over the selected cells (levels without rows are dropped)."""
+        codes = self.codes[dim] if mask is None else self.codes[dim][mask]
+        weights = self.sums[measure] if mask is None else self.sums[measure][mask]
+        rows = self.rows if mask is None else self.rows[mask]
+        n_levels = len(self.levels[dim])
+        sums = np.bincount(codes, weights=weights, minlength=n_levels)
+        present = np.bincount(codes, weights=rows, minlength=n_levels) > 0
+        return pd.Series(sums[present], index=self.levels[dim][present], name=measure)
+
+    def top_n(self, dim: str, n: int, measure: str = "rule_ss", mask=None) -> pd.Series:
+        return self.rollup(dim, measure, mask).sort_values(ascending=False, kind="stable").head(n)
+
+    def nunique(self, dim: str, mask=None) -> int:
+        """Distinct non-missing levels of dim in the selection."""
+        levels = self.rollup(dim, mask=mask).index
+        return int(levels.notna().sum())
+
+    def date_bounds(self, mask=None):
+        """(first, last) date of the selection, or (None, None) without valid dates."""
+        dates = self.rollup("date", mask=mask).index.dropna()
+        if dates.empty:
+            return None, None
+        return dates.min(), dates.max()
+
+    def scenario_basis(self, mask=None, dims=BASIS_DIMS) -> dict:
+        """Same structure as build_scenario_basis() for the selected cells."""
+        return {
+            "total": self.total(BASIS_MEASURE, mask),
+            "by": {dim: self.rollup(dim, BASIS_MEASURE, mask) for dim in dims if dim in self.dims},
+        }
@@ -0,0 +1,86 @@
+import pandas as pd
+import numpy as np
+from scipy.stats import norm
+
+# Rule SS for a scenario (service level sl, lead-time multiplier ltm, demand multiplier dm):
+#     z(sl) * sqrt(forecast * dm) * sqrt(lead_time * ltm)
+#   = [z(sl) * sqrt(dm * ltm)] * [sqrt(forecast) * sqrt(lead_time)]
+# The second factor (the "basis") does not depend on the scenario, so any aggregate
+# of scenario SS is a scalar factor times the same aggregate of the basis.
+# (Per-row rounding to 2 decimals is not reproduced.)
+
+BASIS_DIMS = ("sku_id", "date")
+
+
+def build_scenario_basis(df: pd.DataFrame, dims=BASIS_DIMS) -> dict:
+    """
+    Aggregate the scenario-independent basis sqrt(forecast) * sqrt(lead_time) once.
+
+    Args:
+        df (pd.DataFrame): Baseline rows with 'forecast' and 'lead_time'
+        dims (tuple): Columns to pre-aggregate the basis by (for charts)
+
+    Returns:
+        dict: {"total": float, "by": {dim: pd.Series of basis sums}}
+    """
+    forecast = pd.to_numeric(df["forecast"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    lead_time = pd.to_numeric(df["lead_time"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    with np.errstate(invalid="ignore"):
+        basis = np.sqrt(forecast) * np.sqrt(lead_time)
+    basis = pd.Series(basis, index=df.index)
+
+    by = {}
+    for dim in dims:
+        if dim in df.columns:
+            by[dim] = basis.groupby(df[dim], dropna=False, observed=True).sum()
+    return {"total": float(np.nansum(basis)), "by": by}
+
+
+def scenario_factor(service_level, lead_time_mult, demand_mult) -> np.ndarray:
+    """z(service_level) * sqrt(lead_time_mult * demand_mult), broadcast over array inputs."""
+    service_level, lead_time_mult, demand_mult = np.broadcast_arrays(
+        np.asarray(service_level, dtype="float64"),
+        np.asarray(lead_time_mult, dtype="float64"),
+        np.asarray(demand_mult, dtype="float64"),
+    )
+    return norm.ppf(service_level) * np.sqrt(lead_time_mult * demand_mult)
+
+
+def evaluate_scenario_grid(basis: dict, service_levels, lead_time_mults, demand_mults) -> pd.DataFrame:
+    """
+    Total rule SS for every combination of the given parameter values.
+
+    The whole grid is one broadcasted array operation, so evaluating hundreds of
+    scenarios costs no more than a few vector multiplications.
+
+    Returns:
+        pd.DataFrame: One row per scenario with its parameters and 'total_ss'
+    """
+    sl, ltm, dm = np.meshgrid(
+        np.asarray(service_levels, dtype="float64"),
+        np.asarray(lead_time_mults, dtype="float64"),
+        np.asarray(demand_mults, dtype="float64"),
+        indexing="ij",
+    )
+    totals = scenario_factor(sl, ltm, dm) * basis["total"]
+    return pd.DataFrame({
+        "service_level": sl.ravel(),
+        "lead_time_mult": ltm.ravel(),
+        "demand_mult": dm.ravel(),
+        "total_ss": totals.ravel(),
+    })
+
+
+def scenario_totals(basis: dict, scenarios: dict) -> pd.Series:
+    """Total rule SS per named scenario ({name: {"service_level", "lead_time_mult", "demand_mult"}})."""
+    if not scenarios:
+        return pd.Series(dtype="float64")
+    params = pd.DataFrame.from_dict(scenarios, orient="index")
+    factors = scenario_factor(params["service_level"], params["lead_time_mult"], params["demand_mult"])
+    return pd.Series(factors * basis["total"], index=params.index)
+
+
+def scenario_aggregate(basis: dict, dim: str, service_level: float, lead_time_mult: float,
+                       demand_mult: float) -> pd.Series:
+    """Rule SS of one scenario aggregated by a pre-aggregated dimension (e.g. per SKU or per date)."""
+    return basis["by"][dim] * float(scenario_factor(service_level, lead_time_mult, demand_mult))
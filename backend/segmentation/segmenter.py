@@ -1,18 +1,65 @@
 import pandas as pd
+import numpy as np
 
+# (low, medium) upper bounds per metric; anything above medium is "high".
+# Bias is compared on its absolute value.
+DEFAULT_THRESHOLDS = {
+    "rmse": (10, 20),
+    "bias": (5, 10),
+    "mape": (10, 20),
+}
 
 
-def segmentation_function(metrics_df_original,PAST_SALES_DATA_AVAILABLE,PAST_FORECAST_DATA_AVAILABLE):
+def segmentation_function(metrics_df_original,PAST_SALES_DATA_AVAILABLE,PAST_FORECAST_DATA_AVAILABLE,thresholds=None):
+    """
+    Tier every metrics row and pick its SS method with array operations.
+
+    Args:
+        metrics_df_original (pd.DataFrame): Output of calculate_grouped_accuracy_metrics
+        thresholds (dict, optional): Overrides for DEFAULT_THRESHOLDS, e.g. {"rmse": (8, 15)}
+
+    Returns:
+        pd.DataFrame: Copy of the metrics with a 'Selected_method' column
+    """
     metrics_df = metrics_df_original.copy()
     metrics_df[["std_dev_ss","rmse_ss","mae_ss","hybrid_with_no_var_ss","hybrid_with_var_ss","ml_ss"]] = None
     if PAST_FORECAST_DATA_AVAILABLE and PAST_SALES_DATA_AVAILABLE:
-        for i in range(len(metrics_df)):
-            rmse_level,bias_level,mape_level = select_method(metrics_df.loc[i,"RMSE"],metrics_df.loc[i,"Bias"],metrics_df.loc[i,"MAPE (%)"])
-            metrics_df.loc[i,"Selected_method"] = take_decision(rmse_level,bias_level,mape_level)
+        rmse_tier, bias_tier, mape_tier = select_method_vectorized(
+            metrics_df["RMSE"], metrics_df["Bias"], metrics_df["MAPE (%)"], thresholds
+        )
+        metrics_df["Selected_method"] = take_decision_vectorized(rmse_tier, bias_tier, mape_tier)
         return metrics_df
     else:
         return "There are no past Data"
 
+
+def _tier(values, bounds):
+    """Bin values into low/medium/high; NaN falls through to "high" like the scalar rules."""
+    values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    low, medium = bounds
+    return np.select([values <= low, values <= medium], ["low", "medium"], default="high")
+
+
+def select_method_vectorized(rmse_pct, bias_pct, mape_pct, thresholds=None):
+    """Array version of select_method: returns (rmse_tiers, bias_tiers, mape_tiers)."""
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    rmse_level = _tier(rmse_pct, thresholds["rmse"])
+    bias_level = _tier(np.abs(pd.to_numeric(pd.Series(bias_pct), errors="coerce")), thresholds["bias"])
+    mape_level = _tier(mape_pct, thresholds["mape"])
+    return rmse_level, bias_level, mape_level
+
+
+def take_decision_vectorized(rmse_tier, bias_tier, mape_tier):
+    """Array version of take_decision."""
+    rmse_tier, bias_tier, mape_tier = np.asarray(rmse_tier), np.asarray(bias_tier), np.asarray(mape_tier)
+    conditions = [
+        (rmse_tier == "high") | (bias_tier == "high"),
+        (rmse_tier == "low") & (bias_tier == "low") & np.isin(mape_tier, ["low", "medium"]),
+        (rmse_tier == "medium") & (bias_tier == "low"),
+    ]
+    choices = ["Rule-based SS", "Forecast-based SS", "Hybrid"]
+    return np.select(conditions, choices, default="Rule-based SS")
+
 # def select_method(rmse_pct, bias_pct, mape_pct):
 #      # RMSE levels
 #     rmse_level = "low" if rmse_pct <= 10 else "medium" if rmse_pct <= 20 else "high"
@@ -54,13 +101,17 @@ def segmentation_function(metrics_df_original,PAST_SALES_DATA_AVAILABLE,PAST_FOR
 #             return "Rule-based SS"
 
 #     return "Rule-based SS"
-def select_method(rmse_pct, bias_pct, mape_pct):
+def select_method(rmse_pct, bias_pct, mape_pct, thresholds=None):
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    (rmse_low, rmse_med), (bias_low, bias_med), (mape_low, mape_med) = (
+        thresholds["rmse"], thresholds["bias"], thresholds["mape"]
+    )
     # RMSE levels
-    rmse_level = "low" if rmse_pct <= 10 else "medium" if rmse_pct <= 20 else "high"
+    rmse_level = "low" if rmse_pct <= rmse_low else "medium" if rmse_pct <= rmse_med else "high"
     # Bias levels
-    bias_level = "low" if abs(bias_pct) <= 5 else "medium" if abs(bias_pct) <= 10 else "high"
+    bias_level = "low" if abs(bias_pct) <= bias_low else "medium" if abs(bias_pct) <= bias_med else "high"
     # MAPE levels
-    mape_level = "low" if mape_pct <= 10 else "medium" if mape_pct <= 20 else "high"
+    mape_level = "low" if mape_pct <= mape_low else "medium" if mape_pct <= mape_med else "high"
 
     return rmse_level, bias_level, mape_level
 
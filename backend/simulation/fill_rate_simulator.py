@@ -0,0 +1,222 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import numpy as np
+
+from backend.accuracy.group_statistics import (
+    GROUP_KEYS,
+    aggregate_group_sums,
+    derive_group_statistics,
+    broadcast_to_rows,
+)
+from backend.modules.batch_engine import BATCH_SS_COLUMNS
+from backend.modules.rule_based import _as_float_array
+
+SIM_SS_COLUMNS = ["rule_ss", "ml_ss", "bayesian_ss", "final_ss"] + [
+    col for col in BATCH_SS_COLUMNS if col != "weight_rmse"
+]
+DISTRIBUTIONS = ("normal", "empirical")
+
+
+def _error_model(output_df: pd.DataFrame, aligned_df: pd.DataFrame | None, group_keys: list) -> dict:
+    """
+    Per-row forecast error parameters from the aligned history.
+
+    Error is forecast - actual (as in group_statistics). Rows whose group has no
+    history fall back to the rule-based assumption: unbiased, sigma = sqrt(forecast),
+    fixed lead time.
+    """
+    forecast = _as_float_array(output_df["forecast"])
+    with np.errstate(invalid="ignore"):
+        model = {
+            "err_mean": np.zeros(len(output_df)),
+            "err_std": np.sqrt(forecast),
+            "sigma_lt": np.zeros(len(output_df)),
+            "group_pos": np.full(len(output_df), -1, dtype="int64"),
+            "residuals": np.empty(0),
+            "offsets": np.empty(0, dtype="int64"),
+            "counts": np.empty(0, dtype="int64"),
+        }
+    if aligned_df is None or aligned_df.empty:
+        return model
+
+    sums = aggregate_group_sums(aligned_df, group_keys)
+    stats = derive_group_statistics(sums)
+    stats["err_std"] = np.sqrt(np.clip(stats["rmse"] ** 2 - stats["bias"] ** 2, 0.0, None))
+    stats["group_pos"] = np.arange(len(stats), dtype="float64")
+    rows = broadcast_to_rows(stats[["bias", "err_std", "sigma_lt", "group_pos"]], output_df)
+
+    has_hist = rows["group_pos"].notna().to_numpy() & (rows["bias"].notna().to_numpy())
+    model["err_mean"] = np.where(has_hist, rows["bias"].to_numpy(), model["err_mean"])
+    model["err_std"] = np.where(has_hist, rows["err_std"].to_numpy(), model["err_std"])
+    model["sigma_lt"] = np.where(has_hist, np.nan_to_num(rows["sigma_lt"].to_numpy()), 0.0)
+    model["group_pos"] = np.where(has_hist, rows["group_pos"].fillna(-1).to_numpy(), -1).astype("int64")
+
+    # Residuals grouped contiguously, in the same group order as `stats`
+    err = _as_float_array(aligned_df["forecast"]) - _as_float_array(aligned_df["actual"])
+    keep = ~np.isnan(err)
+    if len(group_keys) == 1:
+        lookup = pd.Index(aligned_df[group_keys[0]])
+    else:
+        lookup = pd.MultiIndex.from_frame(aligned_df[group_keys])
+    pos = stats.index.get_indexer(lookup)[keep]
+    err = err[keep]
+    order = np.argsort(pos, kind="stable")
+    model["residuals"] = err[order]
+    model["counts"] = np.bincount(pos, minlength=len(stats)).astype("int64")
+    model["offsets"] = np.concatenate([[0], np.cumsum(model["counts"])[:-1]]).astype("int64")
+    return model
+
+
+def _simulate_chunk(task):
+    """Simulate one block of rows. Returns (cycle service level, fill rate), each rows x ss columns."""
+    (seed_seq, forecast, lead_time, ss, err_mean, err_std, sigma_lt, group_pos,
+     residuals, offsets, counts, n_sims, distribution, lead_time_variability) = task
+    rng = np.random.default_rng(seed_seq)
+    m = len(forecast)
+    f = forecast[:, None]
+
+    if lead_time_variability:
+        lt = np.clip(lead_time[:, None] + sigma_lt[:, None] * rng.standard_normal((m, n_sims)), 0.0, None)
+    else:
+        lt = np.broadcast_to(lead_time[:, None], (m, n_sims))
+    sqrt_lt = np.sqrt(lt)
+
+    # Demand over the lead time: per-period actual = forecast - error, summed over lt periods.
+    # The error sum is approximated as lt * mean + sqrt(lt) * (one centred error draw).
+    mu = err_mean[:, None]
+    shock = err_std[:, None] * rng.standard_normal((m, n_sims))
+    if distribution == "empirical":
+        row_counts = np.where(group_pos >= 0, counts[np.clip(group_pos, 0, None)] if len(counts) else 0, 0)
+        has_res = row_counts > 0
+        if has_res.any():
+            u = rng.random((int(has_res.sum()), n_sims))
+            idx = offsets[group_pos[has_res]][:, None] + (u * row_counts[has_res][:, None]).astype("int64")
+            shock[has_res] = residuals[idx] - mu[has_res]
+    demand = np.clip(lt * (f - mu) - sqrt_lt * shock, 0.0, None)
+
+    # Reorder point = expected lead-time demand + safety stock
+    planned = forecast * lead_time
+    total_demand = demand.sum(axis=1)
+    csl = np.full((m, ss.shape[1]), np.nan)
+    fill = np.full((m, ss.shape[1]), np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for j in range(ss.shape[1]):
+            shortage = np.clip(demand - (planned + ss[:, j])[:, None], 0.0, None)
+            csl[:, j] = 1.0 - (shortage > 0).mean(axis=1)
+            fill[:, j] = np.where(total_demand > 0, 1.0 - shortage.sum(axis=1) / total_demand, 1.0)
+    invalid = np.isnan(ss) | np.isnan(planned)[:, None]
+    csl[invalid] = np.nan
+    fill[invalid] = np.nan
+    return csl, fill
+
+
+def simulate_service_levels(
+    output_df: pd.DataFrame,
+    aligned_df: pd.DataFrame | None = None,
+    ss_columns=None,
+    n_sims: int = 1000,
+    seed: int = 0,
+    distribution: str = "normal",
+    lead_time_variability: bool = True,
+    chunk_rows: int | None = None,
+    n_jobs: int = 1,
+    group_keys=None,
+) -> pd.DataFrame:
+    """
+    Monte Carlo check of the achieved cycle service level and fill rate per row.
+
+    For every row, n_sims lead-time demand scenarios are drawn from the historical
+    error distribution of its group (normal with the group's bias/std, or bootstrapped
+    residuals when distribution="empirical"), with lead times varied by the group's
+    sigma_lt. A scenario stocks out when demand exceeds forecast * lead_time + SS.
+    Fill rate is the share of simulated lead-time demand served from stock.
+
+    Rows are simulated in chunks of chunk_rows x n_sims draws. Each chunk has its own
+    RNG stream spawned from `seed`, so results are reproducible and identical for any
+    n_jobs. All SS columns are evaluated against the same draws.
+
+    Args:
+        output_df (pd.DataFrame): Selector output ('forecast', 'lead_time', SS columns, group keys)
+        aligned_df (pd.DataFrame, optional): Output of align_forecast_to_actual (error history)
+        ss_columns (list, optional): SS columns to validate (default: those of SIM_SS_COLUMNS present)
+        n_sims (int): Scenarios per row
+        seed (int): Root seed
+        distribution (str): "normal" or "empirical"
+        lead_time_variability (bool): Vary lead times by the group's sigma_lt
+        chunk_rows (int, optional): Rows per chunk (default: ~4M draws per chunk)
+        n_jobs (int): Worker processes (-1 = all cores)
+        group_keys (list, optional): Grouping columns for the error history
+
+    Returns:
+        pd.DataFrame: Indexed like output_df with '<col>_csl' and '<col>_fill_rate' per SS column
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution: {distribution!r} (expected one of {DISTRIBUTIONS})")
+    group_keys = list(group_keys or GROUP_KEYS)
+    ss_columns = list(ss_columns or [c for c in SIM_SS_COLUMNS if c in output_df.columns])
+    if not ss_columns:
+        raise ValueError("No safety stock columns to simulate")
+
+    model = _error_model(output_df, aligned_df, group_keys)
+    forecast = _as_float_array(output_df["forecast"])
+    lead_time = _as_float_array(output_df["lead_time"])
+    ss = np.column_stack([_as_float_array(pd.to_numeric(output_df[c], errors="coerce")) for c in ss_columns])
+
+    chunk_rows = chunk_rows or max(1, 4_000_000 // n_sims)
+    starts = list(range(0, len(output_df), chunk_rows))
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    tasks = [
+        (
+            seeds[i], forecast[s:s + chunk_rows], lead_time[s:s + chunk_rows], ss[s:s + chunk_rows],
+            model["err_mean"][s:s + chunk_rows], model["err_std"][s:s + chunk_rows],
+            model["sigma_lt"][s:s + chunk_rows], model["group_pos"][s:s + chunk_rows],
+            model["residuals"], model["offsets"], model["counts"],
+            n_sims, distribution, lead_time_variability,
+        )
+        for i, s in enumerate(starts)
+    ]
+
+    n_jobs = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+    if n_jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(_simulate_chunk, tasks))
+    else:
+        results = [_simulate_chunk(task) for task in tasks]
+
+    if results:
+        csl = np.vstack([r[0] for r in results])
+        fill = np.vstack([r[1] for r in results])
+    else:
+        csl = fill = np.empty((0, len(ss_columns)))
+
+    out = {}
+    for j, col in enumerate(ss_columns):
+        out[f"{col}_csl"] = csl[:, j]
+        out[f"{col}_fill_rate"] = fill[:, j]
+    return pd.DataFrame(out, index=output_df.index)
+
+
+def summarize_simulation(sim_df: pd.DataFrame, output_df: pd.DataFrame, group_keys=None) -> pd.DataFrame:
+    """
+    Average simulated results per group next to the requested service level.
+
+    Args:
+        sim_df (pd.DataFrame): Output of simulate_service_levels
+        output_df (pd.DataFrame): The frame that was simulated (group keys, 'service_level')
+        group_keys (list, optional): Grouping columns (default: sku_id, location_id, echelon_type)
+
+    Returns:
+        pd.DataFrame: One row per group with 'target_service_level', every simulated
+            column averaged, and '<col>_csl_gap' (achieved minus target)
+    """
+    group_keys = list(group_keys or GROUP_KEYS)
+    parts = sim_df.copy()
+    parts["target_service_level"] = pd.to_numeric(output_df["service_level"], errors="coerce").to_numpy()
+    for key in group_keys:
+        parts[key] = output_df[key].to_numpy()
+    summary = parts.groupby(group_keys, sort=False, dropna=False, observed=True).mean()
+    for col in [c for c in sim_df.columns if c.endswith("_csl")]:
+        summary[f"{col}_gap"] = summary[col] - summary["target_service_level"]
+    return summary.reset_index()
@@ -0,0 +1,333 @@
+import json
+import os
+import sqlite3
+import uuid
+from contextlib import closing
+from datetime import datetime, timezone
+
+import pandas as pd
+import numpy as np
+
+KEY_COLUMNS = ["echelon_type", "location_id", "sku_id", "date"]
+AGGREGATES = {"sum": "SUM", "mean": "AVG", "min": "MIN", "max": "MAX", "count": "COUNT"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    table_name TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    last_used_at TEXT NOT NULL,
+    n_rows INTEGER NOT NULL,
+    columns TEXT NOT NULL,
+    types TEXT NOT NULL,
+    params TEXT
+);
+"""
+
+# Indexes created on every run table (only over the key columns the run has)
+_INDEXES = {
+    "slice": KEY_COLUMNS,
+    "sku": ["sku_id", "date"],
+    "date": ["date"],
+}
+
+
+def _sql_type(dtype) -> str:
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_numeric_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+
+def _quote(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class ResultsStore:
+    """
+    SQLite store of pipeline outputs, one run per write_run() call.
+
+    Each run gets its own table, typed from that run's dtypes and indexed by
+    (echelon_type, location_id, sku_id, date), so runs with different result columns
+    (ml_ss, rule_ss, ...) or different types for the same column do not share a schema.
+    The `runs` table maps run ids to their tables and records the column types, which
+    query() restores. Dates are stored as ISO strings so range filters use the index.
+    Queries return only the requested slice, page or aggregate, so callers never need
+    the whole run in memory.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            run_columns = [row[1] for row in conn.execute("PRAGMA table_info(runs)")]
+            if run_columns and "table_name" not in run_columns:
+                # Shared-table layout of earlier versions; the store only caches pipeline outputs
+                conn.execute("DROP TABLE IF EXISTS results")
+                conn.execute("DROP TABLE runs")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _run_meta(self, run_id: str) -> tuple:
+        """(table name, columns, column -> SQL type) of a run."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT table_name, columns, types FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown run: {run_id}")
+        return row[0], json.loads(row[1]), json.loads(row[2])
+
+    # --- writing ---
+    def write_run(self, df: pd.DataFrame, run_id: str | None = None, params: dict | None = None,
+                  chunk_size: int = 100_000) -> str:
+        """
+        Insert a result frame as a new run (an existing run_id is replaced).
+
+        Returns:
+            str: The run id
+        """
+        run_id = run_id or uuid.uuid4().hex[:16]
+        columns = [c for c in df.columns if c != "row_no"]
+        types = {col: "TEXT" if col in KEY_COLUMNS else _sql_type(df[col].dtype) for col in columns}
+        table = f"results_{uuid.uuid4().hex}"
+
+        with closing(self._connect()) as conn, conn:
+            old = conn.execute("SELECT table_name FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            definitions = ", ".join(f"{_quote(col)} {types[col]}" for col in columns)
+            conn.execute(f"CREATE TABLE {_quote(table)} (row_no INTEGER PRIMARY KEY, {definitions})")
+
+            insert = (f"INSERT INTO {_quote(table)} ({', '.join(map(_quote, ['row_no'] + columns))}) "
+                      f"VALUES ({', '.join('?' * (len(columns) + 1))})")
+            for start in range(0, len(df), chunk_size):
+                chunk = df.iloc[start:start + chunk_size]
+                data = {"row_no": np.arange(start, start + len(chunk))}
+                for col in columns:
+                    data[col] = self._to_sql_values(chunk[col])
+                frame = pd.DataFrame(data, columns=["row_no"] + columns).astype(object)
+                frame = frame.where(frame.notna(), None)
+                conn.executemany(insert, frame.itertuples(index=False, name=None))
+
+            for name, index_cols in _INDEXES.items():
+                index_cols = [c for c in index_cols if c in columns]
+                if index_cols:
+                    conn.execute(f"CREATE INDEX {_quote(f'{table}_{name}')} ON {_quote(table)} "
+                                 f"({', '.join(map(_quote, index_cols))})")
+
+            now = _now()
+            conn.execute(
+                "INSERT OR REPLACE INTO runs (run_id, table_name, created_at, last_used_at, n_rows, columns, types, "
+                "params) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, table, now, now, len(df), json.dumps(columns), json.dumps(types),
+                 json.dumps(params or {}, default=str)),
+            )
+            if old is not None:
+                conn.execute(f"DROP TABLE IF EXISTS {_quote(old[0])}")
+        return run_id
+
+    @staticmethod
+    def _to_sql_values(series: pd.Series) -> pd.Series:
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series.dt.strftime("%Y-%m-%d")
+        if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(series):
+            return series.astype("string")
+        if pd.api.types.is_bool_dtype(series):
+            return series.astype("Int64")
+        if pd.api.types.is_numeric_dtype(series):
+            return series.astype("float64") if not pd.api.types.is_integer_dtype(series) else series.astype("Int64")
+        return series.astype("string")
+
+    @staticmethod
+    def _restore_types(df: pd.DataFrame, types: dict) -> pd.DataFrame:
+        """Give columns read back from SQLite the type they were written with."""
+        for col in df.columns:
+            if col == "date":
+                df[col] = pd.to_datetime(df[col], errors="coerce")
+            elif types.get(col) == "INTEGER":
+                df[col] = df[col].astype("Int64")
+            elif types.get(col) == "REAL":
+                df[col] = df[col].astype("float64")
+        return df
+
+    # --- metadata ---
+    def has_run(self, run_id: str) -> bool:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,)).fetchone() is not None
+
+    def touch_run(self, run_id: str) -> None:
+        """Mark a run as used now, so prune_runs() keeps it over runs nobody has looked at."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("UPDATE runs SET last_used_at = ? WHERE run_id = ?", (_now(), run_id))
+
+    def list_runs(self) -> pd.DataFrame:
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query("SELECT * FROM runs ORDER BY created_at DESC", conn)
+
+    def run_columns(self, run_id: str) -> list:
+        return self._run_meta(run_id)[1]
+
+    def prune_runs(self, keep: int, protect=()) -> list:
+        """
+        Delete all but the `keep` most recently used runs (written or touched; runs in
+        `protect` are never deleted).
+
+        Returns:
+            list: Ids of the deleted runs
+        """
+        with closing(self._connect()) as conn:
+            run_ids = [row[0] for row in conn.execute(
+                "SELECT run_id FROM runs ORDER BY last_used_at DESC, created_at DESC, rowid DESC"
+            )]
+        protect = set([protect] if isinstance(protect, str) else protect)
+        stale = [run_id for run_id in run_ids[max(keep, 0):] if run_id not in protect]
+        for run_id in stale:
+            self.delete_run(run_id)
+        return stale
+
+    def delete_run(self, run_id: str) -> None:
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT table_name FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            if row is not None:
+                conn.execute(f"DROP TABLE IF EXISTS {_quote(row[0])}")
+            conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+    # --- querying ---
+    @staticmethod
+    def _where(filters: dict | None, date_from, date_to, known) -> tuple:
+        clauses, params = [], []
+        for col, value in (filters or {}).items():
+            if col not in known:
+                raise ValueError(f"Unknown column in filter: {col}")
+            values = [value] if isinstance(value, (str, int, float)) else list(value)
+            if not values:
+                continue
+            if col == "date":
+                values = [pd.Timestamp(v).strftime("%Y-%m-%d") for v in values]
+            else:
+                values = [str(v) if col in KEY_COLUMNS else v for v in values]
+            clauses.append(f"{_quote(col)} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        if date_from is not None:
+            clauses.append("date >= ?")
+            params.append(pd.Timestamp(date_from).strftime("%Y-%m-%d"))
+        if date_to is not None:
+            clauses.append("date <= ?")
+            params.append(pd.Timestamp(date_to).strftime("%Y-%m-%d"))
+        return " AND ".join(clauses) or "1", params
+
+    @staticmethod
+    def _check_columns(run_id: str, available: list, columns) -> None:
+        unknown = [c for c in columns if c not in available]
+        if unknown:
+            raise ValueError(f"Columns not in run {run_id}: {unknown}")
+
+    def query(self, run_id: str, filters: dict | None = None, date_from=None, date_to=None, columns=None,
+              order_by=None, limit: int | None = None, offset: int = 0) -> pd.DataFrame:
+        """
+        A filtered slice of a run.
+
+        Args:
+            run_id (str): Run to read
+            filters (dict, optional): Column -> value or list of values (IN filter)
+            date_from, date_to (optional): Inclusive date range
+            columns (list, optional): Columns to return (default: all columns of the run)
+            order_by (list, optional): Sort columns (default: original row order)
+            limit (int, optional): Page size
+            offset (int): Rows to skip
+
+        Returns:
+            pd.DataFrame: The matching rows with 'date' parsed and the run's column types
+        """
+        table, available, types = self._run_meta(run_id)
+        columns = list(columns or available)
+        self._check_columns(run_id, available, list(columns) + list(order_by or []))
+        where, params = self._where(filters, date_from, date_to, available)
+        order = ", ".join(map(_quote, order_by)) if order_by else "row_no"
+        sql = f"SELECT {', '.join(map(_quote, columns))} FROM {_quote(table)} WHERE {where} ORDER BY {order}"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [int(limit), int(offset)]
+        with closing(self._connect()) as conn:
+            df = pd.read_sql_query(sql, conn, params=params)
+        return self._restore_types(df, types)
+
+    def iter_query(self, run_id: str, chunk_size: int = 100_000, **kwargs):
+        """Yield query() results chunk by chunk (for exports of whole runs or large slices)."""
+        table, available, types = self._run_meta(run_id)
+        columns = list(kwargs.pop("columns", None) or available)
+        where, params = self._where(kwargs.pop("filters", None), kwargs.pop("date_from", None),
+                                    kwargs.pop("date_to", None), available)
+        if kwargs:
+            raise TypeError(f"Unexpected arguments: {sorted(kwargs)}")
+        self._check_columns(run_id, available, columns)
+        sql = f"SELECT {', '.join(map(_quote, columns))} FROM {_quote(table)} WHERE {where} ORDER BY row_no"
+        with closing(self._connect()) as conn:
+            for chunk in pd.read_sql_query(sql, conn, params=params, chunksize=chunk_size):
+                yield self._restore_types(chunk, types)
+
+    def count(self, run_id: str, filters: dict | None = None, date_from=None, date_to=None) -> int:
+        table, available, _ = self._run_meta(run_id)
+        where, params = self._where(filters, date_from, date_to, available)
+        with closing(self._connect()) as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {_quote(table)} WHERE {where}", params).fetchone()[0]
+
+    def distinct(self, run_id: str, column: str, filters: dict | None = None) -> list:
+        """Sorted distinct non-null values of a column (e.g. for filter widgets)."""
+        table, available, _ = self._run_meta(run_id)
+        self._check_columns(run_id, available, [column])
+        where, params = self._where(filters, None, None, available)
+        sql = (f"SELECT DISTINCT {_quote(column)} FROM {_quote(table)} WHERE {where} "
+               f"AND {_quote(column)} IS NOT NULL ORDER BY 1")
+        with closing(self._connect()) as conn:
+            return [row[0] for row in conn.execute(sql, params)]
+
+    def aggregate(self, run_id: str, metrics: dict, group_by=None, filters: dict | None = None,
+                  date_from=None, date_to=None) -> pd.DataFrame:
+        """
+        Grouped aggregates computed inside SQLite.
+
+        Args:
+            metrics (dict): Column -> aggregate name or list of names (see AGGREGATES),
+                e.g. {"rule_ss": ["sum", "mean"]}
+            group_by (list, optional): Grouping columns (default: whole slice)
+
+        Returns:
+            pd.DataFrame: group_by columns plus one '<column>_<agg>' column per aggregate
+        """
+        group_by = list(group_by or [])
+        table, available, _ = self._run_meta(run_id)
+        self._check_columns(run_id, available, group_by + list(metrics))
+        selects = list(map(_quote, group_by))
+        for col, aggs in metrics.items():
+            for agg in [aggs] if isinstance(aggs, str) else aggs:
+                if agg not in AGGREGATES:
+                    raise ValueError(f"Unknown aggregate {agg!r} (expected one of {list(AGGREGATES)})")
+                selects.append(f"{AGGREGATES[agg]}({_quote(col)}) AS {_quote(f'{col}_{agg}')}")
+        where, params = self._where(filters, date_from, date_to, available)
+        sql = f"SELECT {', '.join(selects)} FROM {_quote(table)} WHERE {where}"
+        if group_by:
+            sql += f" GROUP BY {', '.join(map(_quote, group_by))} ORDER BY {', '.join(map(_quote, group_by))}"
+        with closing(self._connect()) as conn:
+            df = pd.read_sql_query(sql, conn, params=params)
+        if "date" in df.columns:
+            df["date"] = pd.to_datetime(df["date"], errors="coerce")
+        return df
+
+
+_stores = {}
+
+
+def get_results_store(db_path: str) -> ResultsStore:
+    """Process-wide ResultsStore per database path (schema is only checked once)."""
+    store = _stores.get(db_path)
+    if store is None:
+        store = _stores[db_path] = ResultsStore(db_path)
+    return store
@@ -0,0 +1,112 @@
+import os
+
+import pandas as pd
+import numpy as np
+
+import backend.config as config
+
+# Upstream echelons see the aggregated (larger, smoother) demand of the ones below
+DEFAULT_ECHELONS = {"Store": 1.0, "DC": 4.0, "Plant": 12.0}
+DEFAULT_LEAD_TIMES = {"Store": (1, 4), "DC": (3, 8), "Plant": (7, 15)}
+
+# Named scales: (n_skus, n_locations, n_history_days, n_future_days)
+SCALES = {
+    "small": (10, 2, 60, 14),
+    "medium": (200, 5, 180, 28),
+    "large": (2000, 10, 365, 28),
+}
+
+
+def generate_datasets(n_skus: int = 10, n_locations: int = 2, n_history_days: int = 60, n_future_days: int = 14,
+                      echelons: dict | None = None, seed: int = 0, start_date: str = "2024-01-01",
+                      column_mapping: dict | None = None):
+    """
+    Synthetic multi-echelon past forecast, past sales and future forecast.
+
+    Every sku x location x echelon group gets a base demand (lognormal, scaled by the
+    echelon's multiplier), weekly seasonality, a forecast bias and an error level, so
+    the groups spread across the segmentation tiers. Frames use the raw column names of
+    column_mapping (default: config.column_mapping), i.e. they look like user uploads.
+    The same seed always produces the same data.
+
+    Args:
+        n_skus (int): Number of SKUs
+        n_locations (int): Number of locations
+        n_history_days (int): Days of past forecast / sales
+        n_future_days (int): Days of future forecast
+        echelons (dict, optional): Echelon name -> demand multiplier (default: DEFAULT_ECHELONS)
+        seed (int): Random seed
+        start_date (str): First history date
+        column_mapping (dict, optional): Standard name -> raw column name
+
+    Returns:
+        tuple: (past_forecast_df, actual_df, future_forecast_df)
+    """
+    rng = np.random.default_rng(seed)
+    echelons = echelons or DEFAULT_ECHELONS
+    mapping = column_mapping or config.column_mapping
+
+    sku = np.repeat([f"SKU{i:05d}" for i in range(n_skus)], n_locations * len(echelons))
+    loc = np.tile(np.repeat([f"LOC{j:03d}" for j in range(n_locations)], len(echelons)), n_skus)
+    ech = np.tile(list(echelons), n_skus * n_locations)
+    n_groups = len(sku)
+
+    scale = np.array([echelons[e] for e in ech])
+    base = rng.lognormal(mean=3.0, sigma=0.8, size=n_groups) * scale
+    error_cv = rng.uniform(0.05, 0.45, n_groups)
+    bias = rng.normal(0.0, 0.08, n_groups)
+    lt_bounds = np.array([DEFAULT_LEAD_TIMES.get(e, (1, 10)) for e in ech])
+    lead_time = rng.integers(lt_bounds[:, 0], lt_bounds[:, 1] + 1)
+    service_level = rng.choice([0.9, 0.95, 0.98], n_groups)
+
+    def frame(n_days, first_day, with_actual):
+        g = np.repeat(np.arange(n_groups), n_days)
+        day = np.tile(np.arange(first_day, first_day + n_days), n_groups)
+        season = 1.0 + 0.2 * np.sin(2 * np.pi * day / 7)
+        expected = base[g] * season
+        forecast = np.round(expected * (1 + bias[g]), 2)
+        df = pd.DataFrame({
+            mapping["sku_id"]: sku[g],
+            mapping["location_id"]: loc[g],
+            mapping["echelon_type"]: ech[g],
+            mapping["date"]: (pd.Timestamp(start_date) + pd.to_timedelta(day, unit="D")).strftime("%Y-%m-%d"),
+            mapping["forecast"]: forecast,
+            mapping["lead_time"]: lead_time[g],
+            mapping["service_level"]: service_level[g],
+        })
+        actual = None
+        if with_actual:
+            actual = df[[mapping[k] for k in ("sku_id", "location_id", "echelon_type", "date")]].copy()
+            noise = rng.normal(0.0, error_cv[g] * expected)
+            actual[mapping["actual"]] = np.round(np.clip(expected + noise, 0, None), 2)
+        return df, actual
+
+    past_forecast_df, actual_df = frame(n_history_days, 0, with_actual=True)
+    future_forecast_df, _ = frame(n_future_days, n_history_days, with_actual=False)
+    return past_forecast_df, actual_df, future_forecast_df
+
+
+def generate_scale(scale: str, seed: int = 0):
+    """generate_datasets for one of the named SCALES."""
+    n_skus, n_locations, n_history_days, n_future_days = SCALES[scale]
+    return generate_datasets(n_skus, n_locations, n_history_days, n_future_days, seed=seed)
+
+
+def write_datasets(out_dir: str, scale: str = "small", seed: int = 0, file_format: str = "csv") -> dict:
+    """
+    Write a generated scale to out_dir (e.g. data/raw) as csv or parquet.
+
+    Returns:
+        dict: Dataset name -> written path
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    frames = dict(zip(["past_forecast", "actual_sales", "future_forecast"], generate_scale(scale, seed)))
+    paths = {}
+    for name, df in frames.items():
+        path = os.path.join(out_dir, f"{name}_{scale}.{file_format}")
+        if file_format == "parquet":
+            df.to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+        paths[name] = path
+    return paths
@@ -0,0 +1,205 @@
+"""
+Time and memory-profile every pipeline stage on generated data.
+
+    python -m benchmarks.run_benchmarks --scales small medium --output benchmark_results.json
+    python -m benchmarks.run_benchmarks --scales small --compare baseline.json --max-slowdown 1.25
+
+Each stage runs `--repeat` times for timing (best and median wall time are kept) and
+once more under tracemalloc for peak Python memory. tracemalloc slows allocation-heavy
+stages (the per-group ML fits in particular) many times over; pass --no-memory for
+timing only. With --compare the run exits with status 1 when a stage is slower than the
+baseline by more than --max-slowdown.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import backend.config as config
+from backend.preprocessing.input_cleaner import clean_and_prepare_inputs
+from backend.preprocessing.forecast_aligner import align_forecast_to_actual
+from backend.accuracy.metrics_calculator import calculate_grouped_accuracy_metrics
+from backend.segmentation.segmenter import segmentation_function
+from backend.modules.rule_based import calculate_rule_based_safety_stock
+from backend.modules.batch_engine import calculate_error_based_safety_stock_batch
+from backend.modules.ml_based import predict_ml_based_safety_stock
+from backend.modules.bayesian import predict_bayesian_safety_stock
+from backend.module_selector import run_safety_stock_selector
+from benchmarks.data_generator import SCALES, generate_scale
+
+STAGES = [
+    "clean_and_prepare_inputs",
+    "align_forecast_to_actual",
+    "calculate_grouped_accuracy_metrics",
+    "segmentation_function",
+    "rule_based",
+    "error_based_batch",
+    "ml_based",
+    "bayesian",
+    "run_safety_stock_selector",
+]
+
+
+# config flags the selector stage sets; saved and restored around it
+_METHOD_FLAGS = [
+    "PAST_SALES_DATA_AVAILABLE", "PAST_FORECAST_DATA_AVAILABLE",
+    "ONLY_RULE_BASED", "ONLY_ML_BASED", "BOTH_RULE_ML",
+]
+
+
+def _measure(fn, repeat: int, memory: bool = True) -> dict:
+    """Wall time over `repeat` runs plus peak traced memory of one extra run (None if memory=False)."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        finally:
+            tracemalloc.stop()
+    return {
+        "best_s": min(times),
+        "median_s": float(np.median(times)),
+        "peak_mb": peak_mb,
+    }
+
+
+def _stage_functions(past_forecast_df, actual_df, future_forecast_df) -> dict:
+    """Build one zero-argument callable per stage; each stage gets the previous stages' outputs."""
+    def clean():
+        return clean_and_prepare_inputs(
+            past_forecast_df.copy(), actual_df.copy(), future_forecast_df.copy(), config.column_mapping
+        )
+
+    cleaned_forecast, cleaned_actual, cleaned_future = clean()
+    aligned = align_forecast_to_actual(cleaned_forecast.copy(), cleaned_actual.copy())
+    metrics = calculate_grouped_accuracy_metrics(aligned)
+
+    def selector():
+        # set_config_flags changes module globals; restore them so later callers are unaffected
+        saved = {name: getattr(config, name) for name in _METHOD_FLAGS}
+        try:
+            config.set_config_flags(True, "ML + Rule-based")
+            return run_safety_stock_selector(True, True, cleaned_future, cleaned_actual, cleaned_forecast)
+        finally:
+            for name, value in saved.items():
+                setattr(config, name, value)
+
+    return {
+        "clean_and_prepare_inputs": clean,
+        "align_forecast_to_actual": lambda: align_forecast_to_actual(cleaned_forecast.copy(), cleaned_actual.copy()),
+        "calculate_grouped_accuracy_metrics": lambda: calculate_grouped_accuracy_metrics(aligned),
+        "segmentation_function": lambda: segmentation_function(metrics, True, True),
+        "rule_based": lambda: calculate_rule_based_safety_stock(cleaned_future),
+        "error_based_batch": lambda: calculate_error_based_safety_stock_batch(aligned, cleaned_future),
+        "ml_based": lambda: predict_ml_based_safety_stock(
+            cleaned_actual, cleaned_forecast, cleaned_future, n_jobs=config.ML_N_JOBS, mode=config.ML_MODE
+        ),
+        "bayesian": lambda: predict_bayesian_safety_stock(cleaned_actual, cleaned_forecast, cleaned_future),
+        "run_safety_stock_selector": selector,
+    }
+
+
+def run_benchmarks(scales, stages=None, repeat: int = 3, seed: int = 0, memory: bool = True) -> dict:
+    """
+    Benchmark the selected stages at each scale.
+
+    Returns:
+        dict: {"environment": {...}, "results": [{"scale", "stage", "rows", "best_s", "median_s", "peak_mb"}, ...]}
+    """
+    stages = list(stages or STAGES)
+    results = []
+    for scale in scales:
+        past_forecast_df, actual_df, future_forecast_df = generate_scale(scale, seed)
+        functions = _stage_functions(past_forecast_df, actual_df, future_forecast_df)
+        rows = {"history_rows": len(past_forecast_df), "future_rows": len(future_forecast_df)}
+        for stage in stages:
+            stats = _measure(functions[stage], repeat, memory)
+            results.append({"scale": scale, "stage": stage, **rows, **stats})
+            peak = f"{stats['peak_mb']:9.1f} MB" if memory else ""
+            print(f"{scale:>8} {stage:<36} {stats['best_s']:9.3f}s {peak}", flush=True)
+    return {"environment": _environment(seed, repeat), "results": results}
+
+
+def _environment(seed: int, repeat: int) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=False,
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "seed": seed,
+        "repeat": repeat,
+        "ml_mode": config.ML_MODE,
+        "ml_n_jobs": config.ML_N_JOBS,
+    }
+
+
+def compare_results(current: dict, baseline: dict, max_slowdown: float = 1.25) -> list:
+    """
+    Stages whose best time regressed by more than max_slowdown x the baseline.
+
+    Returns:
+        list: (scale, stage, baseline_s, current_s) per regression
+    """
+    base = {(r["scale"], r["stage"]): r["best_s"] for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        before = base.get((r["scale"], r["stage"]))
+        if before and r["best_s"] > before * max_slowdown:
+            regressions.append((r["scale"], r["stage"], before, r["best_s"]))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", default=["small"], choices=list(SCALES))
+    parser.add_argument("--stages", nargs="+", default=None, choices=STAGES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc run")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", default=None, help="Baseline results JSON")
+    parser.add_argument("--max-slowdown", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.scales, args.stages, args.repeat, args.seed, memory=not args.no_memory)
+    with open(args.output, "w") as f:
+        json.dump(current, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(current, baseline, args.max_slowdown)
+        for scale, stage, before, after in regressions:
+            print(f"REGRESSION {scale}/{stage}: {before:.3f}s -> {after:.3f}s")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
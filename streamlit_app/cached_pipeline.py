@@ -0,0 +1,150 @@
+# streamlit_app/cached_pipeline.py
+# Shared by the Upload and Results pages: runs the pipeline once per distinct input.
+import sys, os
+import json
+import tempfile
+import streamlit as st
+import pandas as pd
+
+# Make backend importable
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.preprocessing.input_cleaner import clean_and_prepare_inputs
+from backend.module_selector import run_safety_stock_selector
+from backend.pipeline import frame_fingerprint, pipeline_cache_key
+from backend.instrumentation import run_report, stage
+from backend.storage.results_store import get_results_store
+import backend.config as cfg
+
+ML_METHODS = ("Only ML", "ML + Rule-based")
+
+
+def set_dataset(state_key: str, df: pd.DataFrame):
+    """Store an uploaded frame together with its content fingerprint (hashed once per upload)."""
+    st.session_state[state_key] = df
+    st.session_state[f"{state_key}_fingerprint"] = frame_fingerprint(df)
+
+
+def dataset_fingerprint(state_key: str) -> str:
+    fp_key = f"{state_key}_fingerprint"
+    if st.session_state.get(fp_key) is None:
+        st.session_state[fp_key] = frame_fingerprint(st.session_state.get(state_key))
+    return st.session_state[fp_key]
+
+
+def apply_method_flags(has_past: bool, method_choice: str):
+    """Map the wizard selection onto backend.config flags."""
+    cfg.PAST_SALES_DATA_AVAILABLE = bool(has_past)
+    cfg.PAST_FORECAST_DATA_AVAILABLE = bool(has_past)
+    cfg.BOTH_RULE_ML = (method_choice == "ML + Rule-based")
+    cfg.ONLY_ML_BASED = (method_choice == "Only ML")
+    cfg.ONLY_RULE_BASED = (method_choice == "Only Rule-based")
+
+
+@st.cache_resource(max_entries=4, show_spinner="Calculating safety stock...")
+def _compute_results(cache_key, _forecast_df, _actual_df, _future_forecast_df, _column_mapping, use_past):
+    # Arguments starting with "_" are not hashed by Streamlit; cache_key covers them.
+    # The cleaner works in place, so it gets copies and the session frames stay untouched.
+    with run_report("streamlit_pipeline") as report:
+        with stage("clean_and_prepare_inputs", rows_in=_future_forecast_df) as record:
+            cleaned_forecast, cleaned_actual, cleaned_future_forecast = clean_and_prepare_inputs(
+                forecast_df=_forecast_df.copy() if use_past else pd.DataFrame(),
+                actual_df=_actual_df.copy() if use_past else pd.DataFrame(),
+                future_forecast_df=_future_forecast_df.copy(),
+                column_mapping=_column_mapping
+            )
+            record["rows_out"] = len(cleaned_future_forecast)
+        with stage("run_safety_stock_selector", rows_in=cleaned_future_forecast) as record:
+            results = run_safety_stock_selector(
+                PAST_SALES_DATA_AVAILABLE=use_past,
+                PAST_FORECAST_DATA_AVAILABLE=use_past,
+                cleaned_future_forecast=cleaned_future_forecast,
+                cleaned_actual=cleaned_actual if use_past else None,
+                cleaned_forecast=cleaned_forecast if use_past else None
+            )
+            record["rows_out"] = len(results)
+    return results, report.to_dict()
+
+
+def get_pipeline_results(has_past: bool, method_choice: str, column_mapping: dict) -> pd.DataFrame:
+    """
+    Pipeline output for the datasets in session state, memoized by content.
+
+    The key combines the fingerprints of the uploaded frames, the column mapping and
+    the method flags, so reruns (e.g. filter changes) reuse the stored result and only
+    a new upload or a different method selection triggers a recomputation.
+    The returned frame is shared between reruns and must be treated as read-only.
+    The run report of the computation that produced it is kept in st.session_state["run_report"],
+    and the id of the run in the results store (see store_results) in st.session_state["results_run_id"].
+    """
+    apply_method_flags(has_past, method_choice)
+    use_past = bool(has_past and method_choice in ML_METHODS)
+    names = ["past_forecast_df", "actual_sales_df", "future_forecast_df"] if use_past else ["future_forecast_df"]
+
+    cache_key = pipeline_cache_key(
+        {name: dataset_fingerprint(name) for name in names},
+        column_mapping,
+        {
+            "use_past": use_past, "method_choice": method_choice, "ml_mode": cfg.ML_MODE, "bayesian": cfg.BAYESIAN_SS,
+            "optimize_sl": cfg.OPTIMIZE_SERVICE_LEVEL, "sl_sigma": cfg.SL_SIGMA_METHOD,
+            "sl_costs": (cfg.SL_HOLDING_COST, cfg.SL_SHORTAGE_COST),
+        },
+    )
+    results, report = _compute_results(
+        cache_key,
+        st.session_state.get("past_forecast_df"),
+        st.session_state.get("actual_sales_df"),
+        st.session_state["future_forecast_df"],
+        column_mapping,
+        use_past,
+    )
+    st.session_state["run_report"] = report
+    st.session_state["results_run_id"] = store_results(cache_key, results)
+    return results
+
+
+def results_store():
+    """The results store of the app (a temporary database when cfg.RESULTS_DB_PATH is not set)."""
+    return get_results_store(cfg.RESULTS_DB_PATH or os.path.join(tempfile.gettempdir(), "safety_stock_results.db"))
+
+
+def store_results(cache_key: str, results: pd.DataFrame) -> str:
+    """
+    Write a pipeline result to the results store once per cache key.
+
+    The run id is derived from the cache key, so reruns with the same inputs reuse the
+    stored run (marking it as used) instead of inserting it again. Writing a new run
+    deletes all but the cfg.RESULTS_DB_MAX_RUNS most recently used runs.
+
+    Returns:
+        str: The run id
+    """
+    store = results_store()
+    run_id = cache_key[:16]
+    if store.has_run(run_id):
+        store.touch_run(run_id)
+    else:
+        store.write_run(results, run_id=run_id)
+        store.prune_runs(cfg.RESULTS_DB_MAX_RUNS, protect=run_id)
+    return run_id
+
+
+def render_run_report(report: dict | None):
+    """Expander with the per-stage timings of the run that produced the current results."""
+    if not report:
+        return
+    with st.expander("Run report (stage timings)"):
+        st.caption(f"Run {report['run_id']} started {report['started_at']}, total {report['wall_s']:.2f}s")
+        stages = pd.DataFrame(report["stages"])
+        if not stages.empty:
+            cols = [c for c in ["path", "wall_s", "cpu_s", "rows_in", "rows_out", "rss_delta_mb",
+                                "peak_rss_growth_mb", "start_s"] if c in stages.columns]
+            st.dataframe(stages.sort_values("start_s")[cols], use_container_width=True)
+        fits = report.get("group_fits", {})
+        if fits.get("fits"):
+            st.caption(
+                f"{fits['fits']} group model fits: {fits['total_s']:.2f}s total, "
+                f"median {fits['median_s']:.3f}s, max {fits['max_s']:.3f}s, {fits['cache_hits']} cache hits"
+            )
+            st.dataframe(pd.DataFrame(fits["slowest"]), use_container_width=True)
+        st.download_button("Download run report (JSON)", json.dumps(report, indent=2, default=str),
+                           file_name=f"run_report_{report['run_id']}.json", mime="application/json")
@@ -5,8 +5,9 @@ import pandas as pd
 
 # ---------------- Path setup ----------------
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-from backend.preprocessing.input_cleaner import clean_and_prepare_inputs
-from backend.module_selector import run_safety_stock_selector
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from backend.preprocessing.data_loader import read_input_table
+from cached_pipeline import get_pipeline_results, set_dataset
 
 st.set_page_config(page_title="Safety Stock | Upload", layout="wide")
 
@@ -73,50 +74,19 @@ def load_samples_into_state():
         path = SAMPLE_PATHS[ds]
         if not os.path.exists(path):
             raise FileNotFoundError(f"Sample file not found: {path}")
-        if path.endswith(".csv"):
-            df = pd.read_csv(path)
-        else:
-            df = pd.read_excel(path)
-        st.session_state[DATASET_STATE_KEYS[ds]] = df
+        df = read_input_table(path, st.session_state.column_mapping, keep_unmapped=True)
+        set_dataset(DATASET_STATE_KEYS[ds], df)
         st.session_state.upload_status[ds] = True
 
 
 def process_and_go_to_results():
-    if has_past and method_choice in ("Only ML", "ML + Rule-based"):
-        cleaned_forecast, cleaned_actual, cleaned_future_forecast = clean_and_prepare_inputs(
-            forecast_df=st.session_state["past_forecast_df"],
-            actual_df=st.session_state["actual_sales_df"],
-            future_forecast_df=st.session_state["future_forecast_df"],
-            column_mapping=st.session_state["column_mapping"]
-        )
-        output_df = run_safety_stock_selector(
-            PAST_SALES_DATA_AVAILABLE=True,
-            PAST_FORECAST_DATA_AVAILABLE=True,
-            cleaned_future_forecast=cleaned_future_forecast,
-            cleaned_actual=cleaned_actual,
-            cleaned_forecast=cleaned_forecast
-        )
-    else:
-        _empty = pd.DataFrame()
-        _, _, cleaned_future_forecast = clean_and_prepare_inputs(
-            forecast_df=_empty,
-            actual_df=_empty,
-            future_forecast_df=st.session_state["future_forecast_df"],
-            column_mapping=st.session_state["column_mapping"]
-        )
-        output_df = run_safety_stock_selector(
-            PAST_SALES_DATA_AVAILABLE=False,
-            PAST_FORECAST_DATA_AVAILABLE=False,
-            cleaned_future_forecast=cleaned_future_forecast,
-            cleaned_actual=None,
-            cleaned_forecast=None
-        )
+    output_df = get_pipeline_results(has_past, method_choice, st.session_state["column_mapping"])
 
     if output_df is None or output_df.empty:
         st.error("Processing complete, but no results were generated. Please check your data.")
         return
 
-    st.session_state["final_results_original"] = output_df.copy()
+    st.session_state["final_results_original"] = output_df
     st.session_state["data_uploaded"] = True
 
     try:
@@ -140,18 +110,18 @@ with right:
 
 # ---------------- Manual Upload ----------------
 dataset_to_upload = st.selectbox("Choose which dataset to upload:", required_datasets)
-uploaded = st.file_uploader(f"Upload {dataset_to_upload} (CSV/Excel)", type=["csv", "xlsx"])
+uploaded = st.file_uploader(
+    f"Upload {dataset_to_upload} (CSV/Excel/Parquet/Feather)",
+    type=["csv", "xlsx", "parquet", "feather"],
+)
 
 current_df = st.session_state.get(DATASET_STATE_KEYS[dataset_to_upload], None)
 
 if uploaded is not None:
     try:
-        if uploaded.name.endswith(".csv"):
-            df = pd.read_csv(uploaded)
-        else:
-            df = pd.read_excel(uploaded)
+        df = read_input_table(uploaded, st.session_state.column_mapping, keep_unmapped=True)
 
-        st.session_state[DATASET_STATE_KEYS[dataset_to_upload]] = df
+        set_dataset(DATASET_STATE_KEYS[dataset_to_upload], df)
         current_df = df
 
         missing = [c for c in REQUIRED_COLUMNS[dataset_to_upload] if c not in df.columns]
@@ -1,13 +1,19 @@
 # streamlit_app/pages/3_Results.py
 import sys, os
+import math
+import tempfile
 import streamlit as st
-import pandas as pd
 
 # Make backend importable
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-from backend.preprocessing.input_cleaner import clean_and_prepare_inputs
-from backend.module_selector import run_safety_stock_selector
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import backend.config as cfg
+from backend.export.exporters import export_results
+from cached_pipeline import get_pipeline_results, render_run_report, results_store, ML_METHODS
+
+FILTER_COLUMNS = ["echelon_type", "sku_id", "location_id", "date"]
+PAGE_SIZES = [50, 100, 500, 1000]
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "safety_stock_exports")
 
 st.set_page_config(page_title="Safety Stock | Results", layout="wide")
 st.title("Safety Stock Result")
@@ -20,60 +26,26 @@ if "data_uploaded" not in st.session_state or not st.session_state["data_uploade
 has_past = st.session_state.get("has_past", False)
 method_choice = st.session_state.get("method_choice", "Only Rule-based")
 
-# --- Map method_choice -> backend flags ---
-cfg.PAST_SALES_DATA_AVAILABLE = bool(has_past)
-cfg.PAST_FORECAST_DATA_AVAILABLE = bool(has_past)
-cfg.BOTH_RULE_ML = (method_choice == "ML + Rule-based")
-cfg.ONLY_ML_BASED = (method_choice == "Only ML")
-cfg.ONLY_RULE_BASED = (method_choice == "Only Rule-based")
-
-
-# --- Clean Data ---
-if has_past and method_choice in ("Only ML", "ML + Rule-based"):
+if has_past and method_choice in ML_METHODS:
     if not all(k in st.session_state for k in ["actual_sales_df", "past_forecast_df", "future_forecast_df"]):
         st.error("Some required datasets are missing. Please re-upload in Step 2.")
         st.stop()
+elif "future_forecast_df" not in st.session_state:
+    st.error("Missing Future Forecast data. Please upload it in Step 2.")
+    st.stop()
 
-    cleaned_forecast, cleaned_actual, cleaned_future_forecast = clean_and_prepare_inputs(
-        forecast_df=st.session_state["past_forecast_df"],
-        actual_df=st.session_state["actual_sales_df"],
-        future_forecast_df=st.session_state["future_forecast_df"],
-        column_mapping=cfg.column_mapping
-    )
-
-    output_df = run_safety_stock_selector(
-        PAST_SALES_DATA_AVAILABLE=cfg.PAST_SALES_DATA_AVAILABLE,
-        PAST_FORECAST_DATA_AVAILABLE=cfg.PAST_FORECAST_DATA_AVAILABLE,
-        cleaned_future_forecast=cleaned_future_forecast,
-        cleaned_actual=cleaned_actual,
-        cleaned_forecast=cleaned_forecast
-    )
-else:
-    if "future_forecast_df" not in st.session_state:
-        st.error("Missing Future Forecast data. Please upload it in Step 2.")
-        st.stop()
-
-    _empty = pd.DataFrame()
-    _, _, cleaned_future_forecast = clean_and_prepare_inputs(
-        forecast_df=_empty,
-        actual_df=_empty,
-        future_forecast_df=st.session_state["future_forecast_df"],
-        column_mapping=cfg.column_mapping
-    )
-
-    output_df = run_safety_stock_selector(
-        PAST_SALES_DATA_AVAILABLE=cfg.PAST_SALES_DATA_AVAILABLE,
-        PAST_FORECAST_DATA_AVAILABLE=cfg.PAST_FORECAST_DATA_AVAILABLE,
-        cleaned_future_forecast=cleaned_future_forecast,
-        cleaned_actual=None,
-        cleaned_forecast=None
-    )
+# --- Clean Data & run selector (memoized: reruns with the same inputs reuse the result) ---
+output_df = get_pipeline_results(
+    has_past, method_choice, st.session_state.get("column_mapping", cfg.column_mapping)
+)
 
 # --- Safety net ---
 if output_df is None or output_df.empty:
     st.error("No results were generated. Check method selection and uploaded data.")
     st.stop()
 
+render_run_report(st.session_state.get("run_report"))
+
 # --- Show which results are present ---
 # cols_present = list(output_df.columns)
 # if "ml_ss" in cols_present and "rule_ss" in cols_present:
@@ -85,41 +57,68 @@ if output_df is None or output_df.empty:
 # else:
 #     st.warning("No safety stock columns found. Check method selection and inputs.")
 
-# --- Filters ---
+# --- Filters (option lists are read once per run from the results store) ---
+store = results_store()
+run_id = st.session_state["results_run_id"]
+store.touch_run(run_id)  # keep the run this session is viewing when other sessions prune
+
+
+@st.cache_data(max_entries=8)
+def _filter_options(run_id: str) -> dict:
+    return {col: results_store().distinct(run_id, col) for col in FILTER_COLUMNS}
+
+
+options = _filter_options(run_id)
 st.subheader("Filters")
 col1, col2, col3, col4 = st.columns(4)
 with col1:
-    echelons = st.multiselect("Echelon", options=output_df["echelon_type"].unique())
+    echelons = st.multiselect("Echelon", options=options["echelon_type"])
 with col2:
-    skus = st.multiselect("SKU", options=output_df["sku_id"].unique())
+    skus = st.multiselect("SKU", options=options["sku_id"])
 with col3:
-    locations = st.multiselect("Location", options=output_df["location_id"].unique())
+    locations = st.multiselect("Location", options=options["location_id"])
 with col4:
-    if pd.api.types.is_datetime64_any_dtype(output_df["date"]):
-        dates = st.multiselect("Date", options=output_df["date"].dt.date.unique())
-    else:
-        dates = st.multiselect("Date", options=output_df["date"].unique())
-
-filtered_df = output_df.copy()
-if echelons:
-    filtered_df = filtered_df[filtered_df["echelon_type"].isin(echelons)]
-if skus:
-    filtered_df = filtered_df[filtered_df["sku_id"].isin(skus)]
-if locations:
-    filtered_df = filtered_df[filtered_df["location_id"].isin(locations)]
-if dates:
-    if pd.api.types.is_datetime64_any_dtype(filtered_df["date"]):
-        filtered_df = filtered_df[filtered_df["date"].dt.date.isin(dates)]
-    else:
-        filtered_df = filtered_df[filtered_df["date"].isin(dates)]
-
-# --- Results ---
-st.dataframe(filtered_df, use_container_width=True)
+    dates = st.multiselect("Date", options=options["date"])
 
-# --- Save state ---
-st.session_state["final_results_original"] = output_df.copy()
-st.session_state["final_results_filtered"] = filtered_df.copy()
+filters = {"echelon_type": echelons, "sku_id": skus, "location_id": locations, "date": dates}
+filters = {col: values for col, values in filters.items() if values}
 
-# --- Download ---
-csv = filtered_df.to_csv(index=False).encode("utf-8")
-st.download_button("Download CSV", csv, "safety_stock_results.csv", "text/csv")
+# --- Results (one page at a time, filtered and sliced by the store) ---
+total_rows = store.count(run_id, filters)
+pc1, pc2 = st.columns([1, 3])
+with pc1:
+    page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1)
+n_pages = max(1, math.ceil(total_rows / page_size))
+with pc2:
+    page = st.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, value=1, step=1)
+offset = (int(page) - 1) * page_size
+
+page_df = store.query(run_id, filters=filters, limit=page_size, offset=offset)
+st.dataframe(page_df, use_container_width=True)
+st.caption(f"Rows {min(offset + 1, total_rows):,}-{offset + len(page_df):,} of {total_rows:,}")
+
+# --- Save state ---
+st.session_state["final_results_original"] = output_df
+
+# --- Download (generated only on request, streamed from the store in chunks) ---
+export_key = (run_id, repr(sorted(filters.items())))
+previous_export = st.session_state.get("results_export", {})
+if previous_export.get("key") != export_key:
+    # Only the export of the current filters is kept
+    if previous_export.get("path") and os.path.exists(previous_export["path"]):
+        os.remove(previous_export["path"])
+    st.session_state["results_export"] = {"key": export_key, "path": None}
+
+if st.session_state["results_export"]["path"] is None:
+    if st.button(f"Prepare CSV download ({total_rows:,} rows)"):
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=EXPORT_DIR, prefix="safety_stock_results_", suffix=".csv")
+        os.close(fd)
+        with st.spinner("Writing CSV..."):
+            export_results(store.iter_query(run_id, filters=filters), path, file_format="csv")
+        st.session_state["results_export"]["path"] = path
+
+path = st.session_state["results_export"]["path"]
+if path is not None and os.path.exists(path):
+    with open(path, "rb") as f:
+        st.download_button("Download CSV", f, "safety_stock_results.csv", "text/csv")
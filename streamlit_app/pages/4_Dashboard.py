@@ -7,6 +7,9 @@ import plotly.express as px
 # Import backend
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 from backend.modules.rule_based import calculate_rule_based_safety_stock_df
+from backend.pipeline import frame_fingerprint
+from backend.scenario.rollup_cube import RollupCube
+from backend.scenario.scenario_engine import evaluate_scenario_grid, scenario_aggregate, scenario_totals
 
 st.set_page_config(page_title="Safety Stock | Scenario Planner", layout="wide")
 st.title("Dashboard & Scenario Planner")
@@ -16,71 +19,65 @@ if "final_results_original" not in st.session_state or st.session_state["final_r
     st.error("Original results not found. Please run Step 3: Results first.")
     st.stop()
 
-base_df = st.session_state["final_results_original"].copy()
+base_df = st.session_state["final_results_original"]
 if base_df.empty:
     st.error("No data available. Please generate results in Step 3.")
     st.stop()
 
-# --- Ensure required columns exist ---
-for col in ["sku_id", "location_id", "echelon_type", "date", "forecast", "lead_time", "service_level"]:
-    if col not in base_df.columns:
-        base_df[col] = np.nan
 
-if not pd.api.types.is_datetime64_any_dtype(base_df["date"]):
-    base_df["date"] = pd.to_datetime(base_df["date"], errors="coerce")
+@st.cache_resource(max_entries=4, show_spinner="Building dashboard aggregates...")
+def _rollup_cube(result_key, _df):
+    # Built once per result set; every filter, KPI and chart below is answered from it
+    # (the shared result frame is never modified; assign() works on a copy)
+    missing = {c: np.nan for c in ["sku_id", "location_id", "echelon_type", "date", "forecast",
+                                   "lead_time", "service_level"] if c not in _df.columns}
+    df = _df.assign(**missing) if missing else _df
+    if df["service_level"].isna().all():
+        df = df.assign(service_level=0.95)
+    if "rule_ss" not in df.columns:
+        df = df.assign(rule_ss=calculate_rule_based_safety_stock_df(df)["rule_ss"])
+    return RollupCube(df)
+
+
+cube = _rollup_cube(st.session_state.get("results_run_id") or frame_fingerprint(base_df), base_df)
 
 # ---------------- Dashboard Filters (do not affect Results page) ----------------
 st.markdown("### Filter Data for Analysis")
 fc1, fc2, fc3, fc4 = st.columns(4)
 with fc1:
-    echelons = st.multiselect("Echelon", sorted(base_df["echelon_type"].dropna().unique()))
+    echelons = st.multiselect("Echelon", list(cube.levels["echelon_type"].dropna()))
 with fc2:
-    skus = st.multiselect("SKU", sorted(base_df["sku_id"].dropna().unique()))
+    skus = st.multiselect("SKU", list(cube.levels["sku_id"].dropna()))
 with fc3:
-    locations = st.multiselect("Location", sorted(base_df["location_id"].dropna().unique()))
+    locations = st.multiselect("Location", list(cube.levels["location_id"].dropna()))
 with fc4:
-    if base_df["date"].notna().any():
-        min_d, max_d = base_df["date"].min().date(), base_df["date"].max().date()
-        date_range = st.date_input("Date range", value=(min_d, max_d))
+    min_d, max_d = cube.date_bounds()
+    if min_d is not None:
+        date_range = st.date_input("Date range", value=(min_d.date(), max_d.date()))
     else:
         date_range = ()
 
-filtered = base_df.copy()
-if echelons:
-    filtered = filtered[filtered["echelon_type"].isin(echelons)]
-if skus:
-    filtered = filtered[filtered["sku_id"].isin(skus)]
-if locations:
-    filtered = filtered[filtered["location_id"].isin(locations)]
+start_d = end_d = None
 if isinstance(date_range, (list, tuple)) and len(date_range) == 2 and all(date_range):
     start_d, end_d = pd.to_datetime(date_range[0]), pd.to_datetime(date_range[1])
-    filtered = filtered[(filtered["date"] >= start_d) & (filtered["date"] <= end_d)]
+selection = cube.mask(
+    {"echelon_type": echelons, "sku_id": skus, "location_id": locations}, date_from=start_d, date_to=end_d
+)
 
-if filtered.empty:
+if cube.count(selection) == 0:
     st.info("No rows after applying filters.")
     st.stop()
 
 # ---------------- Baseline Safety Stock ----------------
-baseline_df = filtered.copy()
-if "service_level" not in baseline_df.columns or baseline_df["service_level"].isna().all():
-    baseline_df["service_level"] = 0.95
-
-if "rule_ss" not in baseline_df.columns:
-    rb_base = calculate_rule_based_safety_stock_df(baseline_df)
-    baseline_df["rule_ss"] = rb_base["rule_ss"]
-
 # KPIs
-rule_ss_num = pd.to_numeric(baseline_df["rule_ss"], errors="coerce")
-total_ss = float(rule_ss_num.sum(skipna=True))
-avg_ss_per_sku = (
-    rule_ss_num.groupby(baseline_df["sku_id"]).sum().mean()
-    if "sku_id" in baseline_df.columns else np.nan
-)
-sku_cnt = int(baseline_df["sku_id"].nunique())
-loc_cnt = int(baseline_df["location_id"].nunique())
-ech_cnt = int(baseline_df["echelon_type"].nunique())
-date_min = baseline_df["date"].min().strftime("%Y-%m-%d") if "date" in baseline_df.columns else "N/A"
-date_max = baseline_df["date"].max().strftime("%Y-%m-%d") if "date" in baseline_df.columns else "N/A"
+total_ss = cube.total("rule_ss", selection)
+avg_ss_per_sku = cube.rollup("sku_id", mask=selection).mean()
+sku_cnt = cube.nunique("sku_id", selection)
+loc_cnt = cube.nunique("location_id", selection)
+ech_cnt = cube.nunique("echelon_type", selection)
+date_min, date_max = cube.date_bounds(selection)
+date_min = date_min.strftime("%Y-%m-%d") if date_min is not None else "N/A"
+date_max = date_max.strftime("%Y-%m-%d") if date_max is not None else "N/A"
 date_range_str = f"{date_min} to {date_max}"
 
 
@@ -96,17 +93,6 @@ kpi_style = """
 """
 
 # ======= KPI (Responsive, Equal, Wider) =======
-# compute metrics
-rule_ss_num = pd.to_numeric(baseline_df["rule_ss"], errors="coerce")
-total_ss = float(rule_ss_num.sum(skipna=True))
-avg_ss_per_sku = (
-    rule_ss_num.groupby(baseline_df["sku_id"]).sum().mean()
-    if "sku_id" in baseline_df.columns else np.nan
-)
-sku_cnt = int(baseline_df["sku_id"].nunique())
-loc_cnt = int(baseline_df["location_id"].nunique())
-ech_cnt = int(baseline_df["echelon_type"].nunique())
-
 # make the central content area wider (optional; helps KPI width)
 st.markdown("""
 <style>
@@ -189,13 +175,7 @@ st.markdown(f"""
 st.subheader("Baseline Charts")
 top_n = st.slider("Top N SKUs for charts", min_value=3, max_value=50, value=10, step=1)
 
-ss_by_sku = (
-    baseline_df.groupby("sku_id", dropna=False)["rule_ss"]
-    .sum()
-    .sort_values(ascending=False)
-    .head(top_n)
-    .reset_index()
-)
+ss_by_sku = cube.top_n("sku_id", top_n, mask=selection).rename_axis("sku_id").reset_index()
 if not ss_by_sku.empty:
     fig_top = px.bar(
         ss_by_sku, x="sku_id", y="rule_ss",
@@ -206,14 +186,13 @@ if not ss_by_sku.empty:
     fig_top.update_layout(xaxis_tickangle=-30, hovermode="x unified")
     st.plotly_chart(fig_top, use_container_width=True)
 
-if baseline_df["echelon_type"].notna().any():
-    share_df = baseline_df.groupby("echelon_type", dropna=False)["rule_ss"].sum().reset_index()
+if cube.nunique("echelon_type", selection):
     name_col = "echelon_type"
     title = "Safety Stock Share by Echelon"
 else:
-    share_df = baseline_df.groupby("location_id", dropna=False)["rule_ss"].sum().reset_index()
     name_col = "location_id"
     title = "Safety Stock Share by Location"
+share_df = cube.rollup(name_col, mask=selection).rename_axis(name_col).reset_index()
 
 if not share_df.empty:
     fig_share = px.pie(share_df, names=name_col, values="rule_ss", hole=0.45, title=title)
@@ -224,20 +203,12 @@ if not share_df.empty:
 st.markdown("---")
 st.header("Scenario Manager")
 
-# Store scenarios in session
+# Store scenarios in session (parameters only; results are derived from the basis below)
 if "scenarios" not in st.session_state:
-    st.session_state["scenarios"] = {}  # {name: {"service_level":..., "lead_time_mult":..., "demand_mult":..., "df":...}}
-
-def build_scenario_df(source_df: pd.DataFrame, service_level: float, lt_mult: float, demand_mult: float) -> pd.DataFrame:
-    sc_df = source_df.copy()
-    sc_df["service_level"] = service_level
-    if "lead_time" in sc_df.columns and sc_df["lead_time"].notna().any():
-        sc_df["lead_time"] = sc_df["lead_time"] * lt_mult
-    if "forecast" in sc_df.columns and sc_df["forecast"].notna().any():
-        sc_df["forecast"] = sc_df["forecast"] * demand_mult
-    rb = calculate_rule_based_safety_stock_df(sc_df)
-    sc_df["rule_ss"] = rb["rule_ss"]
-    return sc_df
+    st.session_state["scenarios"] = {}  # {name: {"service_level":..., "lead_time_mult":..., "demand_mult":...}}
+
+# Scenario-independent aggregates of the filtered baseline, read from the cube
+scenario_basis = cube.scenario_basis(selection)
 
 with st.expander("Add or Update Scenario", expanded=True):
     f1, f2, f3, f4 = st.columns([2,1,1,1])
@@ -253,12 +224,10 @@ with st.expander("Add or Update Scenario", expanded=True):
     cadd, cdel, creset = st.columns([1,1,1])
     with cadd:
         if st.button("Save / Recompute Scenario", use_container_width=True):
-            sc_df = build_scenario_df(baseline_df, sc_service, sc_lt_mult, sc_demand_mult)
             st.session_state["scenarios"][sc_name] = {
                 "service_level": sc_service,
                 "lead_time_mult": sc_lt_mult,
                 "demand_mult": sc_demand_mult,
-                "df": sc_df
             }
             st.success(f"Saved scenario: {sc_name}")
     with cdel:
@@ -270,19 +239,19 @@ with st.expander("Add or Update Scenario", expanded=True):
             st.session_state["scenarios"].clear()
             st.info("All scenarios cleared.")
 
+# Totals of all saved scenarios in one vectorized evaluation
+scenario_total_ss = scenario_totals(scenario_basis, st.session_state["scenarios"])
+
 # Summary table of saved scenarios
 if st.session_state["scenarios"]:
-    meta_rows = []
-    for nm, meta in st.session_state["scenarios"].items():
-        total = float(pd.to_numeric(meta["df"]["rule_ss"], errors="coerce").sum(skipna=True))
-        meta_rows.append({
-            "Scenario": nm,
-            "Service Level": round(meta["service_level"], 4),
-            "Lead Time Mult": meta["lead_time_mult"],
-            "Demand Mult": meta["demand_mult"],
-            "Total Safety Stock": total
-        })
-    meta_df = pd.DataFrame(meta_rows).sort_values("Scenario")
+    meta_df = pd.DataFrame.from_dict(st.session_state["scenarios"], orient="index")
+    meta_df = pd.DataFrame({
+        "Scenario": meta_df.index,
+        "Service Level": meta_df["service_level"].round(4).to_numpy(),
+        "Lead Time Mult": meta_df["lead_time_mult"].to_numpy(),
+        "Demand Mult": meta_df["demand_mult"].to_numpy(),
+        "Total Safety Stock": scenario_total_ss.reindex(meta_df.index).to_numpy(),
+    }).sort_values("Scenario")
     st.dataframe(meta_df, use_container_width=True)
 
 # Picker to compare 2 or more scenarios
@@ -290,15 +259,51 @@ scenario_names = list(st.session_state["scenarios"].keys())
 selected_scenarios = st.multiselect("Select scenarios to compare (2+ recommended)", scenario_names, default=scenario_names[:2] if len(scenario_names) >= 2 else [])
 
 # KPI comparison row
-baseline_total = float(pd.to_numeric(baseline_df["rule_ss"], errors="coerce").sum(skipna=True))
+baseline_total = total_ss
 kpi_comp = [{"Scenario": "Baseline", "Total Safety Stock": baseline_total, "Change % vs Baseline": 0.0}]
 for nm in selected_scenarios:
-    total = float(pd.to_numeric(st.session_state["scenarios"][nm]["df"]["rule_ss"], errors="coerce").sum(skipna=True))
+    total = float(scenario_total_ss[nm])
     chg = ((total - baseline_total) / baseline_total) * 100 if baseline_total else np.nan
     kpi_comp.append({"Scenario": nm, "Total Safety Stock": total, "Change % vs Baseline": chg})
 st.subheader("KPI Comparison")
 st.dataframe(pd.DataFrame(kpi_comp), use_container_width=True)
 
+# ===================== Scenario Grid =====================
+with st.expander("Scenario Grid (service level x lead time x demand)"):
+    g1, g2, g3 = st.columns(3)
+    with g1:
+        sl_lo, sl_hi = st.slider("Service Level range (%)", min_value=50.0, max_value=99.9, value=(85.0, 99.0), step=0.1)
+        sl_steps = st.number_input("Service Level steps", min_value=2, max_value=100, value=15, step=1)
+    with g2:
+        ltm_lo, ltm_hi = st.slider("Lead Time Multiplier range", min_value=0.5, max_value=2.0, value=(0.8, 1.5), step=0.1)
+        ltm_steps = st.number_input("Lead Time steps", min_value=2, max_value=100, value=8, step=1)
+    with g3:
+        dm_lo, dm_hi = st.slider("Demand Multiplier range", min_value=0.5, max_value=2.0, value=(0.8, 1.5), step=0.1)
+        dm_steps = st.number_input("Demand steps", min_value=2, max_value=100, value=8, step=1)
+
+    grid_df = evaluate_scenario_grid(
+        scenario_basis,
+        np.linspace(sl_lo, sl_hi, int(sl_steps)) / 100,
+        np.linspace(ltm_lo, ltm_hi, int(ltm_steps)).round(3),
+        np.linspace(dm_lo, dm_hi, int(dm_steps)).round(3),
+    )
+    grid_df["change_pct"] = (grid_df["total_ss"] - baseline_total) / baseline_total * 100 if baseline_total else np.nan
+    st.caption(f"{len(grid_df):,} scenarios evaluated")
+
+    dm_pick = st.select_slider("Demand Multiplier for heatmap", options=sorted(grid_df["demand_mult"].unique()))
+    heat = (
+        grid_df[grid_df["demand_mult"] == dm_pick]
+        .pivot(index="lead_time_mult", columns="service_level", values="total_ss")
+    )
+    heat.columns = (heat.columns * 100).round(1)
+    fig_grid = px.imshow(
+        heat, aspect="auto", origin="lower", color_continuous_scale="Blues",
+        labels={"x": "Service Level (%)", "y": "Lead Time Multiplier", "color": "Total Safety Stock"},
+        title=f"Total Safety Stock at Demand Multiplier {dm_pick}"
+    )
+    st.plotly_chart(fig_grid, use_container_width=True)
+    st.dataframe(grid_df, use_container_width=True)
+
 # ===================== Chart Analysis =====================
 st.subheader("Chart Analysis")
 chart_option = st.selectbox(
@@ -312,29 +317,23 @@ chart_option = st.selectbox(
 )
 
 # Common: build combined data for chosen scenarios
-def combine_sku_aggregate(df: pd.DataFrame, label: str) -> pd.DataFrame:
-    tmp = df.groupby("sku_id", dropna=False)["rule_ss"].sum().reset_index()
+def combine_aggregate(agg: pd.Series, dim: str, label: str) -> pd.DataFrame:
+    tmp = agg.rename("rule_ss").rename_axis(dim).reset_index()
     tmp["Scenario"] = label
     return tmp
 
-def combine_date_aggregate(df: pd.DataFrame, label: str) -> pd.DataFrame:
-    tmp = df.dropna(subset=["date"]).groupby("date", dropna=False)["rule_ss"].sum().reset_index()
-    tmp["Scenario"] = label
-    return tmp
+def scenario_aggregate_for(nm: str, dim: str) -> pd.Series:
+    meta = st.session_state["scenarios"][nm]
+    return scenario_aggregate(scenario_basis, dim, meta["service_level"], meta["lead_time_mult"], meta["demand_mult"])
 
 # Respect top_n SKUs based on Baseline
-top_skus = (
-    baseline_df.groupby("sku_id", dropna=False)["rule_ss"]
-    .sum()
-    .sort_values(ascending=False)
-    .head(top_n)
-    .index
-)
+baseline_by_sku = cube.rollup("sku_id", mask=selection)
+top_skus = baseline_by_sku.sort_values(ascending=False).head(top_n).index
 
 if chart_option in ["Baseline vs Scenarios by SKU (Bar)", "Baseline vs Scenarios by SKU (Line)"]:
-    combined = [combine_sku_aggregate(baseline_df, "Baseline")]
+    combined = [combine_aggregate(baseline_by_sku, "sku_id", "Baseline")]
     for nm in selected_scenarios:
-        combined.append(combine_sku_aggregate(st.session_state["scenarios"][nm]["df"], nm))
+        combined.append(combine_aggregate(scenario_aggregate_for(nm, "sku_id"), "sku_id", nm))
     sku_long = pd.concat(combined, ignore_index=True)
     sku_long = sku_long[sku_long["sku_id"].isin(top_skus)].rename(columns={"rule_ss": "Safety Stock"})
 
@@ -355,10 +354,12 @@ elif chart_option == "Baseline vs Scenarios Trend Over Time":
     # Trend style toggle
     trend_style = st.radio("Trend style", ["Line", "Bar"], index=0, horizontal=True)
 
-    combined_t = [combine_date_aggregate(baseline_df, "Baseline")]
+    baseline_by_date = cube.rollup("date", mask=selection).dropna()
+    combined_t = [combine_aggregate(baseline_by_date, "date", "Baseline")]
     for nm in selected_scenarios:
-        combined_t.append(combine_date_aggregate(st.session_state["scenarios"][nm]["df"], nm))
+        combined_t.append(combine_aggregate(scenario_aggregate_for(nm, "date").dropna(), "date", nm))
     trend_long = pd.concat(combined_t, ignore_index=True).rename(columns={"rule_ss": "Safety Stock"})
+    trend_long = trend_long[trend_long["date"].notna()]
 
     if not pd.api.types.is_datetime64_any_dtype(trend_long["date"]):
         st.info("Date column missing or invalid. Trend chart cannot be rendered.")
@@ -375,4 +376,3 @@ elif chart_option == "Baseline vs Scenarios Trend Over Time":
             )
         fig_t.update_layout(xaxis_title="Date", yaxis_title="Safety Stock", hovermode="x unified")
         st.plotly_chart(fig_t, use_container_width=True)
-
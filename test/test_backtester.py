@@ -0,0 +1,62 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add repo root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.accuracy.group_statistics import aggregate_group_sums, derive_group_statistics, broadcast_to_rows
+from backend.backtesting.backtester import run_backtest, rolling_cutoffs, summarize_backtest
+from backend.modules.batch_engine import compute_error_based_safety_stock
+
+
+def _aligned(seed=0, days=200):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for sku, sigma in [("A", 3.0), ("B", 8.0), ("C", 5.0)]:
+        for day in range(days):
+            fc = float(rng.uniform(40, 60))
+            rows.append({"sku_id": sku, "location_id": "L1", "echelon_type": "DC",
+                         "date": pd.Timestamp("2024-01-01") + pd.Timedelta(days=day),
+                         "forecast": fc, "actual": fc + rng.normal(0, sigma),
+                         "lead_time": 4, "service_level": 0.9})
+    return pd.DataFrame(rows)
+
+
+def test_incremental_stats_match_recomputation():
+    df = _aligned()
+    cutoffs = rolling_cutoffs(df["date"], n_cutoffs=4, horizon_days=20)
+    results = run_backtest(df, cutoffs=cutoffs, horizon_days=20, methods=["rmse_no_var"])
+    assert list(results["cutoff"]) == cutoffs
+
+    # Recompute one cutoff from scratch and compare its average SS
+    cutoff = cutoffs[2]
+    window = df[(df["date"] >= cutoff) & (df["date"] < cutoff + pd.Timedelta(days=20))]
+    stats = broadcast_to_rows(derive_group_statistics(aggregate_group_sums(df[df["date"] < cutoff])), window)
+    ss = compute_error_based_safety_stock(stats, window["lead_time"], window["service_level"])["rmse_ss_no_var"]
+    # Mid-history window: every row's lead-time window is observed, so all rows are scored
+    assert results.loc[2, "n_rows"] == len(window)
+    assert np.isclose(results.loc[2, "avg_ss"], ss.mean())
+
+
+def test_calibrated_methods_reach_target_and_parallel_is_identical():
+    df = _aligned(days=400)
+    serial = run_backtest(df, cutoffs=5, horizon_days=40)
+    parallel = run_backtest(df, cutoffs=5, horizon_days=40, n_jobs=2)
+    pd.testing.assert_frame_equal(serial, parallel)
+
+    summary = summarize_backtest(serial).set_index("method")
+    # Errors are iid normal, so the RMSE method should be close to its 90% target
+    assert abs(summary.loc["rmse_no_var", "achieved_csl"] - 0.9) < 0.05
+    # sqrt(forecast) ~ 7 ignores the actual error spread: it over-covers A and C, so it carries more excess
+    assert summary.loc["rule", "total_excess"] > summary.loc["rmse_no_var", "total_excess"]
+    assert (summary["total_excess"] >= 0).all() and (summary["total_shortage"] >= 0).all()
+
+
+def test_ml_method_runs(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    df = _aligned(days=120)
+    results = run_backtest(df, cutoffs=2, horizon_days=14, methods=["ml"])
+    assert (results["n_rows"] > 0).all()
+    assert results["avg_ss"].notna().all()
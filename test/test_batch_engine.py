@@ -0,0 +1,92 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add repo root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.modules.batch_engine import calculate_error_based_safety_stock_batch
+from backend.modules.rmse_based import calculate_rmse_based_safety_stock, calculate_mae_based_safety_stock
+from backend.modules.hybrid_based import calculate_hybrid_based_safety_stock
+from backend.accuracy.group_statistics import aggregate_group_sums, combine_group_sums, derive_group_statistics
+
+KEYS = ["sku_id", "location_id", "echelon_type"]
+
+
+def _aligned_df(seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for sku in ["A", "B", "C"]:
+        for loc in ["L1", "L2"]:
+            for day in range(30):
+                fc = rng.uniform(20, 80)
+                rows.append({
+                    "sku_id": sku, "location_id": loc, "echelon_type": "DC",
+                    "date": pd.Timestamp("2024-01-01") + pd.Timedelta(days=day),
+                    "forecast": fc,
+                    "actual": fc + rng.normal(0, 5) if day % 7 else np.nan,
+                    "lead_time": int(rng.integers(2, 6)),
+                    "service_level": 0.95,
+                })
+    return pd.DataFrame(rows)
+
+
+def _future_df():
+    return pd.DataFrame({
+        "sku_id": ["A", "B", "C", "Z"],
+        "location_id": ["L1", "L2", "L1", "L1"],
+        "echelon_type": ["DC", "DC", "DC", "DC"],
+        "date": pd.to_datetime(["2024-03-01"] * 4),
+        "forecast": [50.0, 40.0, 30.0, 10.0],
+        "lead_time": [3, 5, 4, 2],
+        "service_level": [0.95, 0.9, 0.99, 0.95],
+    })
+
+
+def test_batch_engine_matches_per_row_functions():
+    aligned = _aligned_df()
+    future = _future_df()
+    out = calculate_error_based_safety_stock_batch(aligned, future)
+
+    for i, row in future.iterrows():
+        sku_df = aligned[(aligned[KEYS] == row[KEYS]).all(axis=1)]
+        if sku_df.empty:
+            continue
+        rmse_no, rmse_with = calculate_rmse_based_safety_stock(sku_df, row)
+        mae_no, mae_with = calculate_mae_based_safety_stock(sku_df, row)
+        hybrid = calculate_hybrid_based_safety_stock(sku_df, row)
+        np.testing.assert_allclose(out.loc[i, "rmse_ss_no_var"], rmse_no, atol=0.011)
+        np.testing.assert_allclose(out.loc[i, "rmse_ss_with_var"], rmse_with, atol=0.011)
+        np.testing.assert_allclose(out.loc[i, "mae_ss_no_var"], mae_no, atol=0.011)
+        np.testing.assert_allclose(out.loc[i, "mae_ss_with_var"], mae_with, atol=0.011)
+        np.testing.assert_allclose(out.loc[i, "hybrid_ss_no_var"], hybrid["ss_no_var"], atol=0.011)
+        np.testing.assert_allclose(out.loc[i, "hybrid_ss_with_var"], hybrid["ss_with_var"], atol=0.011)
+        np.testing.assert_allclose(out.loc[i, "weight_rmse"], hybrid["weight_rmse"], atol=0.011)
+
+
+def test_batch_engine_leaves_unseen_groups_empty():
+    out = calculate_error_based_safety_stock_batch(_aligned_df(), _future_df())
+    assert len(out) == 4
+    assert out.iloc[3][["rmse_ss_no_var", "hybrid_ss_with_var", "weight_rmse"]].isna().all()
+
+
+def test_group_statistics_keep_precision_at_a_large_level():
+    rng = np.random.default_rng(3)
+    df = _aligned_df()
+    df["actual"] = 1e6 + rng.normal(0, 1, len(df))
+    df["lead_time"] = 1e6 + rng.normal(0, 1, len(df))
+    stats = derive_group_statistics(aggregate_group_sums(df)).reset_index()
+    for _, row in stats.iterrows():
+        group = df[(df["sku_id"] == row["sku_id"]) & (df["location_id"] == row["location_id"])]
+        np.testing.assert_allclose(row["avg_d"], group["actual"].mean(), rtol=1e-12)
+        np.testing.assert_allclose(row["sigma_d"], np.std(group["actual"]), rtol=1e-6)
+        np.testing.assert_allclose(row["sigma_lt"], np.std(group["lead_time"]), rtol=1e-6)
+
+    # Sums of two halves with their own shifts combine to the same statistics
+    first, second = df.iloc[::2], df.iloc[1::2]
+    left, right = aggregate_group_sums(first), aggregate_group_sums(second)
+    right = right.reindex(left.index)
+    combined = derive_group_statistics(combine_group_sums(left, right)).reset_index()
+    np.testing.assert_allclose(combined["sigma_d"], stats["sigma_d"], rtol=1e-6)
+    np.testing.assert_allclose(combined["avg_d"], stats["avg_d"], rtol=1e-12)
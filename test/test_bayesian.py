@@ -0,0 +1,86 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+# Add repo root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import backend.config as config
+from backend.accuracy.group_statistics import aggregate_group_sums
+from backend.module_selector import run_safety_stock_selector
+from backend.modules.bayesian import (
+    estimate_pooled_priors, posterior_error_sigma, predict_bayesian_safety_stock,
+)
+
+
+def _history(seed=0):
+    rng = np.random.default_rng(seed)
+    sales, forecast = [], []
+    # sigma per sku; "S" has only 3 observations
+    for sku, sigma, n in [("A", 4.0, 300), ("B", 6.0, 300), ("C", 5.0, 300), ("D", 5.5, 300), ("S", 5.0, 3)]:
+        for day in range(n):
+            date = pd.Timestamp("2023-01-01") + pd.Timedelta(days=day)
+            fc = float(rng.uniform(40, 60))
+            forecast.append({"sku_id": sku, "location_id": "L1", "echelon_type": "DC", "date": date,
+                             "forecast": fc, "lead_time": 3, "service_level": 0.95})
+            sales.append({"sku_id": sku, "location_id": "L1", "echelon_type": "DC", "date": date,
+                          "actual": fc + rng.normal(0, sigma)})
+    return pd.DataFrame(sales), pd.DataFrame(forecast)
+
+
+def _future():
+    return pd.DataFrame({
+        "sku_id": ["A", "S", "NEW", "A"],
+        "location_id": "L1",
+        "echelon_type": "DC",
+        "date": pd.Timestamp("2024-03-01"),
+        "forecast": 50.0,
+        "lead_time": [4, 4, 4, 9],
+        "service_level": 0.95,
+    })
+
+
+def test_posterior_matches_conjugate_update():
+    sales, forecast = _history()
+    merged = sales.merge(forecast, on=["sku_id", "location_id", "echelon_type", "date"])
+    sums = aggregate_group_sums(merged)
+    priors = estimate_pooled_priors(sums)
+    post = posterior_error_sigma(sums, priors)
+
+    p = priors.loc["DC"]
+    err = (merged["forecast"] - merged["actual"])[merged["sku_id"] == "B"].to_numpy()
+    n, mean = len(err), err.mean()
+    kappa_n, alpha_n = p["kappa0"] + n, p["alpha0"] + n / 2
+    beta_n = p["beta0"] + 0.5 * ((err - mean) ** 2).sum() + p["kappa0"] * n * (mean - p["m0"]) ** 2 / (2 * kappa_n)
+    expected = np.sqrt(beta_n / (alpha_n - 1))
+    assert np.isclose(post.loc[("B", "L1", "DC"), "posterior_sigma"], expected)
+
+
+def test_shrinkage_and_unseen_groups():
+    sales, forecast = _history()
+    future = _future()
+    ss = predict_bayesian_safety_stock(sales, forecast, future)
+    sigma = ss / (norm.ppf(0.95) * np.sqrt(future["lead_time"].to_numpy()))
+
+    # Long history: close to the sample std, pulled slightly towards the echelon;
+    # short history and unseen SKUs: near the echelon level
+    sample_std = (forecast["forecast"] - sales["actual"])[sales["sku_id"] == "A"].std(ddof=0)
+    assert sample_std < sigma[0] < sample_std + 0.2
+    assert 4.3 < sigma[1] < 6.0
+    assert 4.3 < sigma[2] < 6.0
+    assert np.isclose(ss[3], np.round(ss[0] * 1.5, 2), atol=0.01)
+
+
+def test_selector_adds_bayesian_column(monkeypatch):
+    monkeypatch.setattr(config, "ONLY_RULE_BASED", True)
+    monkeypatch.setattr(config, "ONLY_ML_BASED", False)
+    monkeypatch.setattr(config, "BOTH_RULE_ML", False)
+    monkeypatch.setattr(config, "BAYESIAN_SS", True)
+    sales, forecast = _history()
+    future = _future()
+
+    out = run_safety_stock_selector(True, True, future, sales, forecast)
+    np.testing.assert_array_equal(out["bayesian_ss"], predict_bayesian_safety_stock(sales, forecast, future))
+    assert "rule_ss" in out.columns
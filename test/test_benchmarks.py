@@ -0,0 +1,58 @@
+import sys
+import os
+import json
+
+# Add repo root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import backend.config as config
+from backend.preprocessing.input_cleaner import clean_and_prepare_inputs
+from benchmarks.data_generator import generate_datasets, DEFAULT_ECHELONS
+from benchmarks.run_benchmarks import compare_results, main
+
+
+def test_generator_is_seeded_and_uses_raw_column_names():
+    a = generate_datasets(n_skus=3, n_locations=2, n_history_days=10, n_future_days=4, seed=5)
+    b = generate_datasets(n_skus=3, n_locations=2, n_history_days=10, n_future_days=4, seed=5)
+    for x, y in zip(a, b):
+        assert x.equals(y)
+
+    past_fc, actual, future = a
+    n_groups = 3 * 2 * len(DEFAULT_ECHELONS)
+    assert (len(past_fc), len(actual), len(future)) == (n_groups * 10, n_groups * 10, n_groups * 4)
+    assert set(config.column_mapping.values()) - {config.column_mapping["actual"]} <= set(past_fc.columns)
+    assert future[config.column_mapping["date"]].min() > past_fc[config.column_mapping["date"]].max()
+
+    cleaned_fc, cleaned_actual, cleaned_future = clean_and_prepare_inputs(
+        past_fc.copy(), actual.copy(), future.copy(), config.column_mapping
+    )
+    assert len(cleaned_fc) == len(past_fc) and "actual" in cleaned_actual.columns
+
+
+def test_runner_writes_json_and_flags_regressions(tmp_path):
+    out = tmp_path / "results.json"
+    stages = ["clean_and_prepare_inputs", "rule_based"]
+    assert main(["--scales", "small", "--stages", *stages, "--repeat", "1", "--output", str(out)]) == 0
+
+    results = json.loads(out.read_text())
+    assert [r["stage"] for r in results["results"]] == stages
+    assert all(r["best_s"] >= 0 and r["peak_mb"] is not None for r in results["results"])
+
+    slower = {"results": [dict(r, best_s=r["best_s"] * 2 + 1) for r in results["results"]]}
+    assert len(compare_results(slower, results, max_slowdown=1.25)) == 2
+    assert compare_results(results, results) == []
+
+
+def test_selector_stage_restores_config_flags(monkeypatch, tmp_path):
+    from benchmarks.run_benchmarks import _stage_functions
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "ONLY_RULE_BASED", True)
+    monkeypatch.setattr(config, "BOTH_RULE_ML", False)
+    monkeypatch.setattr(config, "PAST_SALES_DATA_AVAILABLE", False)
+    data = generate_datasets(n_skus=2, n_locations=1, n_history_days=10, n_future_days=2, seed=1)
+
+    _stage_functions(*data)["run_safety_stock_selector"]()
+    assert config.ONLY_RULE_BASED is True
+    assert config.BOTH_RULE_ML is False
+    assert config.PAST_SALES_DATA_AVAILABLE is False
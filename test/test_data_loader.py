@@ -0,0 +1,65 @@
+import sys
+import os
+import pandas as pd
+import pytest
+
+# Add repo root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.config import column_mapping
+from backend.preprocessing.data_loader import read_input_table
+
+
+def _raw_forecast():
+    return pd.DataFrame({
+        "SKU_ID": ["001", "002", "003"],
+        "Location_ID": ["L1", "L2", "L1"],
+        "Echelon_Type": ["DC", "DC", "Store"],
+        "Date": ["2024-01-01", "2024-01-02", "2024-01-03"],
+        "Forecasted_Demand": ["10.5", "oops", "3"],
+        "Lead_Time_Days": [3, None, 4],
+        "Unused": [1, 2, 3],
+    })
+
+
+def test_csv_is_mapped_and_typed_at_read_time(tmp_path):
+    path = tmp_path / "forecast.csv"
+    _raw_forecast().to_csv(path, index=False)
+
+    df = read_input_table(str(path), column_mapping)
+    assert list(df.columns) == ["sku_id", "location_id", "echelon_type", "date", "forecast", "lead_time"]
+    assert isinstance(df["sku_id"].dtype, pd.CategoricalDtype)
+    assert list(df["sku_id"]) == ["001", "002", "003"]
+    assert str(df["forecast"].dtype) == "float32" and pd.isna(df["forecast"].iloc[1])
+    assert str(df["lead_time"].dtype) == "Int32"
+    assert pd.api.types.is_datetime64_any_dtype(df["date"])
+
+
+def test_parquet_and_feather_read_natively(tmp_path):
+    raw = _raw_forecast().astype({"Forecasted_Demand": "string"})
+    raw.to_parquet(tmp_path / "forecast.parquet")
+    raw.to_feather(tmp_path / "forecast.feather")
+
+    from_parquet = read_input_table(str(tmp_path / "forecast.parquet"), column_mapping)
+    with open(tmp_path / "forecast.feather", "rb") as f:
+        from_feather = read_input_table(f, column_mapping, file_format="feather")
+    pd.testing.assert_frame_equal(from_parquet, from_feather)
+    assert "Unused" not in from_parquet.columns
+
+
+def test_keep_unmapped_loads_extra_columns(tmp_path):
+    path = tmp_path / "forecast.csv"
+    _raw_forecast().to_csv(path, index=False)
+
+    df = read_input_table(str(path), column_mapping, keep_unmapped=True)
+    assert "Unused" in df.columns and list(df["Unused"]) == [1, 2, 3]
+    assert list(df["sku_id"]) == ["001", "002", "003"]
+
+
+def test_parquet_without_pyarrow_names_the_missing_package(tmp_path, monkeypatch):
+    import backend.preprocessing.data_loader as data_loader
+    path = tmp_path / "forecast.parquet"
+    _raw_forecast().to_parquet(path)
+    monkeypatch.setattr(data_loader, "_HAS_PYARROW", False)
+    with pytest.raises(ImportError, match="pip install pyarrow"):
+        read_input_table(str(path), column_mapping)
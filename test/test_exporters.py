@@ -0,0 +1,76 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import backend.config as config
+from backend.export.exporters import export_results, wait_for_exports, EXPORTERS
+from backend.instrumentation import last_run_report
+from backend.pipeline import run_pipeline
+from test_pipeline import _raw_inputs, _set_flags
+
+
+def _results(n=25):
+    df = pd.DataFrame({
+        "sku_id": pd.Categorical([f"S{i % 4}" for i in range(n)]),
+        "date": pd.date_range("2024-01-01", periods=n),
+        "lead_time": pd.array(np.arange(n) % 5, dtype="Int32"),
+        "rule_ss": np.linspace(0, 10, n),
+    })
+    df.loc[2, "rule_ss"] = np.nan
+    return df
+
+
+@pytest.mark.parametrize("ext", [".csv", ".parquet", ".xlsx"])
+def test_exporters_roundtrip(tmp_path, ext):
+    df = _results()
+    path = str(tmp_path / f"out{ext}")
+    assert export_results(df, path, chunk_rows=7) == len(df)
+
+    if ext == ".csv":
+        back = pd.read_csv(path, parse_dates=["date"])
+    elif ext == ".parquet":
+        back = pd.read_parquet(path)
+    else:
+        back = pd.read_excel(path)
+    assert list(back.columns) == list(df.columns)
+    assert back["sku_id"].astype(str).tolist() == df["sku_id"].astype(str).tolist()
+    assert (pd.to_datetime(back["date"]) == df["date"]).all()
+    np.testing.assert_allclose(back["rule_ss"].astype(float), df["rule_ss"])
+    assert not [f for f in os.listdir(tmp_path) if f.endswith(".tmp")]
+
+
+def test_export_streams_chunks_and_runs_in_background(tmp_path):
+    df = _results(40)
+    chunks = (df.iloc[i:i + 9] for i in range(0, len(df), 9))
+    future = export_results(chunks, str(tmp_path / "out.csv"), background=True)
+    assert wait_for_exports(timeout=60) == [len(df)]
+    assert future.done()
+    pd.testing.assert_frame_equal(
+        pd.read_csv(tmp_path / "out.csv", parse_dates=["date"])[["date", "rule_ss"]], df[["date", "rule_ss"]]
+    )
+
+    with pytest.raises(ValueError):
+        export_results(df, str(tmp_path / "out.json"))
+    assert {"csv", "parquet", "xlsx"} <= set(EXPORTERS)
+
+
+def test_pipeline_export_stage(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _set_flags(monkeypatch, has_past=True, both=True)
+    monkeypatch.setattr(config, "EXPORT_PATH", str(tmp_path / "results.parquet"))
+    monkeypatch.setattr(config, "EXPORT_IN_BACKGROUND", True)
+    past_fc, actual, future = _raw_inputs()
+
+    results = run_pipeline(past_fc, actual, future)
+    wait_for_exports(timeout=60)
+
+    # The ML module no longer writes a workbook into the working directory
+    assert not os.path.exists(tmp_path / "final.xlsx")
+    exported = pd.read_parquet(tmp_path / "results.parquet")
+    assert len(exported) == len(results)
+    np.testing.assert_allclose(exported["ml_ss"], results["ml_ss"])
+    stages = [s["path"] for s in last_run_report().stages]
+    assert "export_results" in stages
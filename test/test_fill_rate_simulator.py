@@ -0,0 +1,67 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add repo root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.modules.rule_based import calculate_rule_based_safety_stock_df
+from backend.simulation.fill_rate_simulator import simulate_service_levels, summarize_simulation
+
+
+def _output(n=60, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "sku_id": rng.choice(["A", "B", "C"], n),
+        "location_id": "L1",
+        "echelon_type": "DC",
+        "date": pd.Timestamp("2024-03-01") + pd.to_timedelta(rng.integers(0, 10, n), unit="D"),
+        "forecast": rng.uniform(20, 100, n),
+        "lead_time": rng.integers(1, 8, n),
+        "service_level": rng.choice([0.8, 0.9, 0.95], n),
+    })
+    return calculate_rule_based_safety_stock_df(df)
+
+
+def _history(sigma=5.0, seed=1):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for sku in ["A", "B", "C"]:
+        for day in range(400):
+            fc = float(rng.uniform(20, 100))
+            rows.append({"sku_id": sku, "location_id": "L1", "echelon_type": "DC",
+                         "date": pd.Timestamp("2023-01-01") + pd.Timedelta(days=day),
+                         "forecast": fc, "actual": fc + rng.normal(0, sigma), "lead_time": 3})
+    return pd.DataFrame(rows)
+
+
+def test_rule_ss_reaches_target_without_history():
+    out = _output()
+    sim = simulate_service_levels(out, n_sims=20000, seed=7, lead_time_variability=False)
+    # Rule SS assumes sigma = sqrt(forecast); without history that is exactly the simulated model
+    np.testing.assert_allclose(sim["rule_ss_csl"], out["service_level"], atol=0.015)
+    assert ((sim["rule_ss_fill_rate"] > sim["rule_ss_csl"]) & (sim["rule_ss_fill_rate"] <= 1)).all()
+
+    summary = summarize_simulation(sim, out)
+    assert set(summary["sku_id"]) == {"A", "B", "C"}
+    assert summary["rule_ss_csl_gap"].abs().max() < 0.015
+
+
+def test_worker_count_does_not_change_results():
+    # Each chunk draws from its own seed stream, so only a fixed chunk_rows is reproducible
+    out = _output()
+    hist = _history()
+    serial = simulate_service_levels(out, hist, n_sims=500, seed=3, chunk_rows=7, distribution="empirical")
+    parallel = simulate_service_levels(out, hist, n_sims=500, seed=3, chunk_rows=7, distribution="empirical",
+                                       n_jobs=2)
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_history_error_drives_achieved_level():
+    out = _output()
+    out["fixed_ss"] = 1.645 * 5.0 * np.sqrt(out["lead_time"])  # 95% SS for the true error sigma
+    for distribution in ("normal", "empirical"):
+        sim = simulate_service_levels(out, _history(), ss_columns=["fixed_ss"], n_sims=20000, seed=11,
+                                      distribution=distribution, lead_time_variability=False)
+        assert abs(sim["fixed_ss_csl"].mean() - 0.95) < 0.02
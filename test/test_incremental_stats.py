@@ -0,0 +1,108 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add repo root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.accuracy.metrics_calculator import calculate_grouped_accuracy_metrics
+from backend.incremental.incremental_stats import (
+    GroupStatsStore, accuracy_metrics_from_store, refresh_safety_stock, run_incremental_update,
+)
+from backend.modules.batch_engine import BATCH_SS_COLUMNS, calculate_error_based_safety_stock_batch
+
+
+def _aligned(days, first_day=0, seed=0):
+    rng = np.random.default_rng(seed + first_day)
+    rows = []
+    for sku in ["A", "B", "C"]:
+        for loc in ["L1", "L2"]:
+            for day in range(first_day, first_day + days):
+                fc = float(rng.uniform(20, 80))
+                rows.append({"sku_id": sku, "location_id": loc, "echelon_type": "DC",
+                             "date": pd.Timestamp("2024-01-01") + pd.Timedelta(days=day),
+                             "forecast": fc, "actual": fc + rng.normal(0, 5),
+                             "lead_time": int(rng.integers(2, 6)), "service_level": 0.95})
+    return pd.DataFrame(rows)
+
+
+def _future():
+    return pd.DataFrame({
+        "sku_id": ["A", "B", "C", "A"], "location_id": ["L1", "L1", "L2", "L2"], "echelon_type": "DC",
+        "date": pd.Timestamp("2024-06-01"), "forecast": 50.0, "lead_time": [3, 4, 5, 2], "service_level": 0.9,
+    })
+
+
+def test_daily_deltas_match_full_recomputation(tmp_path):
+    history = _aligned(30)
+    day_31 = _aligned(1, first_day=30)
+    day_32 = _aligned(1, first_day=31)
+    day_32 = day_32[day_32["sku_id"] == "B"]  # only SKU B reports on day 32
+
+    store = GroupStatsStore(str(tmp_path))
+    store.rebuild(history)
+    store.apply_delta(day_31)
+    update = GroupStatsStore(str(tmp_path)).apply_delta(day_32)  # reloaded from disk
+    assert sorted(update["touched"].get_level_values("sku_id")) == ["B", "B"]
+
+    full = pd.concat([history, day_31, day_32], ignore_index=True)
+    store = GroupStatsStore(str(tmp_path))
+    expected = calculate_grouped_accuracy_metrics(full)
+    expected["sku_id"] = expected["sku_id"].astype(str)
+    pd.testing.assert_frame_equal(accuracy_metrics_from_store(store), expected, check_dtype=False)
+
+    touched_metrics = accuracy_metrics_from_store(store, touched=update["touched"])
+    assert list(touched_metrics["sku_id"]) == ["B"]
+
+    ss = refresh_safety_stock(store, _future())
+    batch = calculate_error_based_safety_stock_batch(full, _future())
+    pd.testing.assert_frame_equal(ss[BATCH_SS_COLUMNS], batch[BATCH_SS_COLUMNS])
+
+
+def test_resent_days_are_skipped_and_untouched_rows_are_reused(tmp_path):
+    store = GroupStatsStore(str(tmp_path))
+    store.rebuild(_aligned(20))
+    before = store.load()[["n_err", "sum_sq_err"]].copy()
+
+    assert store.apply_delta(_aligned(1, first_day=19))["skipped"] == 6
+    pd.testing.assert_frame_equal(store.load()[["n_err", "sum_sq_err"]], before)
+
+    previous = refresh_safety_stock(store, _future())
+    delta = _aligned(1, first_day=20)
+    update = store.apply_delta(delta[delta["sku_id"] == "A"])
+    previous_marked = previous.copy()
+    previous_marked[BATCH_SS_COLUMNS] = -1.0  # rows that are not recomputed keep these
+
+    refreshed = refresh_safety_stock(store, _future(), previous=previous_marked, touched=update["touched"])
+    is_a = (_future()["sku_id"] == "A").to_numpy()
+    assert (refreshed.loc[~is_a, "rmse_ss_no_var"] == -1.0).all()
+    full = refresh_safety_stock(store, _future())
+    pd.testing.assert_frame_equal(refreshed.loc[is_a, BATCH_SS_COLUMNS], full.loc[is_a, BATCH_SS_COLUMNS])
+
+
+def test_run_incremental_update(tmp_path):
+    store = GroupStatsStore(str(tmp_path))
+    store.rebuild(_aligned(20))
+    previous = refresh_safety_stock(store, _future())
+    update = run_incremental_update(store, _aligned(1, first_day=20), _future(), previous=previous)
+    assert update["rows"] == 6 and update["skipped"] == 0
+    assert set(update["metrics"]["sku_id"]) == {"A", "B", "C"}
+    assert len(update["safety_stock"]) == len(_future())
+
+
+def test_previous_rows_are_matched_by_key_and_date(tmp_path):
+    store = GroupStatsStore(str(tmp_path))
+    store.rebuild(_aligned(20))
+    previous = refresh_safety_stock(store, _future())
+    delta = _aligned(1, first_day=20)
+    update = store.apply_delta(delta[delta["sku_id"] == "A"])
+
+    # The horizon rolls: rows come back reordered and one new date appears
+    rolled = pd.concat([
+        _future().iloc[::-1],
+        _future().iloc[[1]].assign(date=pd.Timestamp("2024-06-02")),
+    ], ignore_index=True)
+    refreshed = refresh_safety_stock(store, rolled, previous=previous, touched=update["touched"])
+    full = refresh_safety_stock(store, rolled)
+    pd.testing.assert_frame_equal(refreshed[BATCH_SS_COLUMNS], full[BATCH_SS_COLUMNS])
@@ -0,0 +1,86 @@
+import sys
+import os
+import json
+
+# Add repo root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import backend.config as config
+from backend.instrumentation import run_report, stage, instrumented, last_run_report
+from backend.pipeline import run_pipeline
+from test_pipeline import _raw_inputs, _set_flags
+
+
+def test_stages_nest_and_are_noops_outside_a_report():
+    @instrumented("double")
+    def double(rows):
+        return rows + rows
+
+    with stage("outside") as record:
+        record["rows_out"] = 1
+    assert double([1, 2]) == [1, 2, 1, 2]
+
+    with run_report("unit") as report:
+        with stage("outer", rows_in=[1, 2, 3]):
+            double([1, 2])
+
+    paths = {s["path"]: s for s in report.stages}
+    assert set(paths) == {"outer", "outer/double"}
+    assert paths["outer/double"]["rows_in"] == 2 and paths["outer/double"]["rows_out"] == 4
+    assert paths["outer"]["wall_s"] >= paths["outer/double"]["wall_s"] >= 0
+    assert json.loads(report.to_json())["name"] == "unit"
+
+
+def test_run_pipeline_reports_stages_and_group_fits(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    _set_flags(monkeypatch, has_past=True, both=True)
+    monkeypatch.setattr(config, "RUN_REPORT_DIR", str(tmp_path / "reports"))
+    past_fc, actual, future = _raw_inputs()
+
+    results = run_pipeline(past_fc, actual, future)
+    report = last_run_report()
+    paths = [s["path"] for s in report.stages]
+    assert "clean_and_prepare_inputs" in paths
+    assert "run_safety_stock_selector/ml_based/ml_fit_predict_per_group" in paths
+    assert "run_safety_stock_selector/rule_based" in paths
+    selector = next(s for s in report.stages if s["path"] == "run_safety_stock_selector")
+    assert selector["rows_out"] == len(results)
+
+    fits = report.group_fit_summary()
+    assert fits["fits"] == 12 and fits["total_s"] > 0
+
+    written = os.listdir(tmp_path / "reports")
+    assert written == [f"run_{report.run_id}.json"]
+
+
+def test_nested_stage_does_not_hide_outer_allocation_peak():
+    import tracemalloc
+
+    tracemalloc.start()
+    try:
+        with run_report("peaks") as report:
+            with stage("outer"):
+                big = bytearray(20 * 1024 ** 2)
+                del big
+                with stage("inner"):
+                    small = bytearray(1024 ** 2)
+                    del small
+    finally:
+        tracemalloc.stop()
+
+    paths = {s["path"]: s for s in report.stages}
+    assert paths["outer"]["alloc_peak_mb"] >= 20
+    assert 1 <= paths["outer/inner"]["alloc_peak_mb"] < 5
+
+
+def test_alignment_is_an_instrumented_stage(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    _set_flags(monkeypatch, has_past=True, both=False)
+    monkeypatch.setattr(config, "OPTIMIZE_SERVICE_LEVEL", True)
+    monkeypatch.setattr(config, "SL_SIGMA_METHOD", "rmse")
+    past_fc, actual, future = _raw_inputs()
+
+    run_pipeline(past_fc, actual, future)
+    align = next(s for s in last_run_report().stages
+                 if s["path"] == "run_safety_stock_selector/align_forecast_to_actual")
+    assert align["rows_in"] == len(past_fc) and align["rows_out"] > 0
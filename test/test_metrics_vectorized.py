@@ -0,0 +1,70 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add repo root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.accuracy.metrics_calculator import calculate_grouped_accuracy_metrics
+
+
+def _reference_metrics(merged_df):
+    """Original per-group loop, kept here as the behavioural reference."""
+    results = []
+    for (sku, echelon), g in merged_df.groupby(['sku_id', 'echelon_type'], dropna=False):
+        y_true = pd.to_numeric(g['actual'], errors='coerce')
+        y_pred = pd.to_numeric(g['forecast'], errors='coerce')
+        mask = y_true.notna() & y_pred.notna()
+        y_true = y_true[mask]; y_pred = y_pred[mask]
+        if len(y_true) == 0:
+            continue
+        err = y_pred - y_true
+        abs_err = np.abs(err)
+        mape_mask = (y_true.abs() >= 10)
+        mape = float(np.mean((abs_err[mape_mask] / y_true[mape_mask].abs())) * 100) if mape_mask.any() else np.nan
+        results.append({
+            'sku_id': sku,
+            'echelon_type': echelon,
+            'lead_time': g['lead_time'].dropna().iloc[0] if g['lead_time'].notna().any() else None,
+            'service_level': g['service_level'].dropna().iloc[0] if g['service_level'].notna().any() else None,
+            'RMSE': round(float(np.sqrt(np.mean(err ** 2))), 2),
+            'MAE': round(float(np.mean(abs_err)), 2),
+            'MAPE (%)': round(mape, 2) if not np.isnan(mape) else np.nan,
+            'Bias': round(float(np.mean(err)), 2),
+            'WAPE (%)': round(float(abs_err.sum() / max(y_true.abs().sum(), 1e-9) * 100), 2),
+            'n_samples': int(len(y_true)),
+        })
+    return pd.DataFrame(results)
+
+
+def _merged_df(seed=1):
+    rng = np.random.default_rng(seed)
+    n = 400
+    actual = rng.uniform(0, 60, n)
+    actual[rng.random(n) < 0.1] = np.nan
+    return pd.DataFrame({
+        'sku_id': rng.choice(['A', 'B', 'C', 'D'], n),
+        'location_id': rng.choice(['L1', 'L2'], n),
+        'echelon_type': rng.choice(['DC', 'Store'], n),
+        'forecast': rng.uniform(0, 60, n),
+        'actual': actual,
+        'lead_time': rng.integers(1, 8, n).astype(float),
+        'service_level': 0.95,
+    })
+
+
+def test_vectorized_metrics_match_reference_loop():
+    merged = _merged_df()
+    result = calculate_grouped_accuracy_metrics(merged)
+    expected = _reference_metrics(merged)
+    assert list(result.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, atol=0.011)
+
+
+def test_custom_group_keys_include_location():
+    merged = _merged_df()
+    result = calculate_grouped_accuracy_metrics(merged, group_keys=['sku_id', 'location_id', 'echelon_type'])
+    assert list(result.columns[:3]) == ['sku_id', 'location_id', 'echelon_type']
+    assert result['n_samples'].sum() == (merged['actual'].notna()).sum()
+    assert len(result) == merged.groupby(['sku_id', 'location_id', 'echelon_type']).ngroups
@@ -0,0 +1,105 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add repo root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.modules.ml_based import calculate_ml_based_safety_stock
+from backend.modules.model_cache import ModelCache
+
+
+def _inputs(seed=0):
+    rng = np.random.default_rng(seed)
+    sales, forecast, future = [], [], []
+    for sku in ["A", "B", "C"]:
+        for loc in ["L1", "L2"]:
+            for day in range(40):
+                date = pd.Timestamp("2024-01-01") + pd.Timedelta(days=day)
+                fc = float(rng.uniform(20, 80))
+                lt = int(rng.integers(2, 6))
+                forecast.append({"sku_id": sku, "location_id": loc, "echelon_type": "DC",
+                                 "date": date, "forecast": fc, "lead_time": lt, "service_level": 0.95})
+                sales.append({"sku_id": sku, "location_id": loc, "echelon_type": "DC",
+                              "date": date, "actual": fc + float(rng.normal(0, 3 + lt))})
+            for day in range(5):
+                future.append({"sku_id": sku, "location_id": loc, "echelon_type": "DC",
+                               "date": pd.Timestamp("2024-03-01") + pd.Timedelta(days=day),
+                               "forecast": 50.0, "lead_time": 2 + day % 4, "service_level": 0.95})
+    return pd.DataFrame(sales), pd.DataFrame(forecast), pd.DataFrame(future)
+
+
+def test_parallel_fit_matches_serial(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sales, forecast, future = _inputs()
+    serial = calculate_ml_based_safety_stock(sales, forecast, future, n_jobs=1)
+    parallel = calculate_ml_based_safety_stock(sales, forecast, future, n_jobs=2)
+    assert serial["Safety_Stock"].notna().all()
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_pooled_mode_predicts_every_future_row(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sales, forecast, future = _inputs()
+    unseen = future.iloc[[0]].assign(sku_id="NEW")
+    future = pd.concat([future, unseen], ignore_index=True)
+
+    pooled = calculate_ml_based_safety_stock(sales, forecast, future, mode="pooled")
+    assert len(pooled) == len(future)
+    assert pooled["Safety_Stock"].notna().all()
+    assert (pooled["Safety_Stock"] >= 0).all()
+
+
+def test_model_cache_reuses_unchanged_groups(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = ModelCache(str(tmp_path / "models"))
+    sales, forecast, future = _inputs()
+
+    first = calculate_ml_based_safety_stock(sales, forecast, future, model_cache=cache)
+    assert cache.stats()["misses"] == 6 and cache.hits == 0
+
+    second = calculate_ml_based_safety_stock(sales, forecast, future, model_cache=cache)
+    assert cache.hits == 6
+    pd.testing.assert_frame_equal(first, second)
+
+    # Changing one group's history only refits that group
+    sales.loc[0, "actual"] += 25
+    calculate_ml_based_safety_stock(sales, forecast, future, model_cache=cache)
+    assert cache.hits == 11 and cache.misses == 7
+
+
+def test_model_cache_evicts_least_recently_used(tmp_path):
+    cache = ModelCache(str(tmp_path / "models"), max_bytes=3000)
+    for i in range(5):
+        cache.put(f"k{i}", b"x" * 1000)
+    assert cache.size_bytes() <= 3000
+    assert cache.get("k0") is None and cache.get("k4") is not None
+
+
+def test_model_cache_bound_holds_across_instances(tmp_path):
+    # Two instances on one directory stand in for two worker processes
+    caches = [ModelCache(str(tmp_path / "models"), max_bytes=3000) for _ in range(2)]
+    for i in range(8):
+        caches[i % 2].put(f"k{i}", b"x" * 1000)
+        assert caches[0].size_bytes() <= 3000
+
+
+def test_model_cache_removes_temp_file_when_pickling_fails(tmp_path):
+    cache = ModelCache(str(tmp_path / "models"))
+    with pytest.raises(Exception):
+        cache.put("bad", lambda: None)
+    assert os.listdir(tmp_path / "models") == []
+
+
+def test_output_keeps_future_row_order_and_leaves_unseen_groups_empty(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sales, forecast, future = _inputs()
+    unseen = future.iloc[[0]].assign(sku_id="NEW")
+    future = pd.concat([unseen, future.iloc[::-1]], ignore_index=True)
+
+    out = calculate_ml_based_safety_stock(sales, forecast, future)
+    pd.testing.assert_frame_equal(out.drop(columns="Safety_Stock"), future)
+    assert np.isnan(out["Safety_Stock"].iloc[0])
+    assert out["Safety_Stock"].iloc[1:].notna().all()
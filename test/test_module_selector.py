@@ -0,0 +1,68 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add repo root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import backend.config as config
+from backend.module_selector import run_safety_stock_selector
+from backend.modules.rule_based import calculate_rule_based_safety_stock_df
+from backend.modules.ml_based import calculate_ml_based_safety_stock
+
+
+def _inputs(seed=0):
+    rng = np.random.default_rng(seed)
+    sales, forecast, future = [], [], []
+    for sku in ["A", "B"]:
+        for loc in ["L1", "L2"]:
+            for day in range(30):
+                date = pd.Timestamp("2024-01-01") + pd.Timedelta(days=day)
+                fc = float(rng.uniform(20, 80))
+                forecast.append({"sku_id": sku, "location_id": loc, "echelon_type": "DC", "date": date,
+                                 "forecast": fc, "lead_time": int(rng.integers(2, 6)), "service_level": 0.95})
+                sales.append({"sku_id": sku, "location_id": loc, "echelon_type": "DC", "date": date,
+                              "actual": fc + float(rng.normal(0, 5))})
+            for day in range(4):
+                future.append({"sku_id": sku, "location_id": loc, "echelon_type": "DC",
+                               "date": pd.Timestamp("2024-03-01") + pd.Timedelta(days=day),
+                               "forecast": 40.0 + day, "lead_time": 3, "service_level": 0.9})
+    return pd.DataFrame(sales), pd.DataFrame(forecast), pd.DataFrame(future)
+
+
+def _set_method(monkeypatch, only_rule=False, only_ml=False, both=False):
+    monkeypatch.setattr(config, "ONLY_RULE_BASED", only_rule)
+    monkeypatch.setattr(config, "ONLY_ML_BASED", only_ml)
+    monkeypatch.setattr(config, "BOTH_RULE_ML", both)
+
+
+def test_rule_only_matches_rule_module(monkeypatch):
+    _set_method(monkeypatch, only_rule=True)
+    _, _, future = _inputs()
+    out = run_safety_stock_selector(False, False, future)
+    expected = calculate_rule_based_safety_stock_df(future)
+    np.testing.assert_array_equal(out["rule_ss"], expected["rule_ss"])
+    np.testing.assert_array_equal(out["final_ss"], expected["rule_ss"])
+    assert "rule_ss" not in future.columns
+
+
+def test_ml_and_rule_attach_positionally(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    _set_method(monkeypatch, both=True)
+    sales, forecast, future = _inputs()
+    # Shuffle and duplicate a row: output must follow the input rows one-to-one
+    future = pd.concat([future.sample(frac=1, random_state=1), future.iloc[[0]]])
+
+    out = run_safety_stock_selector(True, True, future, sales, forecast)
+    assert len(out) == len(future)
+    pd.testing.assert_frame_equal(out[future.columns], future)
+
+    ml = calculate_ml_based_safety_stock(sales, forecast, future)
+    np.testing.assert_allclose(out["ml_ss"], ml["Safety_Stock"])
+    np.testing.assert_allclose(out["rule_ss"], calculate_rule_based_safety_stock_df(future)["rule_ss"])
+    assert "final_ss" not in out.columns
+
+
+def test_empty_future_returns_empty_frame():
+    assert run_safety_stock_selector(False, False, pd.DataFrame()).empty
@@ -0,0 +1,153 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add repo root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import backend.config as config
+from backend.pipeline import run_pipeline, run_pipeline_streaming, run_pipeline_sharded
+
+SORT_KEYS = ["sku_id", "location_id", "echelon_type", "date"]
+
+
+def _raw_inputs(seed=0):
+    """Raw frames using the column names of config.column_mapping."""
+    rng = np.random.default_rng(seed)
+    past_fc, actual, future = [], [], []
+    for sku in [f"SKU{i:03d}" for i in range(6)]:
+        for loc in ["L1", "L2"]:
+            for day in range(20):
+                date = (pd.Timestamp("2024-01-01") + pd.Timedelta(days=day)).strftime("%Y-%m-%d")
+                fc = float(rng.uniform(20, 80))
+                past_fc.append({"SKU_ID": sku, "Location_ID": loc, "Echelon_Type": "DC", "Date": date,
+                                "Forecasted_Demand": fc, "Lead_Time_Days": int(rng.integers(2, 6)),
+                                "Service_Level": 0.95})
+                actual.append({"SKU_ID": sku, "Location_ID": loc, "Echelon_Type": "DC", "Date": date,
+                               "Actual_Sales": fc + float(rng.normal(0, 5))})
+            for day in range(3):
+                future.append({"SKU_ID": sku, "Location_ID": loc, "Echelon_Type": "DC",
+                               "Date": f"2024-02-0{day + 1}", "Forecasted_Demand": 30.0 + day,
+                               "Lead_Time_Days": 3, "Service_Level": 0.9})
+    return pd.DataFrame(past_fc), pd.DataFrame(actual), pd.DataFrame(future)
+
+
+def _set_flags(monkeypatch, has_past, both):
+    monkeypatch.setattr(config, "PAST_SALES_DATA_AVAILABLE", has_past)
+    monkeypatch.setattr(config, "PAST_FORECAST_DATA_AVAILABLE", has_past)
+    monkeypatch.setattr(config, "BOTH_RULE_ML", both)
+    monkeypatch.setattr(config, "ONLY_RULE_BASED", not both)
+    monkeypatch.setattr(config, "ONLY_ML_BASED", False)
+
+
+def _normalise(df):
+    df = df.copy()
+    df["date"] = pd.to_datetime(df["date"])
+    df["sku_id"] = df["sku_id"].astype(str)
+    df["location_id"] = df["location_id"].astype(str)
+    df["echelon_type"] = df["echelon_type"].astype(str)
+    return df.sort_values(SORT_KEYS).reset_index(drop=True)
+
+
+def test_streaming_matches_in_memory_pipeline(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _set_flags(monkeypatch, has_past=True, both=True)
+    past_fc, actual, future = _raw_inputs()
+    past_fc.to_csv("past_fc.csv", index=False)
+    actual.to_csv("actual.csv", index=False)
+    future.to_csv("future.csv", index=False)
+
+    expected = run_pipeline(past_fc.copy(), actual.copy(), future.copy())
+    written = run_pipeline_streaming(
+        "future.csv", "out.csv", past_forecast_path="past_fc.csv", actual_path="actual.csv",
+        chunk_size=10,
+    )
+    streamed = pd.read_csv("out.csv")
+
+    assert written == len(future) == len(streamed)
+    expected, streamed = _normalise(expected), _normalise(streamed)
+    np.testing.assert_allclose(streamed["rule_ss"], expected["rule_ss"])
+    np.testing.assert_allclose(streamed["ml_ss"], expected["ml_ss"])
+
+
+def test_streaming_without_history(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _set_flags(monkeypatch, has_past=False, both=False)
+    _, _, future = _raw_inputs()
+    future.to_csv("future.csv", index=False)
+
+    assert run_pipeline_streaming("future.csv", "out.csv", chunk_size=7, n_partitions=4) == len(future)
+    assert pd.read_csv("out.csv")["rule_ss"].notna().all()
+
+
+def test_sharded_matches_in_memory_pipeline(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    _set_flags(monkeypatch, has_past=True, both=True)
+    past_fc, actual, future = _raw_inputs()
+    future = future.sample(frac=1, random_state=3).reset_index(drop=True)
+
+    expected = run_pipeline(past_fc.copy(), actual.copy(), future.copy()).reset_index(drop=True)
+    sharded = run_pipeline_sharded(past_fc, actual, future, n_shards=5, n_workers=2)
+
+    assert list(sharded.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(sharded, expected, check_dtype=False, check_categorical=False)
+
+
+def _unseen_sku_in_empty_partition(past_fc, n_partitions):
+    """A new SKU whose hash partition holds no history rows."""
+    from backend.pipeline import _partition_ids
+    used = set(_partition_ids(past_fc, ["SKU_ID", "Location_ID"], n_partitions))
+    for i in range(1000):
+        probe = pd.DataFrame({"SKU_ID": [f"NEW{i:03d}"], "Location_ID": ["L1"]})
+        if _partition_ids(probe, ["SKU_ID", "Location_ID"], n_partitions)[0] not in used:
+            return probe["SKU_ID"].iloc[0]
+    raise AssertionError("no empty partition found")
+
+
+def test_sharded_handles_new_sku_without_history(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    _set_flags(monkeypatch, has_past=True, both=True)
+    past_fc, actual, future = _raw_inputs()
+    new_sku = _unseen_sku_in_empty_partition(past_fc, 16)
+    future = pd.concat([future, future.head(3).assign(SKU_ID=new_sku)], ignore_index=True)
+
+    expected = run_pipeline(past_fc.copy(), actual.copy(), future.copy()).reset_index(drop=True)
+    sharded = run_pipeline_sharded(past_fc, actual, future, n_shards=16, n_workers=1)
+
+    pd.testing.assert_frame_equal(sharded, expected, check_dtype=False, check_categorical=False)
+    assert sharded.loc[sharded["sku_id"] == new_sku, "ml_ss"].isna().all()
+
+
+def test_streaming_partition_without_history(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _set_flags(monkeypatch, has_past=True, both=True)
+    past_fc, actual, future = _raw_inputs()
+    new_sku = _unseen_sku_in_empty_partition(past_fc, 16)
+    future = pd.concat([future, future.head(3).assign(SKU_ID=new_sku)], ignore_index=True)
+    past_fc.to_csv("past_fc.csv", index=False)
+    actual.to_csv("actual.csv", index=False)
+    future.to_csv("future.csv", index=False)
+
+    expected = _normalise(run_pipeline(past_fc.copy(), actual.copy(), future.copy()))
+    written = run_pipeline_streaming(
+        "future.csv", "out.csv", past_forecast_path="past_fc.csv", actual_path="actual.csv", n_partitions=16,
+    )
+    streamed = _normalise(pd.read_csv("out.csv"))
+
+    assert written == len(future)
+    np.testing.assert_allclose(streamed["rule_ss"], expected["rule_ss"])
+    np.testing.assert_allclose(streamed["ml_ss"], expected["ml_ss"])
+    assert streamed.loc[streamed["sku_id"] == new_sku, "ml_ss"].isna().all()
+
+
+def test_serial_sharded_run_leaves_config_unchanged(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    _set_flags(monkeypatch, has_past=True, both=False)
+    monkeypatch.setattr(config, "ML_N_JOBS", 4)
+    before = {name: getattr(config, name) for name in dir(config) if name.isupper()}
+    past_fc, actual, future = _raw_inputs()
+
+    run_pipeline_sharded(past_fc, actual, future, n_shards=3, n_workers=1)
+    after = {name: getattr(config, name) for name in dir(config) if name.isupper()}
+    assert after == before
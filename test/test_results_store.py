@@ -0,0 +1,153 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.storage.results_store import ResultsStore
+
+
+def _results(n_skus=5, n_days=10):
+    dates = pd.date_range("2024-01-01", periods=n_days)
+    rows = [(f"{s:03d}", loc, "Store" if loc == "L1" else "DC", d)
+            for s in range(n_skus) for loc in ("L1", "L2") for d in dates]
+    df = pd.DataFrame(rows, columns=["sku_id", "location_id", "echelon_type", "date"])
+    for col in ["sku_id", "location_id", "echelon_type"]:
+        df[col] = df[col].astype("category")
+    rng = np.random.default_rng(0)
+    df["forecast"] = rng.uniform(10, 100, len(df)).astype("float32")
+    df["lead_time"] = pd.array(rng.integers(1, 10, len(df)), dtype="Int32")
+    df["rule_ss"] = rng.uniform(0, 50, len(df))
+    df.loc[3, "rule_ss"] = np.nan
+    return df
+
+
+def test_write_and_query_roundtrip(tmp_path):
+    df = _results()
+    store = ResultsStore(str(tmp_path / "results.db"))
+    run_id = store.write_run(df, params={"method": "rule"}, chunk_size=17)
+
+    assert store.has_run(run_id)
+    assert store.count(run_id) == len(df)
+    out = store.query(run_id)
+    assert list(out.columns) == list(df.columns)
+    assert out["sku_id"].tolist() == df["sku_id"].astype(str).tolist()
+    assert (out["date"] == df["date"]).all()
+    np.testing.assert_allclose(out["rule_ss"], df["rule_ss"])
+    assert out["rule_ss"].isna().sum() == 1
+
+    # filters, date range and paging
+    page = store.query(run_id, filters={"sku_id": ["001", "003"], "location_id": "L2"},
+                       date_from="2024-01-03", date_to="2024-01-05", columns=["sku_id", "date", "rule_ss"],
+                       order_by=["sku_id", "date"], limit=2, offset=1)
+    expected = df[df["sku_id"].isin(["001", "003"]) & (df["location_id"] == "L2")
+                  & df["date"].between("2024-01-03", "2024-01-05")].sort_values(["sku_id", "date"])
+    assert len(page) == 2
+    np.testing.assert_allclose(page["rule_ss"], expected["rule_ss"].iloc[1:3])
+    assert store.count(run_id, filters={"echelon_type": "DC"}) == (df["echelon_type"] == "DC").sum()
+    assert store.distinct(run_id, "location_id") == ["L1", "L2"]
+
+    chunks = list(store.iter_query(run_id, chunk_size=30, columns=["rule_ss"]))
+    assert sum(len(c) for c in chunks) == len(df)
+
+    with pytest.raises(ValueError):
+        store.query(run_id, columns=["no_such_column"])
+    with pytest.raises(ValueError):
+        store.query(run_id, filters={"1=1; DROP TABLE results; --": 1})
+
+
+def test_aggregate_matches_pandas(tmp_path):
+    df = _results()
+    store = ResultsStore(str(tmp_path / "results.db"))
+    run_id = store.write_run(df)
+
+    agg = store.aggregate(run_id, {"rule_ss": ["sum", "mean"], "forecast": "max"},
+                          group_by=["echelon_type", "date"])
+    expected = df.groupby(["echelon_type", "date"], observed=True).agg(
+        rule_ss_sum=("rule_ss", "sum"), rule_ss_mean=("rule_ss", "mean"), forecast_max=("forecast", "max")
+    ).reset_index()
+    assert len(agg) == len(expected)
+    np.testing.assert_allclose(agg["rule_ss_sum"], expected["rule_ss_sum"])
+    np.testing.assert_allclose(agg["rule_ss_mean"], expected["rule_ss_mean"])
+    np.testing.assert_allclose(agg["forecast_max"], expected["forecast_max"], rtol=1e-6)
+
+    total = store.aggregate(run_id, {"rule_ss": "sum"}, filters={"sku_id": "002"})
+    assert total["rule_ss_sum"].iloc[0] == pytest.approx(df.loc[df["sku_id"] == "002", "rule_ss"].sum())
+
+
+def test_runs_are_isolated_and_replaceable(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    first = _results(n_skus=2)
+    second = _results(n_skus=3).assign(ml_ss=1.5)
+    store.write_run(first, run_id="a")
+    store.write_run(second, run_id="b")
+
+    assert store.count("a") == len(first)
+    assert store.count("b") == len(second)
+    assert "ml_ss" not in store.query("a", limit=1).columns
+    assert set(store.list_runs()["run_id"]) == {"a", "b"}
+
+    store.write_run(first.head(4), run_id="b")
+    assert store.count("b") == 4
+    store.delete_run("a")
+    assert not store.has_run("a")
+    with pytest.raises(KeyError):
+        store.query("a")
+
+
+def test_chunked_csv_export_of_a_filtered_slice(tmp_path):
+    from backend.export.exporters import export_results
+
+    df = _results()
+    store = ResultsStore(str(tmp_path / "results.db"))
+    run_id = store.write_run(df)
+    filters = {"location_id": ["L1"], "date": ["2024-01-02", "2024-01-05"]}
+
+    path = str(tmp_path / "slice.csv")
+    rows = export_results(store.iter_query(run_id, chunk_size=3, filters=filters), path)
+    exported = pd.read_csv(path, dtype={"sku_id": str}, parse_dates=["date"])
+    expected = store.query(run_id, filters=filters)
+
+    assert rows == len(exported) == store.count(run_id, filters) == 10
+    assert exported["sku_id"].tolist() == expected["sku_id"].tolist()
+    np.testing.assert_allclose(exported["rule_ss"], expected["rule_ss"])
+
+
+def test_prune_keeps_newest_runs(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    df = _results(n_skus=1, n_days=2)
+    for run_id in ["r1", "r2", "r3", "r4"]:
+        store.write_run(df, run_id=run_id)
+
+    assert sorted(store.prune_runs(2, protect="r1")) == ["r2"]
+    assert set(store.list_runs()["run_id"]) == {"r1", "r3", "r4"}
+    assert store.count("r4") == len(df)
+    with pytest.raises(KeyError):
+        store.count("r2")
+
+
+def test_prune_keeps_recently_used_runs(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    df = _results(n_skus=1, n_days=2)
+    for run_id in ["r1", "r2", "r3"]:
+        store.write_run(df, run_id=run_id)
+    store.touch_run("r1")
+
+    assert store.prune_runs(2) == ["r2"]
+    assert set(store.list_runs()["run_id"]) == {"r1", "r3"}
+
+
+def test_each_run_keeps_its_own_column_types(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    numeric = _results(n_skus=1, n_days=3).assign(ml_ss=2.5, flag=True)
+    labelled = _results(n_skus=1, n_days=3).assign(ml_ss="n/a", flag="yes")
+    store.write_run(numeric, run_id="a")
+    store.write_run(labelled, run_id="b")
+
+    a, b = store.query("a"), store.query("b")
+    assert a["ml_ss"].dtype == "float64" and (a["ml_ss"] == 2.5).all()
+    assert a["lead_time"].dtype == "Int64" and a["flag"].dtype == "Int64"
+    assert b["ml_ss"].tolist() == ["n/a"] * len(labelled)
+    assert b["flag"].tolist() == ["yes"] * len(labelled)
+    assert store.distinct("a", "ml_ss") == [2.5]
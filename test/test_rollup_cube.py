@@ -0,0 +1,77 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add repo root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.scenario.rollup_cube import RollupCube
+from backend.scenario.scenario_engine import build_scenario_basis
+
+
+def _results(seed=0, n=500):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "sku_id": rng.choice(["A", "B", "C", "D"], n),
+        "location_id": rng.choice(["L1", "L2", "L3"], n),
+        "echelon_type": rng.choice(["DC", "Store"], n),
+        "date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 15, n), unit="D"),
+        "forecast": rng.uniform(5, 100, n),
+        "lead_time": rng.integers(1, 10, n).astype(float),
+        "rule_ss": rng.uniform(0, 40, n),
+    })
+    df.loc[::37, "rule_ss"] = np.nan
+    df.loc[::53, "date"] = pd.NaT
+    df.loc[::41, "sku_id"] = None
+    for col in ["sku_id", "location_id", "echelon_type"]:
+        df[col] = df[col].astype("category")
+    return df
+
+
+def test_rollups_match_groupby():
+    df = _results()
+    cube = RollupCube(df)
+    assert cube.count() == len(df)
+    assert np.isclose(cube.total(), df["rule_ss"].sum())
+
+    for dim in ["sku_id", "location_id", "echelon_type", "date"]:
+        expected = df.groupby(dim, dropna=False, observed=True)["rule_ss"].sum()
+        got = cube.rollup(dim)
+        assert len(got) == len(expected)
+        np.testing.assert_allclose(got.sort_values().to_numpy(), expected.sort_values().to_numpy())
+
+    top = cube.top_n("sku_id", 2)
+    expected_top = df.groupby("sku_id", observed=True)["rule_ss"].sum().sort_values(ascending=False).head(2)
+    assert list(top.index) == list(expected_top.index.astype(str))
+    assert cube.nunique("sku_id") == df["sku_id"].nunique()
+    assert cube.date_bounds() == (df["date"].min(), df["date"].max())
+
+
+def test_filtered_queries_and_scenario_basis():
+    df = _results(seed=1)
+    cube = RollupCube(df)
+    mask = cube.mask({"echelon_type": ["DC"], "sku_id": ["A", "C"], "location_id": []},
+                     date_from="2024-01-03", date_to="2024-01-10")
+    sel = df[df["echelon_type"].isin(["DC"]) & df["sku_id"].isin(["A", "C"])
+             & (df["date"] >= "2024-01-03") & (df["date"] <= "2024-01-10")]
+
+    assert cube.count(mask) == len(sel)
+    assert np.isclose(cube.total(mask=mask), sel["rule_ss"].sum())
+    assert cube.nunique("location_id", mask) == sel["location_id"].nunique()
+    by_date = cube.rollup("date", mask=mask)
+    expected = sel.groupby("date")["rule_ss"].sum()
+    np.testing.assert_allclose(by_date.to_numpy(), expected.to_numpy())
+    assert list(by_date.index) == list(expected.index)
+
+    basis = cube.scenario_basis(mask)
+    expected_basis = build_scenario_basis(sel)
+    assert np.isclose(basis["total"], expected_basis["total"])
+    for dim in ["sku_id", "date"]:
+        np.testing.assert_allclose(
+            basis["by"][dim].sort_index().to_numpy(), expected_basis["by"][dim].sort_index().to_numpy()
+        )
+
+    empty = cube.mask({"sku_id": ["no such sku"]})
+    assert cube.count(empty) == 0 and cube.total(mask=empty) == 0.0
+    assert cube.date_bounds(empty) == (None, None)
@@ -0,0 +1,50 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+# Add repo root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.modules.rule_based import (
+    calculate_rule_based_safety_stock,
+    calculate_rule_based_safety_stock_df,
+)
+
+
+def _future_df():
+    return pd.DataFrame({
+        "sku_id": ["A", "A", "B", "C"],
+        "location_id": ["L1", "L1", "L2", "L2"],
+        "echelon_type": ["DC", "DC", "Store", "Store"],
+        "date": pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-01", "2024-01-01"]),
+        "forecast": [100.0, 25.0, 9.0, np.nan],
+        "lead_time": pd.array([4, 9, None, 2], dtype="Int64"),
+        "service_level": [0.95, 0.9, 0.99, 0.95],
+    })
+
+
+def test_kernel_matches_row_wise_formula():
+    df = _future_df()
+    expected = [
+        round(norm.ppf(sl) * np.sqrt(f) * np.sqrt(lt), 2)
+        for f, lt, sl in zip(df["forecast"], df["lead_time"].astype("float64"), df["service_level"])
+    ]
+    result = calculate_rule_based_safety_stock(df)
+    np.testing.assert_allclose(result, expected, equal_nan=True)
+
+
+def test_kernel_accepts_numpy_arrays_and_scalar_service_level():
+    result = calculate_rule_based_safety_stock(
+        forecast=np.array([100.0, 16.0]), lead_time=np.array([4, 1]), service_level=0.95
+    )
+    np.testing.assert_allclose(result, np.round(norm.ppf(0.95) * np.array([20.0, 4.0]), 2))
+
+
+def test_df_wrapper_adds_rule_ss_without_mutating_input():
+    df = _future_df()
+    out = calculate_rule_based_safety_stock_df(df)
+    assert "rule_ss" in out.columns
+    assert "rule_ss" not in df.columns
+    assert np.isnan(out["rule_ss"].iloc[2]) and np.isnan(out["rule_ss"].iloc[3])
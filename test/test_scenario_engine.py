@@ -0,0 +1,58 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add repo root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.modules.rule_based import calculate_rule_based_safety_stock_df
+from backend.scenario.scenario_engine import (
+    build_scenario_basis, evaluate_scenario_grid, scenario_aggregate, scenario_totals,
+)
+
+
+def _baseline(seed=0):
+    rng = np.random.default_rng(seed)
+    n = 200
+    return pd.DataFrame({
+        "sku_id": rng.choice(["A", "B", "C"], n),
+        "location_id": "L1",
+        "echelon_type": "DC",
+        "date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 10, n), unit="D"),
+        "forecast": rng.uniform(5, 100, n),
+        "lead_time": rng.integers(1, 10, n),
+        "service_level": 0.95,
+    })
+
+
+def _recomputed(df, sl, ltm, dm):
+    sc = df.copy()
+    sc["service_level"] = sl
+    sc["lead_time"] = sc["lead_time"] * ltm
+    sc["forecast"] = sc["forecast"] * dm
+    return calculate_rule_based_safety_stock_df(sc)
+
+
+def test_grid_matches_full_recomputation():
+    df = _baseline()
+    basis = build_scenario_basis(df)
+    grid = evaluate_scenario_grid(basis, [0.9, 0.95, 0.99], [0.8, 1.2], [1.0, 1.5])
+    assert len(grid) == 12
+    for row in grid.itertuples():
+        expected = _recomputed(df, row.service_level, row.lead_time_mult, row.demand_mult)["rule_ss"].sum()
+        np.testing.assert_allclose(row.total_ss, expected, atol=0.005 * len(df))
+
+
+def test_named_scenarios_and_per_sku_aggregates():
+    df = _baseline()
+    basis = build_scenario_basis(df)
+    scenarios = {"up": {"service_level": 0.98, "lead_time_mult": 1.5, "demand_mult": 1.1}}
+    totals = scenario_totals(basis, scenarios)
+    by_sku = scenario_aggregate(basis, "sku_id", 0.98, 1.5, 1.1)
+
+    expected = _recomputed(df, 0.98, 1.5, 1.1)
+    np.testing.assert_allclose(totals["up"], expected["rule_ss"].sum(), atol=0.005 * len(df))
+    np.testing.assert_allclose(
+        by_sku.sort_index(), expected.groupby("sku_id")["rule_ss"].sum().sort_index(), atol=0.005 * len(df)
+    )
@@ -0,0 +1,35 @@
+import sys
+import os
+import itertools
+import numpy as np
+import pandas as pd
+
+# Add repo root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.segmentation.segmenter import segmentation_function, select_method, take_decision
+
+
+def _metrics_df():
+    values = [0, 5, 10, 15, 20, 25, np.nan]
+    rows = list(itertools.product(values, [-12, -7, 0, 3, 5, 8, 10, 11, np.nan], values))
+    return pd.DataFrame(rows, columns=["RMSE", "Bias", "MAPE (%)"])
+
+
+def test_vectorized_segmentation_matches_scalar_rules():
+    metrics = _metrics_df()
+    out = segmentation_function(metrics, True, True)
+    expected = [take_decision(*select_method(r, b, m)) for r, b, m in metrics.itertuples(index=False)]
+    assert list(out["Selected_method"]) == expected
+
+
+def test_custom_thresholds():
+    metrics = pd.DataFrame({"RMSE": [12.0], "Bias": [1.0], "MAPE (%)": [5.0]})
+    assert segmentation_function(metrics, True, True)["Selected_method"].iloc[0] == "Hybrid"
+    relaxed = segmentation_function(metrics, True, True, thresholds={"rmse": (15, 30)})
+    assert relaxed["Selected_method"].iloc[0] == "Forecast-based SS"
+    assert select_method(12.0, 1.0, 5.0, thresholds={"rmse": (15, 30)})[0] == "low"
+
+
+def test_no_past_data_message():
+    assert segmentation_function(_metrics_df(), False, True) == "There are no past Data"
@@ -0,0 +1,73 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+# Add repo root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import backend.config as config
+from backend.module_selector import run_safety_stock_selector
+from backend.optimization.service_level_optimizer import (
+    normal_loss, lead_time_sigma, optimize_service_level, assign_optimal_service_level,
+)
+
+
+def _future(n=120, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "sku_id": rng.choice(["A", "B", "C", "D"], n),
+        "location_id": rng.choice(["L1", "L2"], n),
+        "echelon_type": "DC",
+        "date": pd.Timestamp("2024-03-01") + pd.to_timedelta(rng.integers(0, 10, n), unit="D"),
+        "forecast": rng.uniform(10, 100, n),
+        "lead_time": rng.integers(1, 8, n),
+        "service_level": 0.95,
+    })
+
+
+def test_normal_loss_matches_integral():
+    z = np.array([-1.0, 0.0, 1.5])
+    grid = np.linspace(-10, 10, 200001)
+    for zi, li in zip(z, normal_loss(z)):
+        expected = np.trapezoid(np.maximum(grid - zi, 0) * norm.pdf(grid), grid)
+        assert abs(li - expected) < 1e-6
+
+
+def test_optimum_matches_critical_ratio_and_brute_force():
+    df = _future()
+    df["shortage_cost"] = np.where(df["sku_id"] == "A", 50.0, np.nan)  # per-row override
+    sigma = lead_time_sigma(df)
+    candidates = np.round(np.arange(0.5, 0.999, 0.001), 3)
+    opt = optimize_service_level(df, sigma, holding_cost=1.0, shortage_cost=4.0, candidates=candidates, batch_size=3)
+
+    # With constant costs within a group the optimum is the critical ratio 1 - h/p
+    for (sku, _), row in opt.iterrows():
+        expected = 1 - 1.0 / (50.0 if sku == "A" else 4.0)
+        assert abs(row["optimal_service_level"] - expected) <= 0.001
+
+    # Brute force over the same candidates for one group
+    mask = (df["sku_id"] == "B") & (df["location_id"] == "L1")
+    s = sigma[mask.to_numpy()]
+    z = norm.ppf(candidates)
+    costs = [(zi * s + 4.0 * s * normal_loss(zi)).sum() for zi in z]
+    assert opt.loc[("B", "L1"), "optimal_service_level"] == candidates[int(np.argmin(costs))]
+
+    per_row = assign_optimal_service_level(df, sigma, candidates=candidates)
+    assert per_row.shape == (len(df),)
+
+
+def test_selector_uses_optimal_service_level(monkeypatch):
+    monkeypatch.setattr(config, "ONLY_RULE_BASED", True)
+    monkeypatch.setattr(config, "ONLY_ML_BASED", False)
+    monkeypatch.setattr(config, "BOTH_RULE_ML", False)
+    monkeypatch.setattr(config, "OPTIMIZE_SERVICE_LEVEL", True)
+    monkeypatch.setattr(config, "SL_HOLDING_COST", 1.0)
+    monkeypatch.setattr(config, "SL_SHORTAGE_COST", 20.0)
+    df = _future()
+
+    out = run_safety_stock_selector(False, False, df)
+    np.testing.assert_allclose(out["optimal_service_level"], 0.95)
+    z = norm.ppf(out["optimal_service_level"])
+    np.testing.assert_allclose(out["rule_ss"], np.round(z * np.sqrt(df["forecast"] * df["lead_time"]), 2))